@@ -8,9 +8,10 @@
                   - Transcription audio (AssemblyAI)
                   - Extraction d'informations via OpenAI
                   - Envoi automatique des données extraites vers backend PHP
-                  Utilise BackgroundTasks pour traitement asynchrone.
+                  File de traitement plus court d'abord (durée estimée
+                  avant téléchargement) exécutée par un pool de workers.
  Créé le        : 15/10/2025
- Dernière maj   : 16/10/2025
+ Dernière maj   : 18/10/2026
 ===============================================================
  Dépendances    :
  - requests
@@ -23,51 +24,110 @@
  - service.convert
  - service.transcribe
  - service.transcribeAssembly
+ - service.batch_transcribe
+ - service.whisper_pool
+ - service.chunked_transcribe
+ - service.hedge
+ - service.transcribe_profiles
  - service.extract_infos
+ - service.scheduler
+ - service.decode
+ - service.whisper_registry
  - utils.silence_trimmer
 
  Fonctionnalités clés :
  - Endpoint GET /health pour vérifier l'état de l'API
  - Endpoint POST /process pour lancer le traitement audio
+ - Endpoint GET /jobs/{job_id} pour suivre un traitement
  - Téléchargement de l'audio
  - Nettoyage automatique des silences
- - Transcription via AssemblyAI
+ - Transcription via AssemblyAI, Whisper local, ou AssemblyAI couvert par
+   Whisper local (TRANSCRIBE_ENGINE=hedged)
  - Extraction et structuration des informations
  - Envoi des résultats au backend PHP défini dans .env
  - Gestion des erreurs et logging console
 
  Notes :
  - Les variables d'environnement doivent être définies dans le fichier .env
- - Le traitement est lancé en Background pour ne pas bloquer l'API
+ - Le traitement est mis en file pour ne pas bloquer l'API ; les appels
+   courts passent avant les longs (PIPELINE_WORKERS, SCHEDULER_AGING_RATE)
 ===============================================================
 """
 
 import requests
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from service.download import download_audio
-from service.convert import convert_to_wav
+from typing import Optional
+from service.download import download_audio, stream_trim_audio, probe_duration, validate_audio_url, INGEST_POLICIES
+from service.convert import convert_to_wav, convert_and_trim
 from service.transcribe import transcribe_audio
+from service.batch_transcribe import transcribe_audio_batched
+from service.whisper_pool import transcribe_audio_pooled
+from service.chunked_transcribe import transcribe_audio_chunked
+from service.hedge import transcribe_hedged, hedge_stats
+from service.transcribe_profiles import select_profile, record_rtf
 from service.transcribeAssembly import transcribe_with_assemblyai
 from service.extract_infos import extract_infos_from_text
-from utils.silence_trimmer import trim_silence
+from service.scheduler import Scheduler, Job
+from service.decode import decode_stats
+from service.whisper_registry import preload_models, model_stats
+from utils.silence_trimmer import detect_speech
 
 import traceback
 from dotenv import load_dotenv
 import os
+import time
 
 
 app = FastAPI()
 load_dotenv()
 PHP_API_URL = os.getenv("php_api_url")
+TRIM_ENERGY_GATE = os.getenv("TRIM_ENERGY_GATE", "0") == "1"
+# VAD mono-passe : une classification par frame (~12x plus rapide, sortie approchée)
+TRIM_SINGLE_PASS = os.getenv("TRIM_SINGLE_PASS", "0") == "1"
+# VAD multi-processus (résultat approché, à activer explicitement) et taille du pool
+TRIM_PARALLEL_VAD = os.getenv("TRIM_PARALLEL_VAD", "0") == "1"
+TRIM_WORKERS = int(os.getenv("TRIM_WORKERS", str(os.cpu_count() or 1)))
+STREAM_PIPELINE = os.getenv("STREAM_PIPELINE", "0") == "1"
+# Moteur de transcription : "assemblyai", "whisper" (local), "whisper-batched" (local, lots multi-fiches)
+# "whisper-pool" (local, pool de process avec budget de threads) ou "whisper-chunked" (local, longs
+# appels découpés aux silences et transcrits en parallèle dans le pool), ou "hedged" (AssemblyAI,
+# Whisper local lancé en parallèle s'il tarde ou échoue)
+TRANSCRIBE_ENGINE = os.getenv("TRANSCRIBE_ENGINE", "assemblyai").lower()
+
+TRANSCRIBERS = {
+    "assemblyai": transcribe_with_assemblyai,
+    "whisper": transcribe_audio,
+    "whisper-batched": transcribe_audio_batched,
+    "whisper-pool": transcribe_audio_pooled,
+    "whisper-chunked": transcribe_audio_chunked,
+    "hedged": transcribe_hedged,
+}
+# Whisper local : ne transcrire que les segments de parole du trimmer (clip_timestamps) ;
+# hors STREAM_PIPELINE, l'original est transcrit directement et aucun WAV réduit n'est écrit
+WHISPER_CLIP_SEGMENTS = os.getenv("WHISPER_CLIP_SEGMENTS", "0") == "1"
+CLIP_ENGINES = ("whisper", "whisper-pool", "whisper-chunked")
+# Moteurs qui reçoivent toujours la carte des segments du trimmer (frontières de découpe)
+SEGMENT_MAP_ENGINES = ("whisper-chunked",)
+# Moteurs qui publient les segments au fil de la transcription (GET /jobs/{id})
+STREAMING_ENGINES = ("whisper",)
+# Moteurs qui appliquent un profil de transcription (WHISPER_PROFILE, sélecteur "auto")
+PROFILE_ENGINES = ("whisper", "whisper-pool", "whisper-chunked")
+
+@app.on_event("startup")
+def warm_models():
+    # Modèle Whisper local chargé et préchauffé avant le premier job (WHISPER_PRELOAD=1)
+    preload_models()
 
 @app.get("/health")
 def health_check():
-    return {"status": "ok"}
+    return {"status": "ok", "queue": scheduler.stats(), "decode": decode_stats(), "models": model_stats(),
+            "hedge": hedge_stats()}
 
 class DownloadRequest(BaseModel):
     fiche_id: int
     audio_url: str
+    ingest_policy: Optional[str] = None  # "orig" ou "mp3" ; INGEST_POLICY par défaut
 
 # ✅ Extract data and send to php server
 def send_ai_data_to_php(fiche_id: int, extracted_data: dict) -> dict:
@@ -128,21 +188,63 @@ def send_ai_data_to_php(fiche_id: int, extracted_data: dict) -> dict:
     except json.JSONDecodeError:
         raise HTTPException(status_code=500, detail="PHP backend returned invalid JSON")
 
-def process_fiche_in_background(fiche_id: int, audio_url: str):
+def process_fiche_in_background(fiche_id: int, audio_url: str, ingest_policy: str = None, job: Job = None):
     try:
         print(f"🎧 Processing fiche {fiche_id} in background...")
 
         filename = f"{fiche_id}_audiotranscribed"
+        clip_segments = WHISPER_CLIP_SEGMENTS and TRANSCRIBE_ENGINE in CLIP_ENGINES
+        raw_path = None
 
-        # Step 1: Download
-        raw_path = download_audio(audio_url, filename)
-        print(raw_path)
+        if STREAM_PIPELINE:
+            # Steps 1+2 : download and trim in one pass (no raw file on disk)
+            trim_result = stream_trim_audio(audio_url, filename, energy_gate=TRIM_ENERGY_GATE, policy=ingest_policy,
+                                            single_pass=TRIM_SINGLE_PASS)
+        else:
+            # Step 1: Download
+            raw_path = download_audio(audio_url, filename, policy=ingest_policy)
+            print(raw_path)
 
-        # Step 2 : trim audio to cut when audio is silenced
-        wave_path = trim_silence(raw_path)
+            if clip_segments:
+                # Step 2 : speech map only, Whisper reads the original file (no trimmed WAV)
+                trim_result = detect_speech(raw_path, energy_gate=TRIM_ENERGY_GATE, single_pass=TRIM_SINGLE_PASS)
+            else:
+                # Step 2 : trim audio to cut when audio is silenced
+                # (format lu dans l'en-tête : WAV PCM lu directement, autres formats décodés en flux
+                # vers le trimmer ; VAD multi-processus si TRIM_PARALLEL_VAD=1)
+                # (raw_path peut être le fichier source d'un partage : sortie nommée d'après la fiche)
+                trim_result = convert_and_trim(raw_path, filename, energy_gate=TRIM_ENERGY_GATE,
+                                               workers=TRIM_WORKERS if TRIM_PARALLEL_VAD else 1,
+                                               single_pass=TRIM_SINGLE_PASS)
 
-        # Step 3: Transcribe
-        transcript_path = transcribe_with_assemblyai(filename)
+        # Step 3: Transcribe (partial segments pushed to the job as they are decoded)
+        options = {}
+        if clip_segments:
+            options.update(trim_result=trim_result, original_path=raw_path)
+        elif TRANSCRIBE_ENGINE in SEGMENT_MAP_ENGINES:
+            options["trim_result"] = trim_result
+        if job is not None and TRANSCRIBE_ENGINE in STREAMING_ENGINES:
+            options["on_segment"] = job.add_segment
+        profile = None
+        if TRANSCRIBE_ENGINE in PROFILE_ENGINES:
+            # Profil choisi selon la parole à transcrire et la file (délai cible)
+            # (parole en file estimée avec le taux de parole de ce job)
+            queue = scheduler.stats()
+            queued_speech = queue["queued_audio"] * trim_result.speech_ratio
+            profile = select_profile(trim_result.trimmed_duration, queued_speech, queue["workers"]).name
+            options["profile"] = profile
+            options["timing"] = {}
+        transcribe_start = time.perf_counter()
+        transcript_path = TRANSCRIBERS[TRANSCRIBE_ENGINE](filename, **options)
+        # RTF de décodage seul si le moteur le mesure (hors chargement du modèle et attente du pool)
+        decode_seconds = options.get("timing", {}).get("decode_seconds")
+        elapsed = time.perf_counter() - transcribe_start if decode_seconds is None else decode_seconds
+        rtf = elapsed / max(trim_result.trimmed_duration, 1e-3)
+        if profile is not None and decode_seconds is not None:
+            record_rtf(profile, rtf)
+        if job is not None:
+            job.profile, job.rtf = profile, rtf
+        print(f"📝 Transcribed fiche {fiche_id} | engine {TRANSCRIBE_ENGINE} | profile {profile or '-'} | RTF {rtf:.2f}")
 
         # Step 4: Read transcript
         with open(transcript_path, "r", encoding="utf-8") as f:
@@ -159,20 +261,53 @@ def process_fiche_in_background(fiche_id: int, audio_url: str):
 
     except Exception as e:
         print(f"❌ Error processing fiche {fiche_id}: {e}")
+        raise  # job marqué en erreur par le scheduler
+
+def run_job(job: Job):
+    process_fiche_in_background(job.fiche_id, job.audio_url, job.ingest_policy, job=job)
 
-# ✅ Main endpoint — triggers background task
+# File plus court d'abord avec vieillissement (remplace BackgroundTasks)
+scheduler = Scheduler(run_job)
+
+# ✅ Main endpoint — queues the fiche
 @app.post("/process")
-def download_file(request: DownloadRequest, background_tasks: BackgroundTasks):
+def download_file(request: DownloadRequest):
     fiche_id = request.fiche_id
     audio_url = request.audio_url
+    ingest_policy = request.ingest_policy
+
+    if ingest_policy and ingest_policy.lower() not in INGEST_POLICIES:
+        raise HTTPException(status_code=400, detail=f"Unsupported ingest policy: {ingest_policy}")
+
+    # Source autorisée (file:// sous SOURCE_FILE_ROOT, s3:// dans SOURCE_S3_BUCKETS, http(s))
+    try:
+        validate_audio_url(audio_url)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Durée estimée (en-tête WAV par requête partielle) : priorité dans la file
+    try:
+        estimated_duration = probe_duration(audio_url)
+    except Exception as e:
+        print(f"⚠️ Duration probe failed for fiche {fiche_id}: {e}")
+        estimated_duration = None
 
     print(f"📥 Queuing fiche {fiche_id} for background processing...")
 
-    # Schedule background task
-    background_tasks.add_task(process_fiche_in_background, fiche_id, audio_url)
+    job = scheduler.submit(Job(fiche_id, audio_url, ingest_policy, estimated_duration))
 
     return {
         "status": "queued",
         "fiche_id": fiche_id,
+        "job_id": job.job_id,
+        "estimated_duration": estimated_duration,
         "message": "Processing started in background. Results will be sent to PHP when ready."
-    }
\ No newline at end of file
+    }
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str, since: int = 0):
+    # since : premier segment à renvoyer (suivi incrémental de la transcription)
+    job = scheduler.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict(since=max(since, 0))
\ No newline at end of file
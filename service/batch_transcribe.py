@@ -0,0 +1,244 @@
+"""
+===============================================================
+ Fichier        : batch_transcribe.py
+ Auteur         : Mohamed-Amine ELGAOUZI
+ Description    : Transcription locale par lots : les enregistrements
+                  en attente de plusieurs fiches sont regroupés et
+                  transcrits en une seule passe par le pipeline
+                  batché de Faster Whisper, puis les segments sont
+                  rendus à chaque fiche.
+ Créé le        : 18/10/2026
+ Dernière maj   : 18/10/2026
+===============================================================
+ Dépendances    :
+ - os
+ - time
+ - bisect
+ - threading
+ - concurrent.futures
+ - numpy
+ - dotenv
+ - faster_whisper
+ - service.whisper_registry
+ - service.decode
+ - service.encode
+
+ Fonctionnalités clés :
+ - Collecte : un lot part dès WHISPER_BATCH_MAX_RECORDINGS
+   enregistrements, ou WHISPER_BATCH_MAX_WAIT secondes après le premier
+ - Chaque enregistrement est découpé en morceaux de parole de 30 s au
+   plus (VAD Silero de faster-whisper), jamais à cheval sur deux
+   enregistrements
+ - Les morceaux de tout le lot sont décodés WHISPER_BATCH_SIZE par
+   WHISPER_BATCH_SIZE (BatchedInferencePipeline, clip_timestamps)
+ - Les segments sont rendus à chaque fiche, horodatés dans son propre audio
+ - Mesure du débit de chaque lot (secondes audio / seconde)
+
+ Notes :
+ - Une seule langue par lot (WHISPER_LANGUAGE, "fr" par défaut, comme
+   pour AssemblyAI).
+ - Comparaison avec la transcription fichier par fichier :
+   python -m utils.transcribe_bench fichier1.wav fichier2.wav ...
+===============================================================
+"""
+
+import os
+import time
+import bisect
+import threading
+from concurrent.futures import Future
+import numpy as np
+from dotenv import load_dotenv
+from faster_whisper import BatchedInferencePipeline
+from faster_whisper.vad import get_speech_timestamps, VadOptions
+from service.whisper_registry import get_model, WHISPER_LANGUAGE
+from service.decode import decode_pcm
+from service.encode import encode_processed_audio
+
+TRANSCRIPT_DIR = "data/transcripts"
+
+load_dotenv()
+WHISPER_BATCH_SIZE = int(os.getenv("WHISPER_BATCH_SIZE", "8"))
+WHISPER_BATCH_MAX_WAIT = float(os.getenv("WHISPER_BATCH_MAX_WAIT", "2"))
+WHISPER_BATCH_MAX_RECORDINGS = int(os.getenv("WHISPER_BATCH_MAX_RECORDINGS", "8"))
+
+SAMPLE_RATE = 16000
+CHUNK_SECONDS = 30  # fenêtre d'entrée de Whisper
+
+def load_audio(path: str) -> np.ndarray:
+    """Décoder un fichier audio en float32 mono 16 kHz (format attendu par faster-whisper)"""
+    pcm = b"".join(decode_pcm(path, sample_rate=SAMPLE_RATE))
+    return np.frombuffer(pcm, dtype="<i2").astype(np.float32) / 32768.0
+
+def speech_chunks(audio: np.ndarray, max_seconds: float = CHUNK_SECONDS) -> list:
+    """
+    Découpe un enregistrement en morceaux de parole d'au plus max_seconds.
+
+    Les zones de parole détectées par le VAD Silero sont regroupées tant
+    que le morceau ne dépasse pas max_seconds.
+
+    Returns:
+        list: Couples (début, fin) en échantillons.
+    """
+    max_samples = int(max_seconds * SAMPLE_RATE)
+    options = VadOptions(max_speech_duration_s=max_seconds, min_silence_duration_ms=160)
+    chunks = []
+    for ts in get_speech_timestamps(audio, options):
+        if chunks and ts["end"] - chunks[-1][0] <= max_samples:
+            chunks[-1] = (chunks[-1][0], ts["end"])
+        else:
+            chunks.append((ts["start"], ts["end"]))
+    return chunks
+
+class _Request:
+    def __init__(self, audio: np.ndarray, name: str):
+        self.audio = audio
+        self.name = name
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+class BatchTranscriber:
+    """Regroupe les demandes de transcription concurrentes en lots batchés"""
+
+    def __init__(self, batch_size: int = None, max_wait: float = None, max_recordings: int = None,
+                 model_size: str = None, compute_type: str = None):
+        self.batch_size = batch_size or WHISPER_BATCH_SIZE
+        self.max_wait = WHISPER_BATCH_MAX_WAIT if max_wait is None else max_wait
+        self.max_recordings = max_recordings or WHISPER_BATCH_MAX_RECORDINGS
+        self._model_size = model_size
+        self._compute_type = compute_type
+        self._pipeline = None
+        self._pending = []
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def submit(self, audio: np.ndarray, name: str = "audio") -> Future:
+        """
+        Ajoute un enregistrement au prochain lot.
+
+        Returns:
+            Future: Résolu avec la liste des segments (start, end, text) de l'enregistrement.
+        """
+        request = _Request(audio, name)
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="whisper-batcher", daemon=True)
+                self._thread.start()
+            self._pending.append(request)
+            self._cond.notify()
+        return request.future
+
+    def _next_batch(self) -> list:
+        """Attendre le premier enregistrement, puis compléter le lot jusqu'à max_recordings ou max_wait"""
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            deadline = self._pending[0].enqueued_at + self.max_wait
+            while len(self._pending) < self.max_recordings:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = self._pending[:self.max_recordings]
+            del self._pending[:self.max_recordings]
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                results = self.transcribe_batch([request.audio for request in batch])
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            for request, segments in zip(batch, results):
+                request.future.set_result(segments)
+
+    def transcribe_batch(self, audios: list) -> list:
+        """
+        Transcrit plusieurs enregistrements en une passe batchée.
+
+        Args:
+            audios (list): Tableaux float32 mono 16 kHz, un par enregistrement.
+
+        Returns:
+            list: Pour chaque enregistrement, liste de (start, end, text) en secondes
+                dans son propre audio.
+        """
+        if self._pipeline is None:
+            self._pipeline = BatchedInferencePipeline(model=get_model(self._model_size, self._compute_type))
+
+        # Enregistrements mis bout à bout ; chaque morceau reste dans son enregistrement
+        offsets = []
+        clips = []
+        owners = []  # enregistrement de chaque morceau
+        position = 0
+        for index, audio in enumerate(audios):
+            offsets.append(position)
+            for start, end in speech_chunks(audio):
+                clips.append({"start": (position + start) / SAMPLE_RATE, "end": (position + end) / SAMPLE_RATE})
+                owners.append(index)
+            position += len(audio)
+        clip_starts = [clip["start"] for clip in clips]
+
+        results = [[] for _ in audios]
+        if not clips:
+            return results
+
+        start_time = time.perf_counter()
+        segments, _ = self._pipeline.transcribe(
+            np.concatenate(audios), language=WHISPER_LANGUAGE,
+            clip_timestamps=clips, batch_size=self.batch_size,
+        )
+        for segment in segments:
+            # Routage par morceau d'origine (celui qui contient le milieu du segment) : les
+            # horodatages arrondis à la ms peuvent tomber juste avant le début d'un
+            # enregistrement dont le décalage n'est pas un multiple de 16 échantillons
+            clip = max(bisect.bisect_right(clip_starts, (segment.start + segment.end) / 2) - 1, 0)
+            index = owners[clip]
+            offset = offsets[index] / SAMPLE_RATE
+            results[index].append((round(max(segment.start - offset, 0.0), 3), round(max(segment.end - offset, 0.0), 3),
+                                   segment.text.strip()))
+        elapsed = time.perf_counter() - start_time
+
+        audio_seconds = position / SAMPLE_RATE
+        print(f"[WhisperBatch] {len(audios)} recordings | {len(clips)} chunks | {audio_seconds:.1f}s audio "
+              f"in {elapsed:.2f}s ({audio_seconds / elapsed if elapsed else 0:.1f}x realtime)")
+        return results
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+def get_batcher() -> BatchTranscriber:
+    """Retourne le regroupeur partagé du process (créé à la première utilisation)"""
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = BatchTranscriber()
+    return _batcher
+
+def transcribe_audio_batched(filename: str) -> str:
+    """
+    Transcrit un fichier traité via le regroupeur partagé (équivalent batché de transcribe_audio).
+
+    Args:
+        filename (str): Nom de base du fichier (sans extension) dans 'data/audio/processed'.
+
+    Returns:
+        str: Chemin vers le fichier texte contenant la transcription.
+    """
+    os.makedirs(TRANSCRIPT_DIR, exist_ok=True)
+    input_path = encode_processed_audio(filename)
+    output_path = os.path.join(TRANSCRIPT_DIR, f"{filename}.txt")
+
+    segments = get_batcher().submit(load_audio(input_path), filename).result()
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(" ".join(text for _, _, text in segments))
+
+    if os.path.getsize(output_path) == 0:
+        raise ValueError("Transcription failed or file is empty")
+
+    return output_path
@@ -0,0 +1,234 @@
+"""
+===============================================================
+ Fichier        : chunked_transcribe.py
+ Auteur         : Mohamed-Amine ELGAOUZI
+ Description    : Transcription parallèle des longs appels : la
+                  parole est découpée en morceaux aux frontières des
+                  segments du trimmer, les morceaux sont transcrits
+                  en parallèle dans le pool de process Whisper, puis
+                  le texte est recollé dans l'ordre.
+ Créé le        : 18/10/2026
+ Dernière maj   : 18/10/2026
+===============================================================
+ Dépendances    :
+ - os
+ - re
+ - time
+ - dotenv
+ - service.transcribe
+ - service.whisper_pool
+
+ Fonctionnalités clés :
+ - Découpage aux silences : exactement WHISPER_POOL_WORKERS morceaux
+   (moins si la parole ne donne pas WHISPER_CHUNK_MIN_SECONDS par
+   morceau), coupés à la frontière de segment la plus proche de chaque
+   quantile k / N de la parole
+ - Un segment plus long qu'un morceau est coupé avec un recouvrement
+   de WHISPER_CHUNK_OVERLAP secondes (ramené à un demi-morceau au plus)
+ - Recollage : à une coupe avec recouvrement, chaque segment est gardé
+   par le morceau qui contient son milieu, puis les mots répétés de
+   part et d'autre de la coupe sont supprimés
+ - Horodatages ramenés à l'enregistrement d'origine
+
+ Notes :
+ - Le temps de transcription d'un long appel baisse avec le nombre de
+   workers du pool (chacun avec son budget de threads).
+ - Nécessite la carte des segments du trimmer (TrimResult) ; sans elle
+   le fichier est transcrit par un seul worker.
+===============================================================
+"""
+
+import os
+import re
+import time
+from dotenv import load_dotenv
+from service.transcribe import transcription_input, transcribe_clips, TRANSCRIPT_DIR
+from service.whisper_pool import get_pool, transcribe_audio_pooled, WHISPER_POOL_WORKERS
+
+load_dotenv()
+WHISPER_CHUNK_MIN_SECONDS = float(os.getenv("WHISPER_CHUNK_MIN_SECONDS", "60"))
+WHISPER_CHUNK_OVERLAP = float(os.getenv("WHISPER_CHUNK_OVERLAP", "2"))
+
+DEDUP_MAX_WORDS = 8  # plus longue répétition recherchée de part et d'autre d'une coupe
+DEDUP_MIN_WORDS = 2  # une répétition d'un seul mot peut être légitime
+
+def plan_chunks(regions: list, chunk_count: int, overlap: float = None) -> list:
+    """
+    Répartit les plages de parole en chunk_count morceaux de parole équivalente.
+
+    Les plages plus longues qu'un morceau (parole totale / chunk_count) sont
+    d'abord coupées avec un recouvrement. Le morceau j se termine ensuite à la
+    frontière de plage la plus proche du quantile j / chunk_count de la parole
+    cumulée : exactement chunk_count morceaux (moins s'il y a moins de plages).
+
+    Args:
+        regions (list): Plages (début, fin) en secondes, dans l'ordre.
+        chunk_count (int): Nombre de morceaux voulu (workers du pool).
+        overlap (float): Recouvrement quand une plage doit être coupée ;
+            WHISPER_CHUNK_OVERLAP par défaut, au plus un demi-morceau.
+
+    Returns:
+        list: Morceaux (plages, coupe) ; coupe vaut None si le morceau commence
+            à un silence, sinon l'instant de coupe au milieu du recouvrement
+            avec le morceau précédent.
+    """
+    overlap = WHISPER_CHUNK_OVERLAP if overlap is None else overlap
+    speech = sum(end - start for start, end in regions)
+    if not regions or speech <= 0:
+        return []
+    if chunk_count <= 1:
+        # Un seul morceau : plages entières, aucune coupe (appels courts compris)
+        return [(list(regions), None)]
+    chunk_seconds = speech / chunk_count
+    # Le recouvrement doit rester plus court qu'un morceau, sinon la découpe n'avance pas
+    overlap = min(overlap, chunk_seconds / 2)
+
+    # Plages trop longues coupées en morceaux qui se recouvrent
+    pieces = []
+    for start, end in regions:
+        cut = None
+        while end - start > chunk_seconds:
+            pieces.append((start, start + chunk_seconds, cut))
+            cut = start + chunk_seconds - overlap / 2
+            start = start + chunk_seconds - overlap
+        pieces.append((start, end, cut))
+
+    # Parole cumulée à chaque frontière ; coupe j au plus près du quantile j / n
+    count = min(chunk_count, len(pieces))
+    cumulative = [0.0]
+    for start, end, _ in pieces:
+        cumulative.append(cumulative[-1] + end - start)
+    total = cumulative[-1]
+    bounds = [0]
+    for j in range(1, count):
+        # Au moins une plage par morceau, avant et après la coupe
+        candidates = range(bounds[-1] + 1, len(pieces) - (count - j) + 1)
+        bounds.append(min(candidates, key=lambda i: abs(cumulative[i] - j * total / count)))
+    bounds.append(len(pieces))
+
+    chunks = []
+    for lo, hi in zip(bounds, bounds[1:]):
+        clips = []
+        for start, end, cut in pieces[lo:hi]:
+            if clips and cut is not None:
+                # Suite d'une plage coupée dans le même morceau : une seule plage, sans recouvrement
+                start = clips.pop()[0]
+            clips.append((start, end))
+        chunks.append((clips, pieces[lo][2]))
+    return chunks
+
+def _words(text: str) -> list:
+    return re.sub(r"[^\w\s']", "", text.lower()).split()
+
+def dedup_overlap(previous: str, text: str) -> str:
+    """Retirer du début de text les mots qui répètent la fin de previous (recouvrement)"""
+    tail, words = _words(previous), text.split()
+    for n in range(min(DEDUP_MAX_WORDS, len(tail), len(words)), DEDUP_MIN_WORDS - 1, -1):
+        if tail[-n:] == _words(" ".join(words[:n])):
+            return " ".join(words[n:])
+    return text
+
+def stitch(chunk_segments: list, cuts: list) -> list:
+    """
+    Recolle les segments des morceaux dans l'ordre.
+
+    Args:
+        chunk_segments (list): Pour chaque morceau, ses segments (start, end, text).
+        cuts (list): Coupe de chaque morceau (voir plan_chunks).
+
+    Returns:
+        list: Segments (start, end, text) sans doublon aux recouvrements.
+    """
+    merged = []
+    for segments, cut in zip(chunk_segments, cuts):
+        if cut is not None:
+            # Chaque segment appartient au morceau qui contient son milieu
+            merged = [s for s in merged if (s[0] + s[1]) / 2 < cut]
+            segments = [s for s in segments if (s[0] + s[1]) / 2 >= cut]
+            if merged and segments:
+                start, end, text = segments[0]
+                segments[0] = (start, end, dedup_overlap(merged[-1][2], text))
+        merged.extend(s for s in segments if s[2])
+    return merged
+
+def _transcribe_chunk(input_path, clips, model_size, compute_type, profile):
+    """Tâche exécutée dans un worker du pool : segments d'un morceau et temps de décodage"""
+    timing = {}
+    segments = list(transcribe_clips(input_path, clips, model_size, compute_type, profile, timing))
+    return segments, timing.get("decode_seconds", 0.0)
+
+def transcribe_segments_chunked(filename: str, model_size: str = None, compute_type: str = None,
+                                trim_result=None, original_path: str = None, profile: str = None,
+                                timing: dict = None) -> list:
+    """
+    Transcrit la parole d'une fiche par morceaux en parallèle dans le pool Whisper.
+
+    Args:
+        filename (str): Nom de base du fichier (sans extension) dans 'data/audio/processed'.
+        model_size (str): Taille du modèle ; WHISPER_MODEL_SIZE par défaut.
+        compute_type (str): Quantification ; WHISPER_COMPUTE_TYPE par défaut.
+        trim_result (TrimResult): Carte des segments de parole (frontières de découpe).
+        original_path (str): Enregistrement original à transcrire à la place du fichier traité.
+        profile (str): Profil de transcription ("fast", "balanced", "accurate").
+        timing (dict): Reçoit decode_seconds, le plus long décodage d'un morceau (morceaux en parallèle).
+
+    Returns:
+        list: Segments (start, end, text) en secondes sur la timeline de l'enregistrement d'origine.
+    """
+    input_path, regions, to_original = transcription_input(filename, trim_result, original_path)
+    speech_seconds = sum(end - start for start, end in regions)
+    # Un morceau par worker, chacun avec au moins WHISPER_CHUNK_MIN_SECONDS de parole
+    chunk_count = max(1, min(WHISPER_POOL_WORKERS, int(speech_seconds // WHISPER_CHUNK_MIN_SECONDS)))
+    chunks = plan_chunks(regions, chunk_count)
+
+    start_time = time.perf_counter()
+    pool = get_pool()
+    futures = [pool.submit(_transcribe_chunk, input_path, clips, model_size, compute_type, profile)
+               for clips, _ in chunks]
+    results = [future.result() for future in futures]
+    segments = stitch([chunk_segments for chunk_segments, _ in results], [cut for _, cut in chunks])
+    if timing is not None:
+        timing["decode_seconds"] = max((seconds for _, seconds in results), default=0.0)
+    elapsed = time.perf_counter() - start_time
+    print(f"[WhisperChunked] {filename} | {speech_seconds:.0f}s speech in {len(chunks)} chunks "
+          f"| {elapsed:.1f}s ({speech_seconds / elapsed if elapsed else 0:.1f}x realtime)")
+
+    if to_original is not None:
+        segments = [(to_original.to_original_time(start), to_original.to_original_time(end, end=True), text)
+                    for start, end, text in segments]
+    return [(round(start, 3), round(end, 3), text) for start, end, text in segments]
+
+def transcribe_audio_chunked(filename: str, model_size: str = None, compute_type: str = None,
+                             trim_result=None, original_path: str = None, profile: str = None,
+                             timing: dict = None) -> str:
+    """
+    Transcrit un fichier traité par morceaux en parallèle (un seul worker sans trim_result).
+
+    Args:
+        filename (str): Nom de base du fichier (sans extension) dans 'data/audio/processed'.
+        model_size (str): Taille du modèle ; WHISPER_MODEL_SIZE par défaut.
+        compute_type (str): Quantification ; WHISPER_COMPUTE_TYPE par défaut.
+        trim_result (TrimResult): Carte des segments de parole (frontières de découpe).
+        original_path (str): Enregistrement original à transcrire à la place du fichier traité.
+        profile (str): Profil de transcription ("fast", "balanced", "accurate").
+        timing (dict): Reçoit decode_seconds (voir transcribe_segments_chunked).
+
+    Returns:
+        str: Chemin vers le fichier texte contenant la transcription.
+    """
+    if trim_result is None:
+        return transcribe_audio_pooled(filename, model_size, compute_type, profile=profile, timing=timing)
+
+    segments = transcribe_segments_chunked(filename, model_size, compute_type, trim_result, original_path, profile,
+                                           timing)
+
+    os.makedirs(TRANSCRIPT_DIR, exist_ok=True)
+    output_path = os.path.join(TRANSCRIPT_DIR, f"{filename}.txt")
+    with open(output_path, "w", encoding="utf-8") as f:
+        for _, _, text in segments:
+            f.write(text + " ")
+
+    if os.path.getsize(output_path) == 0:
+        raise ValueError("Transcription failed or file is empty")
+
+    return output_path
@@ -1,28 +1,215 @@
+"""
+===============================================================
+ Fichier        : convert.py
+ Auteur         : Mohamed-Amine ELGAOUZI
+ Description    : Conversion de l'audio en WAV 16 kHz mono. Le format
+                  réel (conteneur, codec, taux, canaux) est lu dans
+                  les premiers octets du fichier plutôt que déduit de
+                  l'extension, et seule la conversion nécessaire est
+                  effectuée.
+ Créé le        : 16/10/2025
+ Dernière maj   : 18/10/2026
+===============================================================
+ Dépendances    :
+ - os
+ - struct
+ - dataclasses
+ - service.download_cache
+ - service.decode
+ - utils.silence_trimmer
+
+ Fonctionnalités clés :
+ - sniff_audio : reconnaît WAV (PCM, float, A-law, µ-law, extensible,
+   RIFX gros-boutiste), MP3, FLAC, Ogg (Opus, Vorbis, FLAC) et MP4 à
+   partir de l'en-tête
+ - Plan de conversion : "skip" (déjà en place), "link" (déjà au format
+   cible : lien physique au lieu d'une copie), "transcode" (service.decode)
+ - convert_and_trim (étape 2 du pipeline hors STREAM_PIPELINE) : le
+   trimmer lit directement tout WAV PCM (il normalise lui-même) ; sinon
+   le PCM décodé en flux est envoyé au trimmer, sans fichier intermédiaire
+
+ Notes :
+ - Format cible : WAV PCM 16 bits, 16 kHz, mono.
+ - Un WAV RIFX n'est jamais lu par le module wave : il passe par le
+   décodeur ("transcode").
+ - Le décodage écrit dans un fichier temporaire puis le renomme : un
+   WAV hors format déjà placé dans 'data/audio/processed' est converti
+   sur place sans être tronqué avant lecture.
+ - Le plan "link" est sûr : les écrivains de 'data/audio/processed'
+   (décodeur, trimmer) remplacent le fichier (os.replace) au lieu de
+   le réécrire, la source liée n'est donc jamais modifiée.
+===============================================================
+"""
+
 import os
-import subprocess
+import struct
+from dataclasses import dataclass
+from typing import Optional
+from service.download_cache import link_or_copy
+from service.decode import open_pcm_wav, decode_to_wav
+from utils.silence_trimmer import trim_silence, trim_silence_stream, TrimResult
 
 PROCESSED_DIR = "data/audio/processed"
 
+# Octets lus pour identifier le format
+SNIFF_BYTES = 4096
+
+TARGET_SAMPLE_RATE = 16000
+TARGET_CHANNELS = 1
+
+# Codes de format WAVE (champ wFormatTag du chunk 'fmt ')
+WAV_CODECS = {
+    0x0001: "pcm",
+    0x0003: "pcm_float",
+    0x0006: "alaw",
+    0x0007: "mulaw",
+    0x0055: "mp3",
+}
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+@dataclass
+class AudioInfo:
+    """Format réel d'un fichier audio, lu dans son en-tête"""
+    container: str
+    codec: str
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+    sample_width: Optional[int] = None  # octets par échantillon (PCM)
+    extensible: bool = False
+    big_endian: bool = False  # RIFX
+
+    @property
+    def is_pcm_wav(self) -> bool:
+        """WAV PCM entier lisible par le module wave (donc par le trimmer)"""
+        return (self.container == "wav" and self.codec == "pcm"
+                and not self.extensible and not self.big_endian)
+
+    @property
+    def is_target(self) -> bool:
+        """Déjà au format cible : WAV PCM 16 bits, 16 kHz, mono"""
+        return (self.is_pcm_wav and self.sample_width == 2
+                and self.sample_rate == TARGET_SAMPLE_RATE and self.channels == TARGET_CHANNELS)
+
+def _sniff_wav(header: bytes) -> AudioInfo:
+    # RIFX : mêmes chunks que RIFF mais entiers gros-boutistes (PCM compris)
+    big_endian = header[:4] == b"RIFX"
+    order = ">" if big_endian else "<"
+    offset = 12
+    while offset + 8 <= len(header):
+        chunk_id = header[offset:offset + 4]
+        chunk_size = struct.unpack_from(order + "I", header, offset + 4)[0]
+        data_offset = offset + 8
+        if chunk_id == b"fmt " and data_offset + 16 <= len(header):
+            tag, channels, rate, _, _, bits = struct.unpack_from(order + "HHIIHH", header, data_offset)
+            extensible = tag == WAVE_FORMAT_EXTENSIBLE
+            if extensible and data_offset + 26 <= len(header):
+                tag = struct.unpack_from(order + "H", header, data_offset + 24)[0]  # début du GUID SubFormat
+            codec = WAV_CODECS.get(tag, f"wav_0x{tag:04x}")
+            return AudioInfo("wav", codec, rate, channels, (bits + 7) // 8, extensible, big_endian)
+        offset = data_offset + chunk_size + (chunk_size & 1)
+    return AudioInfo("wav", "unknown", big_endian=big_endian)
+
+def sniff_audio(header: bytes) -> AudioInfo:
+    """
+    Identifie le conteneur et le codec d'un fichier audio à partir de ses premiers octets.
+
+    Args:
+        header (bytes): Début du fichier (SNIFF_BYTES octets suffisent).
+
+    Returns:
+        AudioInfo: Conteneur, codec et, pour le WAV, taux / canaux / largeur.
+    """
+    if header[:4] in (b"RIFF", b"RIFX") and header[8:12] == b"WAVE":
+        return _sniff_wav(header)
+    if header[:4] == b"fLaC":
+        return AudioInfo("flac", "flac")
+    if header[:4] == b"OggS":
+        # Le premier paquet (page 0) annonce le codec
+        for magic, codec in ((b"OpusHead", "opus"), (b"\x01vorbis", "vorbis"), (b"\x7fFLAC", "flac")):
+            if magic in header[:128]:
+                return AudioInfo("ogg", codec)
+        return AudioInfo("ogg", "unknown")
+    if header[:3] == b"ID3" or (len(header) > 1 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0):
+        return AudioInfo("mp3", "mp3")
+    if header[4:8] == b"ftyp":
+        return AudioInfo("mp4", "unknown")
+    return AudioInfo("unknown", "unknown")
+
+def probe_file(path: str) -> AudioInfo:
+    """Lire l'en-tête d'un fichier et identifier son format"""
+    with open(path, "rb") as f:
+        return sniff_audio(f.read(SNIFF_BYTES))
+
+def plan_conversion(info: AudioInfo, input_path: str, output_path: str) -> str:
+    """Choisir l'opération minimale : "skip", "link" ou "transcode" """
+    if not info.is_target:
+        return "transcode"
+    if os.path.exists(output_path) and os.path.samefile(input_path, output_path):
+        return "skip"
+    return "link"
+
+def _log_plan(input_path: str, info: AudioInfo, plan: str) -> None:
+    details = f"{info.container}/{info.codec}"
+    if info.sample_rate:
+        details += f" {info.sample_rate} Hz {info.channels} ch {8 * info.sample_width} bits"
+    print(f"[Convert] {os.path.basename(input_path)} | {details} | plan: {plan}")
+
 def convert_to_wav(input_path: str, filename: str) -> str:
-    os.makedirs(PROCESSED_DIR, exist_ok=True)
+    """
+    Produit un WAV 16 kHz mono dans 'data/audio/processed' avec le minimum de travail.
+
+    Args:
+        input_path (str): Fichier audio source (tout format lu par ffmpeg).
+        filename (str): Nom de base du fichier de sortie (sans extension).
 
-    ext = os.path.splitext(input_path)[1].lower()
+    Returns:
+        str: Chemin du WAV 16 kHz mono.
+    """
+    os.makedirs(PROCESSED_DIR, exist_ok=True)
     output_path = os.path.join(PROCESSED_DIR, f"{filename}.wav")
 
-    if ext == ".wav":
-        # 🔎 Vérifier si déjà en 16kHz mono
-        # ffprobe serait plus précis, mais on simplifie ici
-        if os.path.abspath(input_path) != os.path.abspath(output_path):
-            # Copier le fichier sans reconversion
-            import shutil
-            shutil.copy(input_path, output_path)
-        return output_path
-
-    # Si ce n’est pas un WAV, on convertit avec ffmpeg
-    subprocess.run([
-        "ffmpeg", "-y", "-i", input_path,
-        "-ar", "16000", "-ac", "1",  # 16kHz, mono
-        output_path
-    ], check=True)
+    info = probe_file(input_path)
+    plan = plan_conversion(info, input_path, output_path)
+    _log_plan(input_path, info, plan)
+
+    if plan == "link":
+        # Déjà au bon format : lien physique (copie seulement si autre volume)
+        link_or_copy(input_path, output_path)
+    elif plan == "transcode":
+        # Décodeur en process (PyAV) ou ffmpeg, 16kHz mono
+        decode_to_wav(input_path, output_path, sample_rate=TARGET_SAMPLE_RATE)
 
     return output_path
+
+def convert_and_trim(input_path: str, filename: str, energy_gate: bool = False, workers: int = 1,
+                     single_pass: bool = False) -> TrimResult:
+    """
+    Convertit si nécessaire et supprime les silences, sans WAV intermédiaire.
+
+    Un WAV PCM (quel que soit son taux, ses canaux ou sa largeur) est lu
+    directement par le trimmer, qui le normalise en flux. Les autres formats
+    sont décodés en flux (service.decode) et le PCM est lu par le trimmer au
+    fur et à mesure.
+
+    Args:
+        input_path (str): Fichier audio source.
+        filename (str): Nom de base du fichier traité (sans extension).
+        energy_gate (bool): Active le pré-filtre énergétique du trimmer.
+        workers (int): VAD parallèle (approché) pour un WAV PCM lu directement ; 1 par défaut.
+        single_pass (bool): Une classification VAD par frame (plus rapide, sortie approchée).
+
+    Returns:
+        TrimResult: Résultat du trimmer (chemin, durées, segments de parole).
+    """
+    os.makedirs(PROCESSED_DIR, exist_ok=True)
+    output_path = os.path.join(PROCESSED_DIR, f"{filename}.wav")
+    info = probe_file(input_path)
+
+    if info.is_pcm_wav:
+        _log_plan(input_path, info, "trim")
+        return trim_silence(input_path, streaming=True, energy_gate=energy_gate, workers=workers,
+                            output_path=output_path, single_pass=single_pass)
+
+    _log_plan(input_path, info, "decode | stream -> trim")
+    with open_pcm_wav(input_path, sample_rate=TARGET_SAMPLE_RATE) as stream:
+        return trim_silence_stream(stream, output_path, energy_gate=energy_gate, single_pass=single_pass)
@@ -0,0 +1,277 @@
+"""
+===============================================================
+ Fichier        : decode.py
+ Auteur         : Mohamed-Amine ELGAOUZI
+ Description    : Service de décodage audio vers PCM 16 bits mono
+                  16 kHz, en flux. Décodeur en process (PyAV, sans
+                  lancement de process ni sondage de codec répété)
+                  avec repli sur ffmpeg en sous-process.
+ Créé le        : 18/10/2026
+ Dernière maj   : 18/10/2026
+===============================================================
+ Dépendances    :
+ - os
+ - time
+ - wave
+ - struct
+ - threading
+ - subprocess
+ - contextlib
+ - dotenv
+ - av (PyAV, optionnel ; déjà requis par faster-whisper)
+ - ffmpeg (binaire système, repli)
+
+ Fonctionnalités clés :
+ - Source : chemin de fichier ou flux en lecture (read()), p. ex. le
+   flux d'un backend de service.sources
+ - open_pcm_wav : flux WAV (en-tête + PCM) lisible par le module wave,
+   donc directement par trim_silence_stream
+ - decode_to_wav : décodage vers un fichier WAV
+ - Au plus DECODE_WORKERS décodages simultanés (les suivants attendent)
+ - Débit mesuré à chaque décodage (secondes audio, temps CPU, facteur
+   temps réel) et cumuls via decode_stats()
+
+ Notes :
+ - DECODE_BACKEND : "auto" (PyAV si installé, ffmpeg sinon), "av"
+   ou "ffmpeg".
+ - Le temps CPU est celui du seul décodage : temps CPU du thread pendant
+   le décodage (PyAV) ou rusage du process ffmpeg.
+ - Utilisé par service.convert, l'ingestion MP3 de service.download et
+   utils.trim_batch.
+===============================================================
+"""
+
+import os
+import time
+import wave
+import struct
+import threading
+import subprocess
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+try:
+    import av
+except ImportError:
+    av = None
+
+load_dotenv()
+DECODE_BACKEND = os.getenv("DECODE_BACKEND", "auto").lower()
+DECODE_WORKERS = int(os.getenv("DECODE_WORKERS", str(os.cpu_count() or 2)))
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+CHUNK_SIZE = 64 * 1024
+
+_slots = threading.BoundedSemaphore(DECODE_WORKERS)
+_totals_lock = threading.Lock()
+_totals = {"decodes": 0, "audio_seconds": 0.0, "cpu_seconds": 0.0, "wall_seconds": 0.0}
+
+def decode_backend() -> str:
+    """Backend effectif selon DECODE_BACKEND et la présence de PyAV"""
+    if DECODE_BACKEND == "ffmpeg" or (DECODE_BACKEND == "auto" and av is None):
+        return "ffmpeg"
+    if av is None:
+        raise RuntimeError("DECODE_BACKEND=av requires PyAV (pip install av)")
+    return "av"
+
+def wav_stream_header(sample_rate: int = SAMPLE_RATE) -> bytes:
+    """En-tête WAV PCM 16 bits mono de taille inconnue (écriture en flux)"""
+    return (b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE"
+            + b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, sample_rate, sample_rate * SAMPLE_WIDTH, SAMPLE_WIDTH, 16)
+            + b"data" + struct.pack("<I", 0xFFFFFFFF))
+
+def _thread_cpu_timed(chunks, stats):
+    """Compter dans stats["cpu_seconds"] le temps CPU du thread passé à produire chaque élément"""
+    try:
+        while True:
+            cpu = time.thread_time()
+            chunk = next(chunks, None)
+            stats["cpu_seconds"] += time.thread_time() - cpu
+            if chunk is None:
+                return
+            yield chunk
+    finally:
+        chunks.close()
+
+def _decode_av(source, sample_rate):
+    """Décoder avec PyAV dans le thread appelant"""
+    container = av.open(source, mode="r")
+    try:
+        stream = container.streams.audio[0]
+        resampler = av.AudioResampler(format="s16", layout="mono", rate=sample_rate)
+        for frame in container.decode(stream):
+            for out in resampler.resample(frame):
+                yield out.to_ndarray().tobytes()
+        for out in resampler.resample(None):  # vider le rééchantillonneur
+            yield out.to_ndarray().tobytes()
+    finally:
+        container.close()
+
+def _decode_ffmpeg(source, sample_rate, stats):
+    """Décoder avec un sous-process ffmpeg ; un thread alimente son entrée si la source est un flux"""
+    is_path = isinstance(source, str)
+    proc = subprocess.Popen([
+        "ffmpeg", "-loglevel", "error", "-i", source if is_path else "pipe:0",
+        "-ar", str(sample_rate), "-ac", "1", "-f", "s16le", "pipe:1"
+    ], stdin=subprocess.DEVNULL if is_path else subprocess.PIPE, stdout=subprocess.PIPE)
+
+    errors = []
+
+    def feed():
+        try:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                proc.stdin.write(chunk)
+        except BrokenPipeError:
+            pass  # ffmpeg s'est arrêté : son code de sortie dira pourquoi
+        except Exception as e:
+            errors.append(e)
+        finally:
+            try:
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass
+
+    writer = None
+    if not is_path:
+        writer = threading.Thread(target=feed, daemon=True)
+        writer.start()
+    try:
+        while True:
+            chunk = proc.stdout.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    except BaseException:
+        proc.kill()
+        raise
+    finally:
+        if writer:
+            writer.join()
+        proc.stdout.close()
+        # wait4 plutôt que wait : rusage du seul process ffmpeg
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        stats["cpu_seconds"] += usage.ru_utime + usage.ru_stime
+
+    if errors:
+        raise errors[0]
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, "ffmpeg")
+
+def decode_pcm(source, name: str = None, sample_rate: int = SAMPLE_RATE, stats: dict = None):
+    """
+    Générateur de PCM 16 bits mono (octets bruts) décodé depuis un fichier ou un flux.
+
+    Args:
+        source (str | flux): Chemin du fichier ou objet exposant read().
+        name (str): Nom affiché dans le rapport de débit.
+        sample_rate (int): Taux de sortie (16 kHz par défaut).
+        stats (dict): Rempli à la fin : backend, audio_seconds, cpu_seconds,
+            wall_seconds, realtime_factor.
+    """
+    stats = {} if stats is None else stats
+    backend = decode_backend()
+    stats.update(backend=backend, audio_seconds=0.0, cpu_seconds=0.0)
+    name = name or (os.path.basename(source) if isinstance(source, str) else "stream")
+
+    with _slots:
+        start = time.perf_counter()
+        decoded = 0
+        if backend == "av":
+            chunks = _thread_cpu_timed(_decode_av(source, sample_rate), stats)
+        else:
+            chunks = _decode_ffmpeg(source, sample_rate, stats)
+        try:
+            for chunk in chunks:
+                decoded += len(chunk)
+                yield chunk
+        finally:
+            chunks.close()  # arrêt anticipé : libérer le décodeur (process ffmpeg) tout de suite
+        wall = time.perf_counter() - start
+
+    audio_seconds = decoded / (SAMPLE_WIDTH * sample_rate)
+    stats.update(audio_seconds=audio_seconds, wall_seconds=wall,
+                 realtime_factor=audio_seconds / stats["cpu_seconds"] if stats["cpu_seconds"] else 0.0)
+    with _totals_lock:
+        _totals["decodes"] += 1
+        _totals["audio_seconds"] += audio_seconds
+        _totals["cpu_seconds"] += stats["cpu_seconds"]
+        _totals["wall_seconds"] += wall
+    print(f"[Decode] {name} | {backend} | {audio_seconds:.1f}s audio | CPU {stats['cpu_seconds']:.2f}s "
+          f"({stats['realtime_factor']:.0f}x realtime) | wall {wall:.2f}s")
+
+def decode_stats() -> dict:
+    """Cumuls depuis le démarrage : décodages, secondes audio, CPU et débit (secondes audio / seconde CPU)"""
+    with _totals_lock:
+        totals = dict(_totals)
+    totals["backend"] = decode_backend()
+    totals["workers"] = DECODE_WORKERS
+    totals["throughput"] = totals["audio_seconds"] / totals["cpu_seconds"] if totals["cpu_seconds"] else 0.0
+    return totals
+
+class PcmWavStream:
+    """Flux WAV en lecture (en-tête de taille inconnue puis PCM décodé à la demande)"""
+
+    def __init__(self, chunks, sample_rate=SAMPLE_RATE):
+        self._chunks = chunks
+        self._buffer = bytearray(wav_stream_header(sample_rate))
+
+    def read(self, size=-1):
+        while size is None or size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size is None or size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+@contextmanager
+def open_pcm_wav(source, name: str = None, sample_rate: int = SAMPLE_RATE):
+    """
+    Ouvre un flux WAV 16 bits mono décodé à la volée, à passer à trim_silence_stream.
+
+    Le flux expose stats (voir decode_pcm), complété une fois le décodage terminé.
+    """
+    stats = {}
+    chunks = decode_pcm(source, name, sample_rate, stats)
+    stream = PcmWavStream(chunks, sample_rate)
+    stream.stats = stats
+    try:
+        yield stream
+        for _ in chunks:
+            pass  # décoder la fin : stats complètes et erreurs de décodage remontées
+    finally:
+        chunks.close()
+
+def decode_to_wav(source, output_path: str, name: str = None, sample_rate: int = SAMPLE_RATE) -> dict:
+    """
+    Décode un fichier ou un flux vers un fichier WAV 16 bits mono.
+
+    Le WAV est écrit dans un fichier temporaire voisin puis renommé : la
+    source peut être output_path lui-même sans être tronquée avant lecture.
+
+    Returns:
+        dict: Statistiques du décodage (voir decode_pcm).
+    """
+    stats = {}
+    tmp_path = f"{output_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with wave.open(tmp_path, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(SAMPLE_WIDTH)
+            wf.setframerate(sample_rate)
+            for chunk in decode_pcm(source, name, sample_rate, stats):
+                wf.writeframesraw(chunk)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return stats
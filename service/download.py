@@ -7,64 +7,264 @@
                   'data/audio/raw'. Gère automatiquement la conversion
                   d'URL MP3 vers WAV ORIG.
  Créé le        : 16/10/2025
- Dernière maj   : 16/10/2025
+ Dernière maj   : 18/10/2026
 ===============================================================
  Dépendances    :
  - os
- - requests
+ - time
+ - struct
+ - dotenv
+ - service.decode
+ - utils.silence_trimmer
+ - service.sources
 
  Fonctionnalités clés :
  - Vérifie l'extension du fichier (MP3 ou WAV)
  - Rebasculer automatiquement les fichiers MP3 vers leur version WAV ORIG
  - Crée le répertoire de destination s’il n’existe pas
  - Télécharge le fichier en streaming et vérifie qu’il n’est pas vide
+ - Session HTTP partagée (keep-alive, timeouts, retries avec backoff)
+ - Mode fusionné téléchargement + suppression des silences sans fichier brut
+ - Cache local optionnel avec revalidation conditionnelle (DOWNLOAD_CACHE=1)
+ - Sources http(s)://, file:// (partage monté, sans copie) et s3://
+   via service.sources ; validate_audio_url refuse les sources non
+   autorisées avant la mise en file
+ - Politique d'ingestion "mp3" : télécharge le MP3 (bien plus léger que
+   le WAV ORIG) et le décode à la volée en PCM 16 kHz mono (service.decode),
+   avec rapport des octets transférés et du temps CPU de décodage
+ - Estimation de la durée avant téléchargement (en-tête WAV lu par
+   requête partielle, repli sur la taille totale) pour l'ordonnanceur
 
  Notes :
  - Utilisé par le pipeline de traitement audio avant transcription.
+ - Les réécritures ORIG / MP3 ne s'appliquent qu'aux URL http(s) du
+   serveur d'enregistrements ; file:// et s3:// sont utilisées telles
+   quelles.
 ===============================================================
 """
 
 import os
-import requests
+import time
+import struct
+from dotenv import load_dotenv
+from service.decode import open_pcm_wav, decode_to_wav
+from utils.silence_trimmer import trim_silence_stream, TrimResult, PROCESSED_DIR
+from urllib.parse import urlparse
+from service.sources import get_source, check_source_url
 
 # Répertoire de destination des fichiers audio téléchargés
 DATA_DIR = "data/audio/raw"
 
-def download_audio(url: str, filename: str) -> str:
-    os.makedirs(DATA_DIR, exist_ok=True)
+load_dotenv()
+# Politique d'ingestion : "orig" (WAV ORIG, bande passante) ou "mp3" (MP3 décodé, CPU)
+INGEST_POLICY = os.getenv("INGEST_POLICY", "orig").lower()
+INGEST_POLICIES = ("orig", "mp3")
+# Estimation de durée : octets d'en-tête lus, débit supposé (octets/s) si l'en-tête est illisible
+PROBE_HEADER_BYTES = int(os.getenv("PROBE_HEADER_BYTES", "4096"))
+PROBE_FALLBACK_BYTE_RATE = int(os.getenv("PROBE_FALLBACK_BYTE_RATE", "16000"))  # 8 kHz, 16 bits, mono
+
+def _is_recordings_url(url: str) -> bool:
+    """Les réécritures /ORIG/ et /MP3/ ne concernent que le serveur d'enregistrements HTTP(S)"""
+    return urlparse(url).scheme.lower() in ("http", "https")
 
+def resolve_orig_url(url: str) -> str:
+    """Retourner l'URL du WAV ORIG correspondant à une URL d'enregistrement MP3 ou WAV"""
+    if not _is_recordings_url(url):
+        return url  # file:// et s3:// désignent directement le fichier à traiter
     ext = os.path.splitext(url)[1].lower()  # get extension from url (.mp3 or .wav)
-    
+
     if ext not in [".mp3", ".wav"]:
         raise ValueError("Unsupported file type")
 
     #  Construire l'URL ORIG en fonction de l'extension
     if ext == ".mp3":
-        orig_url = url.replace("/MP3/", "/ORIG/").replace(".mp3", ".wav")
-        ext = ".wav"  # force WAV extension
-    elif ext == ".wav":
+        return url.replace("/MP3/", "/ORIG/").replace(".mp3", ".wav")
     # Insert /ORIG/ if not already in URL
-        if "/ORIG/" not in url:
-            orig_url = url.replace("/RECORDINGS/", "/RECORDINGS/ORIG/")
-        else:
-            orig_url = url
-    else:
-        orig_url = url
+    if "/ORIG/" not in url:
+        return url.replace("/RECORDINGS/", "/RECORDINGS/ORIG/")
+    return url
+
+def resolve_mp3_url(url: str) -> str:
+    """Retourner l'URL MP3 correspondant à une URL d'enregistrement MP3 ou WAV (ORIG ou non)"""
+    if not _is_recordings_url(url):
+        return url
+    ext = os.path.splitext(url)[1].lower()
+
+    if ext not in [".mp3", ".wav"]:
+        raise ValueError("Unsupported file type")
+
+    if ext == ".mp3":
+        return url
+    # Extension remplacée telle quelle (.wav ou .WAV), jamais ailleurs dans l'URL
+    base = os.path.splitext(url)[0]
+    if "/ORIG/" in base:
+        return base.replace("/ORIG/", "/MP3/") + ".mp3"
+    return base.replace("/RECORDINGS/", "/RECORDINGS/MP3/") + ".mp3"
+
+def validate_audio_url(url: str) -> None:
+    """
+    Refuse (ValueError) une URL d'enregistrement inutilisable ou non autorisée.
+
+    Appelé par POST /process avant la mise en file : extension non gérée sur
+    le serveur d'enregistrements, schéma inconnu, fichier hors de
+    SOURCE_FILE_ROOT ou bucket S3 non autorisé.
+    """
+    check_source_url(resolve_orig_url(url))
+
+def wav_duration_from_header(header: bytes, total_size: int = None) -> float:
+    """
+    Calcule la durée d'un WAV PCM à partir de ses premiers octets.
+
+    Args:
+        header (bytes): Début du fichier (au moins jusqu'à l'en-tête du chunk 'data').
+        total_size (int): Taille totale du fichier, si connue ; utilisée quand
+            la taille du chunk 'data' est absente (écriture en flux) ou incohérente.
+
+    Returns:
+        float: Durée estimée en secondes.
+    """
+    if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+        raise ValueError("Not a WAV header")
+
+    byte_rate = None
+    offset = 12
+    while offset + 8 <= len(header):
+        chunk_id = header[offset:offset + 4]
+        chunk_size = struct.unpack_from("<I", header, offset + 4)[0]
+        data_offset = offset + 8
+        if chunk_id == b"fmt " and data_offset + 12 <= len(header):
+            byte_rate = struct.unpack_from("<I", header, data_offset + 8)[0]
+        elif chunk_id == b"data":
+            if not byte_rate:
+                raise ValueError("WAV header has no usable fmt chunk")
+            if total_size and (chunk_size in (0, 0xFFFFFFFF) or chunk_size > total_size - data_offset):
+                chunk_size = total_size - data_offset
+            return chunk_size / byte_rate
+        offset = data_offset + chunk_size + (chunk_size & 1)  # chunks alignés sur 2 octets
+    raise ValueError("WAV data chunk not found in header")
+
+def probe_duration(url: str) -> float:
+    """
+    Estime la durée d'un enregistrement sans le télécharger.
+
+    Lit l'en-tête du WAV ORIG par requête partielle (Range) ; si l'en-tête
+    est illisible, la durée est déduite de la taille totale et de
+    PROBE_FALLBACK_BYTE_RATE.
+
+    Args:
+        url (str): URL de l'enregistrement (MP3 ou WAV, tout backend).
+
+    Returns:
+        float: Durée estimée en secondes.
+    """
+    orig_url = resolve_orig_url(url)
+    header, total_size = get_source(orig_url).read_head(orig_url, PROBE_HEADER_BYTES)
+    try:
+        return wav_duration_from_header(header, total_size)
+    except ValueError:
+        if not total_size:
+            raise
+        return total_size / PROBE_FALLBACK_BYTE_RATE
+
+def resolve_policy(policy: str = None) -> str:
+    """Valider la politique d'ingestion demandée (INGEST_POLICY par défaut)"""
+    policy = (policy or INGEST_POLICY).lower()
+    if policy not in INGEST_POLICIES:
+        raise ValueError(f"Unsupported ingest policy: {policy}")
+    return policy
+
+def _log_ingest(filename: str, bytes_transferred: int, stats: dict) -> None:
+    print(f"[Ingest] {filename} | policy mp3 | {bytes_transferred} bytes transferred "
+          f"| decode CPU {stats['cpu_seconds']:.2f}s ({stats['backend']}) | wall {stats['wall_seconds']:.2f}s")
+
+def download_mp3_audio(url: str, filename: str) -> str:
+    """
+    Télécharge le MP3 d'un enregistrement et le décode en WAV PCM 16 kHz mono.
+
+    Args:
+        url (str): URL de l'enregistrement (MP3 ou WAV).
+        filename (str): Nom de base du fichier local (sans extension).
+
+    Returns:
+        str: Chemin du WAV décodé dans 'data/audio/raw'.
+    """
+    os.makedirs(DATA_DIR, exist_ok=True)
+    filepath = os.path.join(DATA_DIR, filename + ".wav")
+
+    mp3_url = resolve_mp3_url(url)
+    with get_source(mp3_url).open(mp3_url) as stream:
+        stats = decode_to_wav(stream, filepath, name=filename)
+
+    if stream.bytes_read == 0:
+        raise ValueError("Downloaded file is empty")
+    _log_ingest(filename, stream.bytes_read, stats)
+    return filepath
+
+def download_audio(url: str, filename: str, policy: str = None) -> str:
+    if resolve_policy(policy) == "mp3":
+        # MP3 décodé à la volée : moins de bande passante, plus de CPU
+        filepath = download_mp3_audio(url, filename)
+        if os.path.getsize(filepath) == 0:
+            raise ValueError("Decoded file is empty")
+        return filepath
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+
+    orig_url = resolve_orig_url(url)
+    ext = ".wav"  # force WAV extension
 
     # Construire le chemin local du fichier
     filepath = os.path.join(DATA_DIR, filename + ext)
 
-    # Télécharger le fichier en streaming
-    response = requests.get(orig_url, stream=True)
-    response.raise_for_status()  # raise error if request failed
-
-    # Écrire le contenu dans le fichier local
-    with open(filepath, "wb") as f:
-        for chunk in response.iter_content(chunk_size=8192):
-            f.write(chunk)
+    # Backend selon le schéma : HTTP (cache, segments), file:// (lien physique
+    # ou lecture directe du partage), s3:// ; filepath peut alors être le fichier source
+    filepath = get_source(orig_url).fetch(orig_url, filepath)
 
     # Vérifier que le fichier téléchargé n’est pas vide
     if os.path.getsize(filepath) == 0:
         raise ValueError("Downloaded file is empty")
 
     return filepath
+
+def stream_trim_audio(url: str, filename: str, energy_gate: bool = False, policy: str = None,
+                      single_pass: bool = False) -> TrimResult:
+    """
+    Télécharge et supprime les silences en une seule passe, sans fichier brut.
+
+    Le WAV ORIG est lu directement depuis la source (HTTP, fichier, S3) : l'en-tête est
+    analysé au fil de l'eau et les frames passent dans le VAD à mesure
+    qu'elles arrivent. Seul le fichier traité est écrit dans 'data/audio/processed'.
+
+    Args:
+        url (str): URL de l'enregistrement (MP3 ou WAV).
+        filename (str): Nom de base du fichier traité (sans extension).
+        energy_gate (bool): Active le pré-filtre énergétique du trimmer.
+        policy (str): Politique d'ingestion ("orig" ou "mp3") ; INGEST_POLICY par défaut.
+            En "mp3", le MP3 est décodé à la volée (service.decode) et le PCM alimente le VAD.
+        single_pass (bool): Une classification VAD par frame (plus rapide, sortie approchée).
+
+    Returns:
+        TrimResult: Résultat du trimmer (chemin, durées, segments de parole).
+    """
+    output_path = os.path.join(PROCESSED_DIR, filename + ".wav")
+
+    if resolve_policy(policy) == "mp3":
+        mp3_url = resolve_mp3_url(url)
+        with get_source(mp3_url).open(mp3_url) as stream:
+            with open_pcm_wav(stream, name=filename) as pcm:
+                result = trim_silence_stream(pcm, output_path, energy_gate=energy_gate, single_pass=single_pass)
+        if stream.bytes_read == 0:
+            raise ValueError("Downloaded file is empty")
+        _log_ingest(filename, stream.bytes_read, pcm.stats)
+        return result
+
+    orig_url = resolve_orig_url(url)
+
+    start = time.perf_counter()
+    with get_source(orig_url).open(orig_url) as reader:
+        result = trim_silence_stream(reader, output_path, energy_gate=energy_gate, single_pass=single_pass)
+
+    if reader.bytes_read == 0:
+        raise ValueError("Downloaded file is empty")
+    print(f"[Download] {filename} | streamed {reader.bytes_read} bytes into VAD in {time.perf_counter() - start:.2f}s")
+    return result
@@ -0,0 +1,177 @@
+"""
+===============================================================
+ Fichier        : download_cache.py
+ Auteur         : Mohamed-Amine ELGAOUZI
+ Description    : Cache local des enregistrements téléchargés,
+                  indexé par l'URL ORIG. Un enregistrement déjà en
+                  cache est revalidé par requête conditionnelle
+                  (ETag / Last-Modified) : un 304 évite de
+                  retélécharger tout le WAV.
+ Créé le        : 18/10/2026
+ Dernière maj   : 18/10/2026
+===============================================================
+ Dépendances    :
+ - os
+ - json
+ - shutil
+ - hashlib
+ - threading
+ - dotenv
+ - service.http_client
+
+ Fonctionnalités clés :
+ - Clé de cache : SHA-256 de l'URL ORIG
+ - Métadonnées (ETag, Last-Modified, taille) dans un .json à côté
+ - Revalidation If-None-Match / If-Modified-Since
+ - Éviction LRU (date de dernière utilisation) sous un quota disque
+ - Écriture atomique (fichier temporaire puis renommage)
+ - Lien vers la destination sous le verrou de la clé : une entrée en
+   cours d'utilisation n'est jamais évincée
+
+ Notes :
+ - Activé par DOWNLOAD_CACHE=1 ; quota via DOWNLOAD_CACHE_MAX_BYTES.
+ - Le dossier de cache n'est pas nettoyé par file_cleanup.py :
+   sa taille est bornée par le quota.
+===============================================================
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import threading
+from dotenv import load_dotenv
+from service.http_client import download_file
+
+CACHE_DIR = "data/audio/cache"
+
+load_dotenv()
+DOWNLOAD_CACHE = os.getenv("DOWNLOAD_CACHE", "0") == "1"
+DOWNLOAD_CACHE_MAX_BYTES = int(os.getenv("DOWNLOAD_CACHE_MAX_BYTES", str(5 * 1024 ** 3)))
+
+# Un verrou par clé : deux jobs sur la même URL ne téléchargent qu'une fois
+_key_locks = {}
+_key_locks_lock = threading.Lock()
+_evict_lock = threading.Lock()
+
+def cache_key(url: str) -> str:
+    """Clé de cache d'une URL ORIG"""
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+def _key_lock(key: str) -> threading.Lock:
+    with _key_locks_lock:
+        return _key_locks.setdefault(key, threading.Lock())
+
+def _read_meta(meta_path: str) -> dict:
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def cached_fetch(url: str, filepath: str) -> str:
+    """
+    Télécharge ou revalide l'enregistrement dans le cache, puis le lie à filepath.
+
+    Le lien est créé sous le verrou de la clé : une éviction lancée par un
+    autre job ne peut pas supprimer l'entrée entre la revalidation et le lien.
+
+    Args:
+        url (str): URL ORIG de l'enregistrement.
+        filepath (str): Chemin de destination (lien physique, ou copie).
+
+    Returns:
+        str: filepath.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    key = cache_key(url)
+    data_path = os.path.join(CACHE_DIR, key + ".audio")
+    meta_path = os.path.join(CACHE_DIR, key + ".json")
+
+    with _key_lock(key):
+        meta = _read_meta(meta_path) if os.path.exists(data_path) else {}
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+        tmp_path = f"{data_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            response = download_file(url, tmp_path, headers=headers or None)
+            if response.status_code == 304:
+                print(f"[Cache] hit (304) {url}")
+            else:
+                if os.path.getsize(tmp_path) == 0:
+                    raise ValueError("Downloaded file is empty")
+                os.replace(tmp_path, data_path)
+                meta = {
+                    "url": url,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "size": os.path.getsize(data_path),
+                }
+                with open(meta_path, "w", encoding="utf-8") as f:
+                    json.dump(meta, f)
+                print(f"[Cache] miss, stored {meta['size']} bytes for {url}")
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        # mtime du fichier = date de dernière utilisation (pour l'éviction LRU)
+        os.utime(data_path)
+        link_or_copy(data_path, filepath)
+
+    evict(keep=key)
+    return filepath
+
+def evict(max_bytes: int = None, keep: str = None) -> None:
+    """
+    Supprime les entrées les moins récemment utilisées au-delà du quota.
+
+    Une entrée dont le verrou est tenu (revalidation ou lien en cours dans
+    cached_fetch) est ignorée.
+
+    Args:
+        max_bytes (int): Quota en octets ; DOWNLOAD_CACHE_MAX_BYTES par défaut.
+        keep (str): Clé à ne jamais évincer (entrée en cours d'utilisation).
+    """
+    max_bytes = DOWNLOAD_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    with _evict_lock:
+        entries = []
+        for name in os.listdir(CACHE_DIR):
+            if not name.endswith(".audio"):
+                continue
+            path = os.path.join(CACHE_DIR, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name[:-len(".audio")]))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in sorted(entries):
+            if total <= max_bytes:
+                break
+            lock = _key_lock(key)
+            if key == keep or not lock.acquire(blocking=False):
+                continue
+            try:
+                for ext in (".audio", ".json"):
+                    try:
+                        os.remove(os.path.join(CACHE_DIR, key + ext))
+                    except OSError:
+                        pass
+            finally:
+                lock.release()
+            total -= size
+            print(f"[Cache] evicted {key} ({size} bytes)")
+
+def link_or_copy(src: str, dst: str) -> None:
+    """Créer dst comme lien physique vers src (copie si le lien est impossible)"""
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
@@ -0,0 +1,114 @@
+"""
+===============================================================
+ Fichier        : encode.py
+ Auteur         : Mohamed-Amine ELGAOUZI
+ Description    : Encode l'audio traité (WAV PCM après suppression
+                  des silences) en FLAC ou Opus 16 kHz mono avant
+                  l'envoi à la transcription, pour réduire la taille
+                  des uploads et des fichiers conservés sur disque.
+ Créé le        : 18/10/2026
+ Dernière maj   : 18/10/2026
+===============================================================
+ Dépendances    :
+ - os
+ - subprocess
+ - dotenv
+ - ffmpeg (binaire système)
+
+ Fonctionnalités clés :
+ - Format configurable via UPLOAD_AUDIO_FORMAT : "wav" (aucun
+   encodage), "flac" (sans perte) ou "opus" (bas débit)
+ - Réutilise un fichier déjà encodé et plus récent que le WAV
+ - Affiche les octets économisés
+ - Supprime le WAV après encodage si ENCODE_REMOVE_WAV=1
+
+ Notes :
+ - Utilisé par transcribeAssembly.py et transcribe.py : les deux
+   transcriptions acceptent le fichier encodé.
+===============================================================
+"""
+
+import os
+import subprocess
+from dotenv import load_dotenv
+
+PROCESSED_DIR = "data/audio/processed"
+
+load_dotenv()
+UPLOAD_AUDIO_FORMAT = os.getenv("UPLOAD_AUDIO_FORMAT", "wav").lower()
+OPUS_BITRATE = os.getenv("OPUS_BITRATE", "24k")
+ENCODE_REMOVE_WAV = os.getenv("ENCODE_REMOVE_WAV", "0") == "1"
+
+# Extension et options ffmpeg par format
+ENCODINGS = {
+    "flac": (".flac", ["-c:a", "flac", "-compression_level", "5"]),
+    "opus": (".ogg", ["-c:a", "libopus", "-b:a", OPUS_BITRATE, "-application", "voip"]),
+}
+
+def encode_audio(input_path: str, fmt: str) -> str:
+    """
+    Encode un WAV en FLAC ou Opus 16 kHz mono à côté du fichier d'origine.
+
+    Args:
+        input_path (str): Chemin du WAV à encoder.
+        fmt (str): "flac" ou "opus".
+
+    Returns:
+        str: Chemin du fichier encodé.
+    """
+    if fmt not in ENCODINGS:
+        raise ValueError(f"Unsupported upload format: {fmt}")
+
+    ext, codec_args = ENCODINGS[fmt]
+    output_path = os.path.splitext(input_path)[0] + ext
+
+    subprocess.run([
+        "ffmpeg", "-y", "-loglevel", "error", "-i", input_path,
+        "-ar", "16000", "-ac", "1",  # 16kHz, mono
+        *codec_args,
+        output_path
+    ], check=True)
+
+    if os.path.getsize(output_path) == 0:
+        raise ValueError("Encoded file is empty")
+
+    original_size = os.path.getsize(input_path)
+    encoded_size = os.path.getsize(output_path)
+    print(f"[Encode] {os.path.basename(output_path)} | {original_size} -> {encoded_size} bytes "
+          f"| saved {original_size - encoded_size} bytes ({100 * (1 - encoded_size / max(original_size, 1)):.1f}%)")
+    return output_path
+
+def encode_processed_audio(filename: str, fmt: str = None) -> str:
+    """
+    Retourne le fichier traité à transcrire, encodé au format configuré.
+
+    Args:
+        filename (str): Nom de base du fichier (sans extension) dans 'data/audio/processed'.
+        fmt (str): Format cible ; UPLOAD_AUDIO_FORMAT par défaut.
+
+    Returns:
+        str: Chemin du fichier à transcrire (WAV si fmt vaut "wav").
+    """
+    fmt = (fmt or UPLOAD_AUDIO_FORMAT).lower()
+    wav_path = os.path.join(PROCESSED_DIR, f"{filename}.wav")
+
+    if fmt != "wav":
+        if fmt not in ENCODINGS:
+            raise ValueError(f"Unsupported upload format: {fmt}")
+        encoded_path = os.path.join(PROCESSED_DIR, filename + ENCODINGS[fmt][0])
+        # Déjà encodé (autre transcription, ou WAV supprimé après encodage)
+        if os.path.exists(encoded_path) and (
+            not os.path.exists(wav_path) or os.path.getmtime(encoded_path) >= os.path.getmtime(wav_path)
+        ):
+            return encoded_path
+
+    if not os.path.exists(wav_path):
+        raise FileNotFoundError(f"Processed file not found: {wav_path}")
+
+    if fmt == "wav":
+        return wav_path
+
+    encoded_path = encode_audio(wav_path, fmt)
+    if ENCODE_REMOVE_WAV:
+        os.remove(wav_path)
+    return encoded_path
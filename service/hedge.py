@@ -0,0 +1,231 @@
+"""
+===============================================================
+ Fichier        : hedge.py
+ Auteur         : Mohamed-Amine ELGAOUZI
+ Description    : Transcription couverte (hedging) : AssemblyAI est
+                  lancé seul ; s'il n'a pas fini dans un délai tiré
+                  de ses latences récentes (percentile), ou s'il
+                  échoue, Faster Whisper local démarre en parallèle.
+                  Le premier résultat est retenu et l'autre annulé.
+ Créé le        : 18/10/2026
+ Dernière maj   : 18/10/2026
+===============================================================
+ Dépendances    :
+ - os
+ - time
+ - wave
+ - threading
+ - contextlib
+ - collections
+ - concurrent.futures
+ - dotenv
+ - service.transcribeAssembly
+ - service.transcribe
+ - service.scheduler
+
+ Fonctionnalités clés :
+ - Délai de couverture = percentile HEDGE_PERCENTILE des latences
+   AssemblyAI récentes par seconde d'audio, multiplié par la durée du
+   fichier (au moins HEDGE_MIN_DEADLINE ; HEDGE_DEFAULT_DEADLINE tant
+   qu'il y a moins de HEDGE_MIN_SAMPLES mesures)
+ - Latence AssemblyAI mesurée à chaque job, qu'il gagne ou perde : le
+   perdant est annulé et son identifiant de transcription est suivi par
+   un seul thread léger jusqu'à la fin côté AssemblyAI (percentile non
+   biaisé vers les jobs rapides, aucun thread du pool retenu)
+ - Bascule immédiate sur Whisper si AssemblyAI renvoie une erreur
+ - Perdant annulé (suivi AssemblyAI interrompu, ou décodage Whisper au
+   segment suivant) ; son fichier est supprimé dès qu'il a terminé
+ - Statistiques : jobs couverts, bascules, gagnants, latence par
+   seconde d'audio courante
+
+ Notes :
+ - Chaque moteur écrit dans son propre fichier ; celui du gagnant
+   devient data/transcripts/{filename}.txt.
+ - Le Whisper de secours utilise HEDGE_WHISPER_PROFILE (balanced).
+ - ASSEMBLYAI_BASE_URL permet de tester contre un serveur local.
+ - _executor : 2 threads par worker de pipeline (PIPELINE_WORKERS), un
+   par moteur ; les perdants annulés les libèrent en quelques secondes.
+ - Le thread de suivi interroge les transcriptions perdantes toutes les
+   ASSEMBLYAI_POLL_INTERVAL s et les abandonne après HEDGE_TRACK_MAX_AGE s.
+===============================================================
+"""
+
+import os
+import time
+import wave
+import threading
+import contextlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dotenv import load_dotenv
+from service.transcribeAssembly import transcribe_with_assemblyai, transcript_status, ASSEMBLYAI_POLL_INTERVAL
+from service.transcribe import transcribe_audio, TRANSCRIPT_DIR, PROCESSED_DIR
+from service.scheduler import PIPELINE_WORKERS
+
+load_dotenv()
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_DEFAULT_DEADLINE = float(os.getenv("HEDGE_DEFAULT_DEADLINE", "180"))  # secondes
+HEDGE_MIN_DEADLINE = float(os.getenv("HEDGE_MIN_DEADLINE", "30"))  # secondes (surcoût fixe d'upload et de file)
+HEDGE_WHISPER_PROFILE = os.getenv("HEDGE_WHISPER_PROFILE", "balanced")
+HEDGE_HISTORY = 200  # latences AssemblyAI conservées (secondes par seconde d'audio)
+HEDGE_TRACK_MAX_AGE = 3600  # secondes de suivi d'une transcription perdante avant abandon
+
+_latencies = deque(maxlen=HEDGE_HISTORY)
+_stats = {"jobs": 0, "hedged": 0, "failovers": 0, "wins": {"assemblyai": 0, "whisper": 0}}
+_stats_lock = threading.Lock()
+# Deux moteurs par job traité en parallèle ; les perdants sont annulés
+_executor = ThreadPoolExecutor(max_workers=2 * PIPELINE_WORKERS, thread_name_prefix="hedge")
+# Transcriptions AssemblyAI perdantes encore en cours : id -> (début du job, durée audio)
+_tracked = {}
+_tracker = None
+
+def _latency_percentile():
+    """Percentile HEDGE_PERCENTILE des latences par seconde d'audio, ou None s'il y a trop peu de mesures"""
+    with _stats_lock:
+        latencies = sorted(_latencies)
+    if len(latencies) < HEDGE_MIN_SAMPLES:
+        return None
+    return latencies[min(len(latencies) - 1, int(HEDGE_PERCENTILE / 100 * len(latencies)))]
+
+def hedge_deadline(audio_seconds: float = None) -> float:
+    """Délai accordé à AssemblyAI avant de lancer Whisper pour un fichier de audio_seconds secondes"""
+    per_second = _latency_percentile()
+    if per_second is None or not audio_seconds:
+        return HEDGE_DEFAULT_DEADLINE
+    return max(HEDGE_MIN_DEADLINE, per_second * audio_seconds)
+
+def hedge_stats() -> dict:
+    """Jobs couverts, bascules sur erreur, gagnants et latence AssemblyAI par seconde d'audio (percentile)"""
+    with _stats_lock:
+        stats = dict(_stats, wins=dict(_stats["wins"]), samples=len(_latencies))
+    stats["latency_per_audio_second"] = _latency_percentile()
+    return stats
+
+def _audio_seconds(filename: str):
+    """Durée du WAV traité envoyé à AssemblyAI (lue dans l'en-tête), ou None"""
+    try:
+        with contextlib.closing(wave.open(os.path.join(PROCESSED_DIR, f"{filename}.wav"), "rb")) as wf:
+            return wf.getnframes() / wf.getframerate()
+    except (OSError, EOFError, wave.Error):
+        return None
+
+def _record_latency(start: float, audio_seconds: float) -> None:
+    if audio_seconds:
+        with _stats_lock:
+            _latencies.append((time.perf_counter() - start) / audio_seconds)
+
+def _run_tracker():
+    """Thread de suivi : latence des transcriptions perdantes quand AssemblyAI les termine"""
+    while True:
+        time.sleep(ASSEMBLYAI_POLL_INTERVAL)
+        with _stats_lock:
+            tracked = list(_tracked.items())
+        for transcript_id, (start, audio_seconds) in tracked:
+            try:
+                status = transcript_status(transcript_id)
+            except Exception as e:
+                print(f"⚠️ [Hedge] status of {transcript_id} unavailable: {e}")
+                status = None
+            if status == "completed":
+                _record_latency(start, audio_seconds)
+            if status in ("completed", "error") or time.perf_counter() - start > HEDGE_TRACK_MAX_AGE:
+                with _stats_lock:
+                    _tracked.pop(transcript_id, None)
+
+def _track(transcript_id: str, start: float, audio_seconds: float) -> None:
+    """Suivre une transcription AssemblyAI annulée jusqu'à sa fin (un seul thread pour toutes)"""
+    global _tracker
+    with _stats_lock:
+        if len(_tracked) >= HEDGE_HISTORY:
+            return  # suivi saturé : mesure perdue plutôt que mémoire sans borne
+        _tracked[transcript_id] = (start, audio_seconds)
+        if _tracker is None:
+            _tracker = threading.Thread(target=_run_tracker, name="hedge-latency", daemon=True)
+            _tracker.start()
+
+def _on_assemblyai_done(future, start: float, audio_seconds: float, submitted: dict) -> None:
+    """Rappel de fin d'AssemblyAI : latence immédiate s'il a fini, suivi en arrière-plan s'il a été annulé"""
+    if future.exception() is not None:
+        return
+    if future.result() is not None:
+        _record_latency(start, audio_seconds)
+    elif "id" in submitted:
+        _track(submitted["id"], start, audio_seconds)
+
+def _remove_output(path: str):
+    """Rappel de fin d'un perdant : supprimer sa transcription s'il a eu le temps de l'écrire"""
+    def callback(_future):
+        if os.path.exists(path):
+            os.remove(path)
+    return callback
+
+def transcribe_hedged(filename: str) -> str:
+    """
+    Transcrit un fichier traité avec AssemblyAI, couvert par Faster Whisper local.
+
+    Args:
+        filename (str): Nom de base du fichier (sans extension) dans 'data/audio/processed'.
+
+    Returns:
+        str: Chemin vers le fichier texte du premier moteur qui a réussi.
+    """
+    os.makedirs(TRANSCRIPT_DIR, exist_ok=True)
+    outputs = {engine: os.path.join(TRANSCRIPT_DIR, f"{filename}.{engine}.txt") for engine in ("assemblyai", "whisper")}
+    cancels = {engine: threading.Event() for engine in outputs}
+    audio_seconds = _audio_seconds(filename)
+    deadline = hedge_deadline(audio_seconds)
+
+    with _stats_lock:
+        _stats["jobs"] += 1
+
+    start = time.perf_counter()
+    submitted = {}  # identifiant de transcription AssemblyAI, pour le suivi après annulation
+    assembly = _executor.submit(transcribe_with_assemblyai, filename, outputs["assemblyai"], cancels["assemblyai"],
+                                on_submit=lambda transcript_id: submitted.update(id=transcript_id))
+    assembly.add_done_callback(lambda future: _on_assemblyai_done(future, start, audio_seconds, submitted))
+    pending = {assembly: "assemblyai"}
+    engines = dict(pending)
+    done, _ = wait(pending, timeout=deadline)
+    winner, errors, local_started = None, {}, False
+    while True:
+        for future in done:
+            engine = pending.pop(future)
+            if future.exception() is not None:
+                errors[engine] = future.exception()
+                print(f"⚠️ [Hedge] {engine} failed for {filename}: {future.exception()}")
+            elif winner is None:
+                winner = engine
+        if winner is not None:
+            break
+        if not local_started:
+            # Délai dépassé ou échec d'AssemblyAI : Whisper local en parallèle
+            failover = "assemblyai" in errors
+            with _stats_lock:
+                _stats["failovers" if failover else "hedged"] += 1
+            reason = "AssemblyAI failed" if failover else f"no result within {deadline:.0f}s"
+            print(f"[Hedge] {filename} | {reason} after {time.perf_counter() - start:.1f}s | starting local Whisper")
+            future = _executor.submit(transcribe_audio, filename, profile=HEDGE_WHISPER_PROFILE,
+                                      output_path=outputs["whisper"], cancel=cancels["whisper"])
+            pending[future] = "whisper"
+            engines[future] = "whisper"
+            local_started = True
+        if not pending:
+            raise RuntimeError(f"Hedged transcription failed: {errors}")
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+    elapsed = time.perf_counter() - start
+    for future, engine in engines.items():
+        if engine != winner:
+            # Perdant annulé (AssemblyAI : la latence est suivie par _run_tracker), ou terminé
+            # juste avant le gagnant : son fichier est supprimé dès qu'il a fini
+            cancels[engine].set()
+            future.add_done_callback(_remove_output(outputs[engine]))
+
+    with _stats_lock:
+        _stats["wins"][winner] += 1
+
+    output_path = os.path.join(TRANSCRIPT_DIR, f"{filename}.txt")
+    os.replace(outputs[winner], output_path)
+    print(f"[Hedge] {filename} | {winner} won in {elapsed:.1f}s")
+    return output_path
@@ -0,0 +1,270 @@
+"""
+===============================================================
+ Fichier        : http_client.py
+ Auteur         : Mohamed-Amine ELGAOUZI
+ Description    : Session HTTP partagée pour les téléchargements
+                  audio : pool de connexions keep-alive, timeouts
+                  configurables et retries avec backoff aléatoire.
+ Créé le        : 18/10/2026
+ Dernière maj   : 18/10/2026
+===============================================================
+ Dépendances    :
+ - os
+ - time
+ - random
+ - threading
+ - concurrent.futures
+ - requests
+ - urllib3
+ - dotenv
+
+ Fonctionnalités clés :
+ - Une seule session par process, créée à la première utilisation
+ - Réutilisation des connexions TCP/TLS vers le serveur d'enregistrements
+ - Retries automatiques sur erreurs 5xx et coupures de connexion
+ - Taille du pool réglable pour suivre la concurrence du pipeline
+ - Session de sonde distincte (get_probe_session) : PROBE_TIMEOUT
+   court et aucun retry, pour les lectures d'en-tête synchrones
+ - Téléchargement vers fichier avec reprise sur coupure (fetch_to_file)
+ - Téléchargement segmenté optionnel : N requêtes Range en parallèle
+   dans un fichier pré-alloué, repli sur un flux unique sinon
+ - Écriture dans un fichier temporaire voisin puis os.replace : un
+   fichier de destination lié (lien physique vers une source ou le
+   cache) n'est jamais tronqué sur place
+
+ Notes :
+ - La session est partagée entre threads : le pool de connexions
+   urllib3 est thread-safe et la session ne stocke pas d'état de
+   requête (pas de cookies utilisés par le serveur audio).
+===============================================================
+"""
+
+import os
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+
+load_dotenv()
+DOWNLOAD_POOL_SIZE = int(os.getenv("DOWNLOAD_POOL_SIZE", "10"))
+DOWNLOAD_CONNECT_TIMEOUT = float(os.getenv("DOWNLOAD_CONNECT_TIMEOUT", "5"))
+DOWNLOAD_READ_TIMEOUT = float(os.getenv("DOWNLOAD_READ_TIMEOUT", "60"))
+DOWNLOAD_MAX_RETRIES = int(os.getenv("DOWNLOAD_MAX_RETRIES", "3"))
+DOWNLOAD_BACKOFF_FACTOR = float(os.getenv("DOWNLOAD_BACKOFF_FACTOR", "0.5"))
+DOWNLOAD_BACKOFF_JITTER = float(os.getenv("DOWNLOAD_BACKOFF_JITTER", "0.5"))
+# Téléchargement segmenté (requêtes Range parallèles) : 1 = désactivé
+DOWNLOAD_SEGMENTS = int(os.getenv("DOWNLOAD_SEGMENTS", "1"))
+DOWNLOAD_SEGMENTED_MIN_BYTES = int(os.getenv("DOWNLOAD_SEGMENTED_MIN_BYTES", str(16 * 1024 ** 2)))
+# Sonde de durée dans POST /process : timeout court, aucun retry
+PROBE_TIMEOUT = float(os.getenv("PROBE_TIMEOUT", "2"))
+
+# Timeout (connexion, lecture) à passer à chaque requête
+TIMEOUT = (DOWNLOAD_CONNECT_TIMEOUT, DOWNLOAD_READ_TIMEOUT)
+
+RETRY_STATUSES = (500, 502, 503, 504)
+CHUNK_SIZE = 64 * 1024
+
+_session = None
+_probe_session = None
+_session_lock = threading.Lock()
+
+def get_session() -> requests.Session:
+    """
+    Retourne la session HTTP partagée (créée une seule fois, thread-safe).
+
+    Returns:
+        requests.Session: Session avec pool keep-alive et retries.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                retry = Retry(
+                    total=DOWNLOAD_MAX_RETRIES,
+                    backoff_factor=DOWNLOAD_BACKOFF_FACTOR,
+                    backoff_jitter=DOWNLOAD_BACKOFF_JITTER,
+                    status_forcelist=RETRY_STATUSES,
+                    allowed_methods=frozenset({"GET", "HEAD"}),
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=DOWNLOAD_POOL_SIZE,
+                    pool_maxsize=DOWNLOAD_POOL_SIZE,
+                    max_retries=retry,
+                )
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+def get_probe_session() -> requests.Session:
+    """
+    Retourne la session des sondes d'en-tête (créée une seule fois, thread-safe).
+
+    Séparée de la session de téléchargement : aucun retry, pour qu'une
+    origine lente ou injoignable ne bloque pas la requête API qui sonde.
+
+    Returns:
+        requests.Session: Session keep-alive sans retries (à utiliser avec PROBE_TIMEOUT).
+    """
+    global _probe_session
+    if _probe_session is None:
+        with _session_lock:
+            if _probe_session is None:
+                adapter = HTTPAdapter(
+                    pool_connections=DOWNLOAD_POOL_SIZE,
+                    pool_maxsize=DOWNLOAD_POOL_SIZE,
+                    max_retries=0,
+                )
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _probe_session = session
+    return _probe_session
+
+def backoff_delay(attempt: int) -> float:
+    """
+    Délai avant une nouvelle tentative manuelle (coupure en cours de transfert).
+
+    Args:
+        attempt (int): Numéro de la tentative échouée (0 pour la première).
+
+    Returns:
+        float: Délai en secondes (backoff exponentiel + jitter aléatoire).
+    """
+    return DOWNLOAD_BACKOFF_FACTOR * (2 ** attempt) + random.uniform(0, DOWNLOAD_BACKOFF_JITTER)
+
+def _tmp_path(filepath: str) -> str:
+    """Fichier temporaire voisin de filepath, propre au thread (renommé en place une fois complet)"""
+    return f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+def fetch_to_file(url: str, filepath: str, headers: dict = None) -> requests.Response:
+    """Télécharger une URL dans un fichier local en réutilisant la session HTTP partagée.
+
+    Les erreurs 5xx et coupures avant la réponse sont rejouées par la session ;
+    une coupure pendant le transfert relance le téléchargement complet.
+    Le contenu est écrit dans un fichier temporaire puis renommé : si filepath
+    est un lien physique (source file://, entrée du cache), le fichier lié
+    n'est pas modifié. Retourne la réponse (fermée) pour ses en-têtes ; sur
+    un 304 (requête conditionnelle via headers) le fichier n'est pas écrit.
+    """
+    session = get_session()
+    tmp_path = _tmp_path(filepath)
+    try:
+        for attempt in range(DOWNLOAD_MAX_RETRIES + 1):
+            with session.get(url, stream=True, timeout=TIMEOUT, headers=headers) as response:
+                response.raise_for_status()  # raise error if request failed
+                if response.status_code == 304:
+                    return response
+
+                # Écrire le contenu dans le fichier local
+                try:
+                    with open(tmp_path, "wb") as f:
+                        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                            f.write(chunk)
+                    os.replace(tmp_path, filepath)
+                    return response
+                except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+                    if attempt == DOWNLOAD_MAX_RETRIES:
+                        raise
+                    delay = backoff_delay(attempt)
+                    print(f"⚠️ Download interrupted ({e}), retrying in {delay:.1f}s...")
+            time.sleep(delay)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _fetch_range(url: str, fd: int, start: int, end: int, validator: str = None) -> int:
+    """Télécharger les octets [start, end] d'une URL et les écrire à leur position dans fd.
+
+    Une coupure reprend à l'octet suivant le dernier écrit. Retourne le
+    nombre d'octets écrits.
+    """
+    session = get_session()
+    pos = start
+    for attempt in range(DOWNLOAD_MAX_RETRIES + 1):
+        headers = {"Range": f"bytes={pos}-{end}"}
+        if validator:
+            headers["If-Range"] = validator  # l'objet ne doit pas changer entre deux segments
+        with session.get(url, stream=True, timeout=TIMEOUT, headers=headers) as response:
+            response.raise_for_status()
+            if response.status_code != 206:
+                raise ValueError(f"Range request not honoured (HTTP {response.status_code})")
+            try:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    os.pwrite(fd, chunk, pos)
+                    pos += len(chunk)
+                if pos != end + 1:
+                    raise requests.exceptions.ChunkedEncodingError(f"Range {start}-{end} ended at {pos}")
+                return pos - start
+            except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+                if attempt == DOWNLOAD_MAX_RETRIES:
+                    raise
+                delay = backoff_delay(attempt)
+                print(f"⚠️ Segment {start}-{end} interrupted at {pos} ({e}), retrying in {delay:.1f}s...")
+        time.sleep(delay)
+
+def fetch_to_file_segmented(url: str, filepath: str, segments: int = None) -> requests.Response:
+    """Télécharger une URL en segments parallèles (requêtes Range) dans un fichier pré-alloué.
+
+    Le serveur est sondé par une requête HEAD (Accept-Ranges, Content-Length).
+    Si le HEAD échoue, si le serveur ne gère pas les plages, ou si le fichier
+    est petit, le téléchargement se fait en flux unique via fetch_to_file. La taille totale
+    est vérifiée à la fin. Retourne la réponse HEAD (ETag, Last-Modified)
+    ou celle du flux unique.
+    """
+    segments = segments or DOWNLOAD_SEGMENTS
+    if segments <= 1:
+        return fetch_to_file(url, filepath)
+    try:
+        head = get_session().head(url, timeout=TIMEOUT, allow_redirects=True)
+        head.raise_for_status()
+        size = int(head.headers.get("Content-Length") or 0)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        # HEAD refusé (405/403...) ou en-têtes invalides : le GET simple peut encore réussir
+        print(f"⚠️ HEAD probe failed ({e}), falling back to single stream")
+        return fetch_to_file(url, filepath)
+    if head.headers.get("Accept-Ranges", "").lower() != "bytes" or size < DOWNLOAD_SEGMENTED_MIN_BYTES:
+        return fetch_to_file(url, filepath)
+
+    validator = head.headers.get("ETag") or head.headers.get("Last-Modified")
+    segment_size = -(-size // segments)  # arrondi supérieur
+    ranges = [(start, min(start + segment_size, size) - 1) for start in range(0, size, segment_size)]
+
+    # Fichier temporaire pré-alloué, renommé en place une fois complet (comme fetch_to_file)
+    tmp_path = _tmp_path(filepath)
+    try:
+        with open(tmp_path, "wb") as f:
+            f.truncate(size)  # pré-allocation : chaque segment écrit à sa position
+            try:
+                with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+                    written = sum(pool.map(lambda r: _fetch_range(url, f.fileno(), r[0], r[1], validator), ranges))
+            except ValueError as e:
+                # Plages refusées ou objet modifié en cours de route : flux unique
+                print(f"⚠️ Segmented download unavailable ({e}), falling back to single stream")
+                written = None
+
+        if written is None:
+            return fetch_to_file(url, filepath)
+        if written != size or os.path.getsize(tmp_path) != size:
+            raise ValueError(f"Segmented download size mismatch: {written} bytes written, {size} expected")
+        os.replace(tmp_path, filepath)
+        return head
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def download_file(url: str, filepath: str, headers: dict = None) -> requests.Response:
+    """Télécharger une URL dans un fichier : segmenté si DOWNLOAD_SEGMENTS > 1, flux unique sinon.
+
+    Une requête conditionnelle (headers) passe toujours par le flux unique
+    pour pouvoir recevoir un 304.
+    """
+    if headers or DOWNLOAD_SEGMENTS <= 1:
+        return fetch_to_file(url, filepath, headers=headers)
+    return fetch_to_file_segmented(url, filepath)
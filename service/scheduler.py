@@ -0,0 +1,189 @@
+"""
+===============================================================
+ Fichier        : scheduler.py
+ Auteur         : Mohamed-Amine ELGAOUZI
+ Description    : File de traitement des fiches : plus court job
+                  d'abord (durée estimée de l'enregistrement) avec
+                  vieillissement, exécutée par un pool de threads.
+                  Remplace les BackgroundTasks de FastAPI.
+ Créé le        : 18/10/2026
+ Dernière maj   : 18/10/2026
+===============================================================
+ Dépendances    :
+ - os
+ - time
+ - uuid
+ - heapq
+ - threading
+ - collections
+ - dataclasses
+ - dotenv
+
+ Fonctionnalités clés :
+ - Priorité = durée estimée - SCHEDULER_AGING_RATE x attente :
+   les appels courts passent devant, les longs finissent par passer
+ - PIPELINE_WORKERS threads de traitement démarrés au premier job
+ - État des jobs (queued, running, done, error) consultable par id
+ - Transcription partielle : segments ajoutés au job pendant la
+   transcription locale (Job.add_segment), lisibles avant la fin
+ - Statistiques : file, jobs en cours, délai de traitement p50 / p95
+
+ Notes :
+ - Le vieillissement est linéaire : la priorité effective
+   durée - r x (maintenant - arrivée) vaut (durée + r x arrivée) - r x maintenant,
+   et le dernier terme est commun à tous les jobs. La clé
+   durée + r x arrivée est donc fixe et un simple tas suffit.
+ - Une durée inconnue (sonde échouée) compte pour
+   SCHEDULER_UNKNOWN_DURATION secondes.
+ - Concurrence : les BackgroundTasks s'exécutaient dans le pool de
+   threads de Starlette (jusqu'à 40 fiches en parallèle). Ici au plus
+   PIPELINE_WORKERS fiches (2 par défaut) sont traitées en même temps,
+   les autres attendent dans la file. Avec AssemblyAI (attente réseau
+   plutôt que CPU), augmenter PIPELINE_WORKERS pour retrouver le débit
+   d'avant.
+===============================================================
+"""
+
+import os
+import time
+import uuid
+import heapq
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field, asdict, replace
+from typing import Callable, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "2"))
+# Secondes d'audio "gagnées" par seconde d'attente (0 = plus court d'abord strict)
+SCHEDULER_AGING_RATE = float(os.getenv("SCHEDULER_AGING_RATE", "10"))
+SCHEDULER_UNKNOWN_DURATION = float(os.getenv("SCHEDULER_UNKNOWN_DURATION", "600"))
+# Nombre de jobs terminés conservés pour GET /jobs/{id} et les statistiques
+SCHEDULER_KEEP_FINISHED = int(os.getenv("SCHEDULER_KEEP_FINISHED", "1000"))
+
+@dataclass
+class Job:
+    """Fiche à traiter et son état dans la file"""
+    fiche_id: int
+    audio_url: str
+    ingest_policy: Optional[str] = None
+    estimated_duration: Optional[float] = None
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "queued"
+    enqueued_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    segments: list = field(default_factory=list)
+    profile: Optional[str] = None  # profil de transcription locale retenu
+    rtf: Optional[float] = None    # secondes de transcription / seconde de parole
+
+    def add_segment(self, start: float, end: float, text: str) -> None:
+        """Ajouter un segment transcrit (transcription partielle visible pendant le traitement)"""
+        self.segments.append({"start": start, "end": end, "text": text})
+
+    @property
+    def turnaround(self) -> Optional[float]:
+        """Délai entre la mise en file et la fin du traitement, en secondes"""
+        if self.finished_at is None:
+            return None
+        return self.finished_at - self.enqueued_at
+
+    def to_dict(self, since: int = 0) -> dict:
+        """État du job ; seuls les segments à partir de l'indice since sont inclus"""
+        segments = self.segments[since:]
+        data = asdict(replace(self, segments=[]))
+        data["segments"] = segments
+        # Compté depuis la tranche lue : un segment ajouté entre-temps sera lu au prochain appel
+        data["segments_total"] = since + len(segments) if segments else len(self.segments)
+        data["turnaround"] = self.turnaround
+        return data
+
+class Scheduler:
+    """File à priorité (plus court d'abord avec vieillissement) et pool de workers"""
+
+    def __init__(self, handler: Callable[[Job], None], workers: int = None, aging_rate: float = None):
+        self._handler = handler
+        self._workers = workers or PIPELINE_WORKERS
+        self._aging_rate = SCHEDULER_AGING_RATE if aging_rate is None else aging_rate
+        self._heap = []
+        self._seq = 0
+        self._jobs = OrderedDict()
+        self._turnarounds = deque(maxlen=SCHEDULER_KEEP_FINISHED)
+        self._cond = threading.Condition()
+        self._threads = []
+
+    def _priority(self, job: Job) -> float:
+        duration = SCHEDULER_UNKNOWN_DURATION if job.estimated_duration is None else job.estimated_duration
+        return duration + self._aging_rate * job.enqueued_at
+
+    def submit(self, job: Job) -> Job:
+        """Mettre un job en file et démarrer les workers si besoin"""
+        with self._cond:
+            if not self._threads:
+                for i in range(self._workers):
+                    thread = threading.Thread(target=self._run, name=f"pipeline-worker-{i}", daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+            self._jobs[job.job_id] = job
+            # Le compteur départage les égalités dans l'ordre d'arrivée
+            heapq.heappush(self._heap, (self._priority(job), self._seq, job))
+            self._seq += 1
+            self._cond.notify()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def stats(self) -> dict:
+        """Taille de la file (jobs et secondes d'audio), jobs en cours et délais de traitement récents (p50, p95)"""
+        with self._cond:
+            running = sum(1 for job in self._jobs.values() if job.status == "running")
+            turnarounds = sorted(self._turnarounds)
+            queued = len(self._heap)
+            # Audio en attente (durée inconnue comptée SCHEDULER_UNKNOWN_DURATION), travail à écouler
+            queued_audio = sum(SCHEDULER_UNKNOWN_DURATION if job.estimated_duration is None
+                               else job.estimated_duration for _, _, job in self._heap)
+        percentile = lambda q: turnarounds[min(len(turnarounds) - 1, int(q * len(turnarounds)))] if turnarounds else None
+        return {
+            "workers": self._workers,
+            "queued": queued,
+            "queued_audio": queued_audio,
+            "running": running,
+            "turnaround_p50": percentile(0.5),
+            "turnaround_p95": percentile(0.95),
+        }
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                _, _, job = heapq.heappop(self._heap)
+                job.status = "running"
+                job.started_at = time.time()
+
+            try:
+                self._handler(job)
+                status, error = "done", None
+            except Exception as e:
+                status, error = "error", str(e)
+
+            with self._cond:
+                job.status = status
+                job.error = error
+                job.finished_at = time.time()
+                self._turnarounds.append(job.turnaround)
+                self._prune()
+
+            estimate = "?" if job.estimated_duration is None else f"{job.estimated_duration:.0f}s"
+            print(f"[Scheduler] fiche {job.fiche_id} {status} | audio ~{estimate} "
+                  f"| waited {job.started_at - job.enqueued_at:.1f}s | turnaround {job.turnaround:.1f}s")
+
+    def _prune(self):
+        """Oublier les jobs terminés les plus anciens au-delà de SCHEDULER_KEEP_FINISHED"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished_at is not None]
+        for job_id in finished[:max(0, len(finished) - SCHEDULER_KEEP_FINISHED)]:
+            del self._jobs[job_id]
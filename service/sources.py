@@ -0,0 +1,276 @@
+"""
+===============================================================
+ Fichier        : sources.py
+ Auteur         : Mohamed-Amine ELGAOUZI
+ Description    : Backends de sources audio derrière download_audio :
+                  serveur HTTP, partage monté (file://) et stockage
+                  objet compatible S3 (s3://). Tous exposent la même
+                  interface de flux au trimmer.
+ Créé le        : 18/10/2026
+ Dernière maj   : 18/10/2026
+===============================================================
+ Dépendances    :
+ - os
+ - threading
+ - contextlib
+ - urllib.parse
+ - dotenv
+ - service.http_client
+ - service.download_cache
+ - boto3 (s3://)
+
+ Fonctionnalités clés :
+ - get_source(url) : backend choisi selon le schéma de l'URL
+ - check_source_url(url) : refus (ValueError) des sources non autorisées
+ - open(url) : flux en lecture seule (read(), bytes_read) pour le
+   trimmer en streaming ou le décodage MP3
+ - read_head(url, size) : premiers octets et taille totale, pour
+   estimer la durée sans tout télécharger
+ - fetch(url, filepath) : fichier local pour le pipeline classique
+   - file:// : lien physique dans 'data/audio/raw', ou lecture directe
+     du fichier source si le lien est impossible (autre volume, NFS)
+   - http(s):// : session partagée, cache conditionnel si DOWNLOAD_CACHE=1
+   - s3:// : téléchargement multipart boto3
+
+ Notes :
+ - audio_url vient de l'API : file:// n'est accepté que sous
+   SOURCE_FILE_ROOT (chemin résolu, liens symboliques compris) et s3://
+   que pour les buckets de SOURCE_S3_BUCKETS. Sans configuration, ces
+   deux schémas sont refusés.
+ - S3_ENDPOINT_URL permet de viser un stockage compatible (MinIO,
+   Ceph, stand-in local) ; les identifiants suivent la chaîne boto3
+   habituelle (AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, ...).
+ - Un fichier lu directement sur le partage n'est jamais supprimé par
+   file_cleanup.py (il n'est pas dans 'data/audio/raw').
+===============================================================
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse, unquote
+from dotenv import load_dotenv
+from service.http_client import get_session, get_probe_session, download_file, TIMEOUT, PROBE_TIMEOUT
+from service.download_cache import cached_fetch, DOWNLOAD_CACHE
+
+load_dotenv()
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
+# Sources locales autorisées : file:// limité à ce dossier, s3:// à ces buckets (désactivés si vides)
+SOURCE_FILE_ROOT = os.getenv("SOURCE_FILE_ROOT", "")
+SOURCE_S3_BUCKETS = [b.strip() for b in os.getenv("SOURCE_S3_BUCKETS", "").split(",") if b.strip()]
+
+class StreamReader:
+    """Flux en lecture seule commun à tous les backends.
+
+    N'expose que read() (wave le traite alors comme non seekable) et complète
+    les lectures courtes pour que l'en-tête WAV soit toujours lu en entier.
+    """
+
+    def __init__(self, raw):
+        self._raw = raw
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            data = self._raw.read()
+        else:
+            parts = []
+            remaining = size
+            while remaining > 0:
+                part = self._raw.read(remaining)
+                if not part:
+                    break
+                parts.append(part)
+                remaining -= len(part)
+            data = b"".join(parts)
+        self.bytes_read += len(data)
+        return data
+
+class HttpSource:
+    """Enregistrements servis en HTTP(S) par le serveur d'enregistrements"""
+
+    def check(self, url: str) -> None:
+        if not urlparse(url).netloc:
+            raise ValueError(f"Invalid HTTP URL: {url}")
+
+    @contextmanager
+    def open(self, url: str):
+        with get_session().get(url, stream=True, timeout=TIMEOUT) as response:
+            response.raise_for_status()  # raise error if request failed
+            response.raw.decode_content = True
+            yield StreamReader(response.raw)
+
+    def read_head(self, url: str, size: int):
+        # GET partiel : seul l'en-tête transite (un serveur sans Range envoie tout, on coupe).
+        # Session de sonde : timeout court et pas de retry, l'appelant attend la réponse
+        headers = {"Range": f"bytes=0-{size - 1}"}
+        with get_probe_session().get(url, stream=True, timeout=PROBE_TIMEOUT, headers=headers) as response:
+            response.raise_for_status()  # raise error if request failed
+            response.raw.decode_content = True
+            data = StreamReader(response.raw).read(size)
+            if response.status_code == 206:
+                total = response.headers.get("Content-Range", "").rpartition("/")[2]
+            else:
+                total = response.headers.get("Content-Length", "")
+        return data, int(total) if total.isdigit() else None
+
+    def fetch(self, url: str, filepath: str) -> str:
+        if DOWNLOAD_CACHE:
+            # Cache local : un fichier déjà téléchargé ne coûte qu'un 304
+            cached_fetch(url, filepath)
+        else:
+            # Télécharger le fichier en streaming (session partagée, retries sur 5xx / coupures,
+            # segments parallèles si DOWNLOAD_SEGMENTS > 1)
+            download_file(url, filepath)
+        return filepath
+
+class FileSource:
+    """Enregistrements sur un disque local ou un partage monté (file:///chemin)"""
+
+    def __init__(self, root: str = None):
+        self.root = SOURCE_FILE_ROOT if root is None else root
+
+    def path(self, url: str) -> str:
+        # Chemin résolu (liens symboliques et '..' compris) puis confiné à la racine autorisée
+        parsed = urlparse(url)
+        if parsed.netloc not in ("", "localhost"):
+            raise ValueError(f"Unsupported file URL host: {parsed.netloc}")
+        if not self.root:
+            raise ValueError("file:// sources are disabled (SOURCE_FILE_ROOT is not set)")
+        root = os.path.realpath(self.root)
+        path = os.path.realpath(unquote(parsed.path))
+        if os.path.commonpath([root, path]) != root:
+            raise ValueError(f"File source outside SOURCE_FILE_ROOT: {unquote(parsed.path)}")
+        return path
+
+    def check(self, url: str) -> None:
+        self.path(url)
+
+    @contextmanager
+    def open(self, url: str):
+        with open(self.path(url), "rb") as f:
+            yield StreamReader(f)
+
+    def read_head(self, url: str, size: int):
+        path = self.path(url)
+        with open(path, "rb") as f:
+            return f.read(size), os.path.getsize(path)
+
+    def fetch(self, url: str, filepath: str) -> str:
+        source_path = self.path(url)
+        if not os.path.exists(source_path):
+            raise FileNotFoundError(f"Source file not found: {source_path}")
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        try:
+            # Même volume : lien physique, aucune copie. Sûr tant que les écrivains de
+            # data/audio/raw remplacent le fichier (temporaire + os.replace) sans l'ouvrir en écriture
+            os.link(source_path, filepath)
+            return filepath
+        except OSError:
+            # Autre volume (NFS, montage) : lecture directe du fichier source
+            print(f"[Source] {source_path} read in place (hardlink not possible)")
+            return source_path
+
+class S3Source:
+    """Enregistrements dans un bucket compatible S3 (s3://bucket/cle)"""
+
+    def __init__(self, buckets: list = None):
+        self.buckets = SOURCE_S3_BUCKETS if buckets is None else buckets
+        self._client = None
+        self._probe_client = None
+        self._lock = threading.Lock()
+
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    try:
+                        import boto3
+                    except ImportError:
+                        raise RuntimeError("boto3 is required for s3:// sources (pip install boto3)")
+                    self._client = boto3.client("s3", endpoint_url=S3_ENDPOINT_URL or None)
+        return self._client
+
+    def probe_client(self):
+        # Client des sondes d'en-tête : timeouts courts, une seule tentative
+        if self._probe_client is None:
+            with self._lock:
+                if self._probe_client is None:
+                    import boto3
+                    from botocore.config import Config
+                    config = Config(connect_timeout=PROBE_TIMEOUT, read_timeout=PROBE_TIMEOUT,
+                                    retries={"max_attempts": 1})
+                    self._probe_client = boto3.client("s3", endpoint_url=S3_ENDPOINT_URL or None, config=config)
+        return self._probe_client
+
+    def location(self, url: str):
+        parsed = urlparse(url)
+        key = unquote(parsed.path.lstrip("/"))
+        if not parsed.netloc or not key:
+            raise ValueError(f"Invalid S3 URL: {url}")
+        if parsed.netloc not in self.buckets:
+            raise ValueError(f"S3 bucket not allowed (SOURCE_S3_BUCKETS): {parsed.netloc}")
+        return parsed.netloc, key
+
+    def check(self, url: str) -> None:
+        self.location(url)
+
+    @contextmanager
+    def open(self, url: str):
+        bucket, key = self.location(url)
+        body = self.client().get_object(Bucket=bucket, Key=key)["Body"]
+        try:
+            yield StreamReader(body)
+        finally:
+            body.close()
+
+    def read_head(self, url: str, size: int):
+        bucket, key = self.location(url)
+        response = self.probe_client().get_object(Bucket=bucket, Key=key, Range=f"bytes=0-{size - 1}")
+        with response["Body"] as body:
+            data = body.read()
+        total = response.get("ContentRange", "").rpartition("/")[2]
+        return data, int(total) if total.isdigit() else response.get("ContentLength")
+
+    def fetch(self, url: str, filepath: str) -> str:
+        bucket, key = self.location(url)
+        # Téléchargement multipart (requêtes Range parallèles) géré par boto3
+        self.client().download_file(bucket, key, filepath)
+        return filepath
+
+_http_source = HttpSource()
+
+SOURCES = {
+    "http": _http_source,
+    "https": _http_source,
+    "file": FileSource(),
+    "s3": S3Source(),
+}
+
+def get_source(url: str):
+    """
+    Retourne le backend correspondant au schéma de l'URL.
+
+    Args:
+        url (str): URL de l'enregistrement (http(s)://, file:// ou s3://).
+
+    Returns:
+        HttpSource | FileSource | S3Source: Backend exposant open(), read_head() et fetch().
+    """
+    scheme = urlparse(url).scheme.lower()
+    if scheme not in SOURCES:
+        raise ValueError(f"Unsupported source scheme: {scheme or url}")
+    return SOURCES[scheme]
+
+def check_source_url(url: str) -> None:
+    """
+    Vérifie qu'une URL reçue par l'API désigne une source autorisée.
+
+    file:// doit rester sous SOURCE_FILE_ROOT et s3:// viser un bucket de
+    SOURCE_S3_BUCKETS ; les autres schémas que http(s) sont refusés.
+
+    Raises:
+        ValueError: URL refusée (à renvoyer en 400).
+    """
+    get_source(url).check(url)
@@ -6,55 +6,182 @@
                   en utilisant le modèle local Faster Whisper.
                   Plus lent que AssemblyAI mais fonctionne localement.
  Créé le        : 16/10/2025
- Dernière maj   : 16/10/2025
+ Dernière maj   : 18/10/2026
 ===============================================================
  Dépendances    :
  - os
- - faster_whisper
+ - time
+ - service.whisper_registry
+ - service.transcribe_profiles
+ - service.encode
 
  Fonctionnalités clés :
  - Transcription de fichiers WAV en texte
- - Modèle configurable (taille du modèle, CPU/GPU)
+ - Modèle configurable (taille du modèle, CPU/GPU), chargé une seule
+   fois et partagé entre les appels (service/whisper_registry.py)
  - Sauvegarde des transcriptions dans 'data/transcripts'
+ - Accepte l'audio traité encodé (FLAC/Opus, voir service/encode.py)
+ - Carte de parole du trimmer (TrimResult) : seules ses plages sont
+   transcrites (clip_timestamps), dans le fichier traité ou directement
+   dans l'enregistrement original (aucun WAV réduit à écrire)
+ - Horodatages des segments ramenés à l'enregistrement d'origine
+ - Sortie incrémentale : transcribe_segments génère les segments dès
+   leur décodage ; transcribe_audio les écrit au fil de l'eau et peut
+   les pousser à l'appelant (on_segment, ex. état du job)
+ - Profil de transcription (fast / balanced / accurate) : modèle et
+   beam_size, voir service/transcribe_profiles.py
+ - Temps de décodage seul (timing), hors chargement du modèle, pour
+   le RTF des profils
  - Gestion des erreurs si transcription échoue ou fichier vide
 
  Notes :
  - Le fichier doit être préalablement traité (silence trimming) 
    et présent dans 'data/audio/processed'.
  - Plus lent que la transcription via AssemblyAI mais ne nécessite pas API KEY payante.
+ - Langue imposée (WHISPER_LANGUAGE) : pas de détection sur les
+   premières secondes.
 ===============================================================
 """
 
 import os
-from faster_whisper import WhisperModel
+import time
+from service.whisper_registry import get_model, WHISPER_LANGUAGE
+from service.transcribe_profiles import get_profile
+from service.encode import encode_processed_audio
 
 PROCESSED_DIR = "data/audio/processed"
 TRANSCRIPT_DIR = "data/transcripts"
 
-def transcribe_audio(filename: str, model_size="medium") -> str:
+def clip_timestamps(regions) -> list:
+    """Plages (début, fin) en secondes -> liste plate attendue par WhisperModel.transcribe"""
+    return [round(t, 3) for region in regions for t in region]
+
+def transcription_input(filename: str, trim_result=None, original_path: str = None) -> tuple:
+    """
+    Fichier à donner à Whisper et plages de parole à y transcrire.
+
+    Returns:
+        tuple: (chemin, plages (début, fin) en secondes dans ce fichier ou None pour
+            le fichier entier, TrimResult pour ramener les horodatages à l'original
+            ou None s'ils y sont déjà).
+    """
+    if trim_result is None:
+        return encode_processed_audio(filename), None, None
+    if original_path is not None:
+        return original_path, trim_result.speech_regions(), None
+    return encode_processed_audio(filename), trim_result.trimmed_regions(), trim_result
+
+def _add_decode_time(timing, since):
+    if timing is not None:
+        timing["decode_seconds"] = timing.get("decode_seconds", 0.0) + time.perf_counter() - since
+
+def transcribe_clips(input_path: str, clips=None, model_size: str = None, compute_type: str = None,
+                     profile: str = None, timing: dict = None):
+    """
+    Transcrit un fichier, ou seulement les plages clips (secondes), avec le modèle partagé.
+
+    Si timing est fourni, timing["decode_seconds"] cumule le temps passé à
+    décoder, sans le chargement du modèle ni le temps passé chez l'appelant
+    entre deux segments.
+
+    Yields:
+        tuple: (start, end, text) en secondes sur la timeline de input_path.
+    """
+    options = {"language": WHISPER_LANGUAGE}
+    if profile is not None:
+        settings = get_profile(profile)
+        model_size = model_size or settings.model_size
+        compute_type = compute_type or settings.compute_type
+        options["beam_size"] = settings.beam_size
+    if clips is not None:
+        options["clip_timestamps"] = clip_timestamps(clips)
+
+    # Modèle partagé : chargé et préchauffé au premier appel (ou au démarrage)
+    model = get_model(model_size, compute_type)
+    decode_start = time.perf_counter()
+    segments, info = model.transcribe(input_path, **options)
+    for segment in segments:
+        _add_decode_time(timing, decode_start)
+        yield segment.start, segment.end, segment.text.strip()
+        decode_start = time.perf_counter()
+    _add_decode_time(timing, decode_start)
+
+def transcribe_segments(filename: str, model_size: str = None, compute_type: str = None,
+                        trim_result=None, original_path: str = None, profile: str = None, timing: dict = None):
+    """
+    Transcrit l'audio d'une fiche et génère ses segments au fur et à mesure.
+
+    Sans trim_result, le fichier traité est transcrit en entier. Avec le
+    TrimResult du trimmer, seules ses plages de parole sont transcrites
+    (clip_timestamps) : dans le fichier traité, ou dans l'enregistrement
+    original si original_path est fourni (cas de detect_speech, sans WAV réduit).
+
+    Args:
+        filename (str): Nom de base du fichier (sans extension) dans 'data/audio/processed'.
+        model_size (str): Taille du modèle ; WHISPER_MODEL_SIZE par défaut.
+        compute_type (str): Quantification ; WHISPER_COMPUTE_TYPE par défaut.
+        trim_result (TrimResult): Carte des segments de parole du trimmer.
+        original_path (str): Enregistrement original (non réduit) correspondant à trim_result.
+        profile (str): Profil de transcription ("fast", "balanced", "accurate") : modèle et
+            beam_size, sauf si model_size / compute_type sont donnés.
+        timing (dict): Reçoit decode_seconds, le temps de décodage seul (voir transcribe_clips).
+
+    Yields:
+        tuple: (start, end, text), en secondes sur la timeline de l'enregistrement
+            d'origine dès que trim_result est fourni.
+    """
+    input_path, regions, to_original = transcription_input(filename, trim_result, original_path)
+    if regions is not None and not regions:
+        return  # aucune parole détectée
+
+    for start, end, text in transcribe_clips(input_path, regions, model_size, compute_type, profile, timing):
+        if to_original is not None:
+            start, end = to_original.to_original_time(start), to_original.to_original_time(end, end=True)
+        yield round(start, 3), round(end, 3), text
+
+def transcribe_audio(filename: str, model_size: str = None, compute_type: str = None,
+                     trim_result=None, original_path: str = None, on_segment=None, profile: str = None,
+                     output_path: str = None, cancel=None, timing: dict = None) -> str:
     """
     Transcrit un fichier audio en texte en utilisant Faster Whisper local.
     
     Args:
         filename (str): Nom de base du fichier (sans extension).
-        model_size (str): Taille du modèle Whisper ("tiny", "base", "small", "medium", "large").
+        model_size (str): Taille du modèle Whisper ("tiny", "base", "small", "medium", "large") ;
+            WHISPER_MODEL_SIZE ("medium") par défaut.
+        compute_type (str): Quantification ; WHISPER_COMPUTE_TYPE ("int8") par défaut.
+        trim_result (TrimResult): Carte des segments de parole ; seules ces plages sont transcrites.
+        original_path (str): Enregistrement original à transcrire à la place du fichier traité.
+        on_segment (callable): Appelé avec (start, end, text) dès qu'un segment est décodé.
+        profile (str): Profil de transcription ("fast", "balanced", "accurate").
+        output_path (str): Fichier de sortie ; 'data/transcripts/{filename}.txt' par défaut.
+        cancel (threading.Event): Arrête le décodage au prochain segment s'il est levé.
+        timing (dict): Reçoit decode_seconds, le temps de décodage seul (hors chargement du modèle).
     
     Returns:
-        str: Chemin vers le fichier texte contenant la transcription.
+        str: Chemin vers le fichier texte contenant la transcription, ou None si annulée
+            (le fichier partiel est supprimé).
     """
     os.makedirs(TRANSCRIPT_DIR, exist_ok=True)
     print("🚀 Starting transcription...")
-    input_path = os.path.join(PROCESSED_DIR, f"{filename}.wav")
-    output_path = os.path.join(TRANSCRIPT_DIR, f"{filename}.txt")
-
-    # Utiliser device="cuda" si GPU disponible
-    model = WhisperModel(model_size, device="cpu", compute_type="int8")
-
-    segments, info = model.transcribe(input_path)
+    output_path = output_path or os.path.join(TRANSCRIPT_DIR, f"{filename}.txt")
 
     with open(output_path, "w", encoding="utf-8") as f:
-        for segment in segments:
-            f.write(segment.text.strip() + " ")
+        segments = transcribe_segments(filename, model_size, compute_type, trim_result, original_path, profile,
+                                       timing)
+        for start, end, text in segments:
+            if cancel is not None and cancel.is_set():
+                break
+            f.write(text + " ")
+            f.flush()  # transcription partielle lisible pendant le décodage
+            if on_segment is not None:
+                on_segment(start, end, text)
+
+    if cancel is not None and cancel.is_set():
+        segments.close()  # libère le décodeur
+        os.remove(output_path)
+        print("⏹️ Local transcription cancelled")
+        return None
 
     if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
         raise ValueError("Transcription failed or file is empty")
@@ -6,12 +6,15 @@
                   en utilisant l'API AssemblyAI.
                   Le transcript est sauvegardé dans 'data/transcripts'.
  Créé le        : 16/10/2025
- Dernière maj   : 16/10/2025
+ Dernière maj   : 18/10/2026
 ===============================================================
  Dépendances    :
  - os
+ - time
+ - threading
  - assemblyai
  - dotenv
+ - service.encode
 
  Fonctionnalités clés :
  - Transcription de fichiers WAV en français
@@ -19,6 +22,12 @@
  - Punctuation automatique et formatage du texte
  - Gestion des erreurs et retour de l'exception en cas d'échec
  - Sauvegarde des transcriptions dans un dossier dédié
+ - Upload au format configuré (WAV, FLAC ou Opus) avec mesure du temps d'upload
+ - Suivi de la transcription interruptible (cancel) et identifiant de
+   transcription transmis dès la soumission (on_submit) : utilisés par
+   la transcription concurrente AssemblyAI / Whisper (service/hedge.py)
+ - transcript_status : statut d'une transcription soumise (sans attente)
+ - ASSEMBLYAI_BASE_URL : API de remplacement (tests, serveur local)
 
  Notes :
  - Le fichier doit être préalablement traité dans (silence_trimmer.py) 
@@ -26,35 +35,50 @@
 ===============================================================
 """
 import os
+import time
+import threading
 import assemblyai as aai
+from assemblyai import api as aai_api
 from dotenv import load_dotenv
+from service.encode import encode_processed_audio
 
 PROCESSED_DIR = "data/audio/processed"
 TRANSCRIPTS_DIR = "data/transcripts"
 # Charger le fichier .env
 load_dotenv()
 API_KEY = os.getenv("ASSEMBLY_AI_KEY")
+ASSEMBLYAI_BASE_URL = os.getenv("ASSEMBLYAI_BASE_URL")
+ASSEMBLYAI_POLL_INTERVAL = float(os.getenv("ASSEMBLYAI_POLL_INTERVAL", "3"))
 
 # Configure API key
 aai.settings.api_key = API_KEY
+if ASSEMBLYAI_BASE_URL:
+    aai.settings.base_url = ASSEMBLYAI_BASE_URL
 
-def transcribe_with_assemblyai(filename: str) -> str:
+def transcript_status(transcript_id: str) -> str:
+    """Statut courant d'une transcription AssemblyAI (queued, processing, completed, error)"""
+    return aai_api.get_transcript(aai.Client.get_default().http_client, transcript_id).status
+
+def transcribe_with_assemblyai(filename: str, output_path: str = None, cancel: threading.Event = None,
+                               on_submit=None) -> str:
     """
     Transcribe an audio file using AssemblyAI API.
     
     Args:
         filename (str): Base filename (without extension).
+        output_path (str): Transcript path; data/transcripts/{filename}.txt by default.
+        cancel (threading.Event): Stops polling when set (the transcript is not written).
+        on_submit (callable): Called with the transcript id once submitted (the caller can
+            keep tracking it after a cancel).
     
     Returns:
-        str: Path to transcript text file.
+        str: Path to transcript text file, or None if cancelled.
     """
+    stop = cancel or threading.Event()
     os.makedirs(TRANSCRIPTS_DIR, exist_ok=True)
 
-    # Build input file path (look for .wav in processed dir)
-    input_path = os.path.join(PROCESSED_DIR, f"{filename}.wav")
-
-    if not os.path.exists(input_path):
-        raise FileNotFoundError(f"Processed file not found: {input_path}")
+    # Build input file path (processed .wav, encoded to FLAC/Opus if configured)
+    input_path = encode_processed_audio(filename)
 
   # Configure transcription
     config = aai.TranscriptionConfig(
@@ -65,16 +89,34 @@ def transcribe_with_assemblyai(filename: str) -> str:
         language_code="fr"  
     )
 
-    # Run transcription
+    # Upload audio, then run transcription
     print(f"🔊 Sending {input_path} to AssemblyAI for transcription (FR)...")
 
-    transcript = aai.Transcriber(config=config).transcribe(input_path)
+    transcriber = aai.Transcriber(config=config)
+    upload_start = time.perf_counter()
+    upload_url = transcriber.upload_file(input_path)
+    upload_elapsed = time.perf_counter() - upload_start
+    print(f"📤 Uploaded {os.path.getsize(input_path)} bytes in {upload_elapsed:.2f}s")
+
+    # Submit, then poll until done (interrupted if another transcription won)
+    # (Transcript.get_by_id blocks until completion: status read directly instead)
+    transcript_id = transcriber.submit(upload_url).id
+    if on_submit is not None:
+        on_submit(transcript_id)
+    http_client = aai.Client.get_default().http_client
+    while True:
+        transcript = aai_api.get_transcript(http_client, transcript_id)
+        if transcript.status in ("completed", "error"):
+            break
+        if stop.wait(ASSEMBLYAI_POLL_INTERVAL):
+            print(f"⏹️ AssemblyAI transcription {transcript_id} cancelled")
+            return None
 
     if transcript.status == "error":
         raise RuntimeError(f"❌ Transcription failed: {transcript.error}")
 
     # Save transcript
-    output_path = os.path.join(TRANSCRIPTS_DIR, f"{filename}.txt")
+    output_path = output_path or os.path.join(TRANSCRIPTS_DIR, f"{filename}.txt")
     with open(output_path, "w", encoding="utf-8") as f:
         f.write(transcript.text)
 
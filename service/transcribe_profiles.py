@@ -0,0 +1,127 @@
+"""
+===============================================================
+ Fichier        : transcribe_profiles.py
+ Auteur         : Mohamed-Amine ELGAOUZI
+ Description    : Profils de transcription locale (modèle + réglages
+                  de décodage) et choix automatique du profil selon
+                  la durée de parole et la profondeur de la file, pour
+                  tenir un délai de traitement cible.
+ Créé le        : 18/10/2026
+ Dernière maj   : 18/10/2026
+===============================================================
+ Dépendances    :
+ - os
+ - threading
+ - dataclasses
+ - dotenv
+ - service.whisper_registry
+
+ Fonctionnalités clés :
+ - Profils nommés : fast (petit modèle, décodage glouton), balanced
+   (modèle par défaut, glouton), accurate (modèle par défaut, beam 5 :
+   comportement historique)
+ - WHISPER_PROFILE : profil imposé, ou "auto" pour le sélecteur
+ - Sélecteur : profil le plus précis dont le délai estimé (ce job puis
+   la parole en file écoulée par les workers) tient dans
+   WHISPER_TURNAROUND_TARGET
+ - RTF (secondes de décodage / seconde de parole) appris par moyenne
+   mobile à partir des décodages mesurés (chargement du modèle et
+   attente d'un worker du pool exclus)
+
+ Notes :
+ - Les RTF de départ sont des ordres de grandeur CPU int8 ; ils sont
+   rapprochés des mesures au fil des jobs (la première mesure est
+   lissée avec eux comme les suivantes).
+===============================================================
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+from typing import Optional
+from dotenv import load_dotenv
+from service.whisper_registry import WHISPER_MODEL_SIZE
+
+load_dotenv()
+WHISPER_PROFILE = os.getenv("WHISPER_PROFILE", "accurate").lower()  # fast, balanced, accurate ou auto
+WHISPER_FAST_MODEL_SIZE = os.getenv("WHISPER_FAST_MODEL_SIZE", "small")
+WHISPER_TURNAROUND_TARGET = float(os.getenv("WHISPER_TURNAROUND_TARGET", "300"))  # secondes
+
+RTF_SMOOTHING = 0.2  # poids d'une nouvelle mesure dans la moyenne mobile
+
+@dataclass(frozen=True)
+class Profile:
+    """Modèle et réglages de décodage d'une transcription locale"""
+    name: str
+    model_size: str
+    beam_size: int
+    initial_rtf: float  # estimation avant la première mesure
+    compute_type: Optional[str] = None  # None = WHISPER_COMPUTE_TYPE
+
+# Du plus précis au plus rapide
+PROFILES = {
+    "accurate": Profile("accurate", WHISPER_MODEL_SIZE, beam_size=5, initial_rtf=0.8),
+    "balanced": Profile("balanced", WHISPER_MODEL_SIZE, beam_size=1, initial_rtf=0.4),
+    "fast": Profile("fast", WHISPER_FAST_MODEL_SIZE, beam_size=1, initial_rtf=0.15),
+}
+
+_rtf = {}
+_rtf_lock = threading.Lock()
+
+def get_profile(name: str) -> Profile:
+    """Retourne le profil nommé (ValueError si inconnu)"""
+    if name not in PROFILES:
+        raise ValueError(f"Unknown transcription profile: {name} (expected one of {', '.join(PROFILES)})")
+    return PROFILES[name]
+
+def profile_rtf(name: str) -> float:
+    """RTF courant du profil : moyenne des mesures, ou estimation initiale"""
+    with _rtf_lock:
+        return _rtf.get(name, PROFILES[name].initial_rtf)
+
+def record_rtf(name: str, rtf: float) -> None:
+    """Intégrer le RTF de décodage mesuré d'une transcription dans la moyenne mobile du profil"""
+    with _rtf_lock:
+        previous = _rtf.get(name, PROFILES[name].initial_rtf)
+        _rtf[name] = (1 - RTF_SMOOTHING) * previous + RTF_SMOOTHING * rtf
+
+def estimate_turnaround(name: str, speech_seconds: float, queued_speech: float, workers: int) -> float:
+    """
+    Délai estimé avec ce profil : décodage de ce job, puis écoulement de la file.
+
+    Le job courant est déjà en cours : la file ne passe pas avant lui. Le
+    délai visé est celui du dernier job en attente, soit ce décodage plus la
+    parole en file (queued_speech secondes) répartie entre les workers, au
+    même RTF.
+    """
+    rtf = profile_rtf(name)
+    return speech_seconds * rtf + queued_speech * rtf / max(workers, 1)
+
+def select_profile(speech_seconds: float, queued_speech: float = 0.0, workers: int = 1,
+                   target: float = None, requested: str = None) -> Profile:
+    """
+    Choisit le profil de transcription d'un job.
+
+    Args:
+        speech_seconds (float): Durée de parole après suppression des silences.
+        queued_speech (float): Parole estimée des jobs en attente (secondes).
+        workers (int): Workers de traitement qui se partagent la file.
+        target (float): Délai cible en secondes ; WHISPER_TURNAROUND_TARGET par défaut.
+        requested (str): Profil imposé ou "auto" ; WHISPER_PROFILE par défaut.
+
+    Returns:
+        Profile: Profil imposé, ou le plus précis qui tient dans le délai cible
+            (fast si aucun n'y parvient).
+    """
+    requested = (requested or WHISPER_PROFILE).lower()
+    if requested != "auto":
+        return get_profile(requested)
+
+    target = WHISPER_TURNAROUND_TARGET if target is None else target
+    for name in PROFILES:
+        estimate = estimate_turnaround(name, speech_seconds, queued_speech, workers)
+        if estimate <= target:
+            break
+    print(f"[Profile] speech {speech_seconds:.0f}s | queued speech {queued_speech:.0f}s | {name} "
+          f"(estimated {estimate:.0f}s, target {target:.0f}s)")
+    return PROFILES[name]
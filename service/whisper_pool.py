@@ -0,0 +1,137 @@
+"""
+===============================================================
+ Fichier        : whisper_pool.py
+ Auteur         : Mohamed-Amine ELGAOUZI
+ Description    : Pool de process dédiés à la transcription locale.
+                  Chaque worker reçoit un budget de threads explicite
+                  (cpu_threads / num_workers de CTranslate2) et,
+                  en option, ses propres cœurs : le total des threads
+                  correspond au matériel au lieu de le sursouscrire.
+ Créé le        : 18/10/2026
+ Dernière maj   : 18/10/2026
+===============================================================
+ Dépendances    :
+ - os
+ - threading
+ - multiprocessing
+ - concurrent.futures
+ - dotenv
+ - service.whisper_registry
+ - service.transcribe
+
+ Fonctionnalités clés :
+ - WHISPER_POOL_WORKERS process, chacun avec son modèle chargé et
+   préchauffé au démarrage du worker
+ - Budget par worker : WHISPER_POOL_CPU_THREADS (défaut : cœurs
+   disponibles / nombre de workers), WHISPER_NUM_WORKERS inchangé
+ - Épinglage optionnel (WHISPER_POOL_PIN_CORES=1) : chaque worker est
+   fixé sur un bloc de cœurs distinct (os.sched_setaffinity)
+ - Les jobs passent par la file du pool au lieu de s'exécuter dans
+   les threads de l'API
+
+ Notes :
+ - Process créés en mode "spawn" : aucun état CTranslate2 ni thread
+   hérité du process de l'API.
+ - Le budget s'applique aussi aux bibliothèques OpenMP du worker
+   (OMP_NUM_THREADS).
+===============================================================
+"""
+
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+WHISPER_POOL_WORKERS = int(os.getenv("WHISPER_POOL_WORKERS", "2"))
+WHISPER_POOL_CPU_THREADS = int(os.getenv("WHISPER_POOL_CPU_THREADS", "0"))  # 0 = cœurs / workers
+WHISPER_POOL_PIN_CORES = os.getenv("WHISPER_POOL_PIN_CORES", "0") == "1"
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def available_cores() -> list:
+    """Cœurs utilisables par le process (affinité courante si disponible)"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def thread_budget(workers: int = None, cpu_threads: int = None) -> tuple:
+    """
+    Calcule le budget de threads et la répartition des cœurs du pool.
+
+    Returns:
+        tuple: (threads par worker, liste des blocs de cœurs, un par worker).
+    """
+    workers = workers or WHISPER_POOL_WORKERS
+    cores = available_cores()
+    threads = cpu_threads or WHISPER_POOL_CPU_THREADS or max(1, len(cores) // workers)
+    if workers * threads > len(cores):
+        print(f"⚠️ Whisper pool oversubscribed: {workers} workers x {threads} threads > {len(cores)} cores")
+    blocks = [[cores[(i * threads + j) % len(cores)] for j in range(threads)] for i in range(workers)]
+    return threads, blocks
+
+def _init_worker(cpu_threads, pin_cores, core_blocks):
+    """Initialiser un process worker : affinité, budget de threads, modèle préchargé"""
+    cores = core_blocks.get()
+    if pin_cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    os.environ["OMP_NUM_THREADS"] = str(cpu_threads)
+
+    from service.whisper_registry import configure_threads, get_model
+    configure_threads(cpu_threads=cpu_threads)
+    get_model()
+    pinned = f" pinned to cores {cores}" if pin_cores else ""
+    print(f"[WhisperPool] worker {os.getpid()} ready | cpu_threads={cpu_threads}{pinned}")
+
+def _transcribe_job(filename, model_size, compute_type, trim_result, original_path, profile):
+    """Tâche exécutée dans un worker du pool : chemin du texte et temps de décodage (hors attente du pool)"""
+    from service.transcribe import transcribe_audio
+    timing = {}
+    output_path = transcribe_audio(filename, model_size, compute_type, trim_result, original_path, profile=profile,
+                                   timing=timing)
+    return output_path, timing
+
+def get_pool() -> ProcessPoolExecutor:
+    """Retourne le pool de transcription partagé (créé à la première utilisation)"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                ctx = multiprocessing.get_context("spawn")
+                threads, blocks = thread_budget()
+                core_blocks = ctx.Queue()
+                for block in blocks:
+                    core_blocks.put(block)
+                _pool = ProcessPoolExecutor(
+                    max_workers=WHISPER_POOL_WORKERS, mp_context=ctx,
+                    initializer=_init_worker, initargs=(threads, WHISPER_POOL_PIN_CORES, core_blocks),
+                )
+                print(f"[WhisperPool] {WHISPER_POOL_WORKERS} workers x {threads} threads "
+                      f"| {len(available_cores())} cores available")
+    return _pool
+
+def transcribe_audio_pooled(filename: str, model_size: str = None, compute_type: str = None,
+                            trim_result=None, original_path: str = None, profile: str = None,
+                            timing: dict = None) -> str:
+    """
+    Transcrit un fichier traité dans un worker du pool (même résultat que transcribe_audio).
+
+    Args:
+        filename (str): Nom de base du fichier (sans extension) dans 'data/audio/processed'.
+        model_size (str): Taille du modèle ; WHISPER_MODEL_SIZE par défaut.
+        compute_type (str): Quantification ; WHISPER_COMPUTE_TYPE par défaut.
+        trim_result (TrimResult): Carte des segments de parole ; seules ces plages sont transcrites.
+        original_path (str): Enregistrement original à transcrire à la place du fichier traité.
+        profile (str): Profil de transcription ("fast", "balanced", "accurate").
+        timing (dict): Reçoit decode_seconds, mesuré dans le worker (sans l'attente d'un worker libre).
+
+    Returns:
+        str: Chemin vers le fichier texte contenant la transcription.
+    """
+    job = get_pool().submit(_transcribe_job, filename, model_size, compute_type, trim_result, original_path, profile)
+    output_path, job_timing = job.result()
+    if timing is not None:
+        timing.update(job_timing)
+    return output_path
@@ -0,0 +1,143 @@
+"""
+===============================================================
+ Fichier        : whisper_registry.py
+ Auteur         : Mohamed-Amine ELGAOUZI
+ Description    : Registre des modèles Faster Whisper : chaque
+                  couple (taille, compute_type) est chargé une seule
+                  fois par process, préchauffé, puis partagé entre
+                  les threads de transcription.
+ Créé le        : 18/10/2026
+ Dernière maj   : 18/10/2026
+===============================================================
+ Dépendances    :
+ - os
+ - time
+ - threading
+ - numpy
+ - dotenv
+ - faster_whisper
+
+ Fonctionnalités clés :
+ - get_model(size, compute_type) : chargement paresseux, un verrou par
+   modèle (deux threads ne chargent jamais le même modèle deux fois)
+ - Inférence de préchauffage sur une seconde de bruit après chargement
+ - preload_models() : chargement au démarrage de l'API (WHISPER_PRELOAD=1)
+ - configure_threads() : budget cpu_threads / num_workers d'un process
+ - model_stats() : temps de chargement, de préchauffage et mémoire
+   (RSS) par modèle, exposés dans /health
+
+ Notes :
+ - Un WhisperModel peut être appelé depuis plusieurs threads ;
+   WHISPER_NUM_WORKERS fixe le nombre de transcriptions réellement
+   exécutées en parallèle par CTranslate2.
+ - La mémoire d'un modèle est mesurée par la variation du RSS du
+   process pendant son chargement (approximation).
+===============================================================
+"""
+
+import os
+import time
+import threading
+import numpy as np
+from dotenv import load_dotenv
+from faster_whisper import WhisperModel
+
+load_dotenv()
+WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL_SIZE", "medium")
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "cpu")  # "cuda" si GPU disponible
+WHISPER_CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS", "0"))  # 0 = choix de CTranslate2
+WHISPER_NUM_WORKERS = int(os.getenv("WHISPER_NUM_WORKERS", "1"))
+WHISPER_PRELOAD = os.getenv("WHISPER_PRELOAD", "0") == "1"
+WHISPER_WARMUP = os.getenv("WHISPER_WARMUP", "1") == "1"
+WHISPER_LANGUAGE = os.getenv("WHISPER_LANGUAGE", "fr")  # langue imposée : pas de détection
+
+WARMUP_SECONDS = 1
+SAMPLE_RATE = 16000
+
+_models = {}
+_model_info = {}
+_key_locks = {}
+_registry_lock = threading.Lock()
+
+def _rss_bytes() -> int:
+    """Mémoire résidente actuelle du process (Linux : /proc/self/statm)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+def _warmup(model: WhisperModel) -> float:
+    """Transcrire une seconde de bruit faible pour initialiser les noyaux et allocateurs"""
+    start = time.perf_counter()
+    audio = (np.random.default_rng(0).standard_normal(WARMUP_SECONDS * SAMPLE_RATE) * 0.01).astype(np.float32)
+    segments, _ = model.transcribe(audio, beam_size=1, vad_filter=False)
+    list(segments)  # les segments sont générés paresseusement
+    return time.perf_counter() - start
+
+def get_model(size: str = None, compute_type: str = None) -> WhisperModel:
+    """
+    Retourne le modèle demandé, chargé et préchauffé une seule fois par process.
+
+    Args:
+        size (str): Taille du modèle ("tiny", "base", "small", "medium", "large-v3"...) ;
+            WHISPER_MODEL_SIZE par défaut.
+        compute_type (str): Quantification CTranslate2 ("int8", "int8_float16", "float16"...) ;
+            WHISPER_COMPUTE_TYPE par défaut.
+
+    Returns:
+        WhisperModel: Modèle partagé (utilisable depuis plusieurs threads).
+    """
+    key = (size or WHISPER_MODEL_SIZE, compute_type or WHISPER_COMPUTE_TYPE)
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _registry_lock:
+        lock = _key_locks.setdefault(key, threading.Lock())
+    with lock:
+        if key in _models:
+            return _models[key]
+
+        print(f"[Whisper] Loading model {key[0]} ({key[1]}, {WHISPER_DEVICE})...")
+        rss_before = _rss_bytes()
+        start = time.perf_counter()
+        model = WhisperModel(key[0], device=WHISPER_DEVICE, compute_type=key[1],
+                             cpu_threads=WHISPER_CPU_THREADS, num_workers=WHISPER_NUM_WORKERS)
+        load_seconds = time.perf_counter() - start
+        warmup_seconds = _warmup(model) if WHISPER_WARMUP else None
+
+        info = {
+            "size": key[0],
+            "compute_type": key[1],
+            "device": WHISPER_DEVICE,
+            "load_seconds": load_seconds,
+            "warmup_seconds": warmup_seconds,
+            "memory_bytes": max(_rss_bytes() - rss_before, 0),
+            "loaded_at": time.time(),
+        }
+        _model_info[key] = info
+        _models[key] = model
+
+    warmup = f" | warmup {warmup_seconds:.2f}s" if warmup_seconds is not None else ""
+    print(f"[Whisper] Model {key[0]} ({key[1]}) loaded in {load_seconds:.2f}s{warmup} "
+          f"| ~{info['memory_bytes'] / 1024 ** 2:.0f} MB")
+    return model
+
+def configure_threads(cpu_threads: int = None, num_workers: int = None) -> None:
+    """Fixer le budget de threads des modèles chargés ensuite (process worker de service.whisper_pool)"""
+    global WHISPER_CPU_THREADS, WHISPER_NUM_WORKERS
+    if cpu_threads is not None:
+        WHISPER_CPU_THREADS = cpu_threads
+    if num_workers is not None:
+        WHISPER_NUM_WORKERS = num_workers
+
+def preload_models() -> None:
+    """Charger et préchauffer le modèle par défaut au démarrage si WHISPER_PRELOAD=1"""
+    if WHISPER_PRELOAD:
+        get_model()
+
+def model_stats() -> list:
+    """Modèles chargés : taille, compute_type, temps de chargement / préchauffage, mémoire"""
+    return [dict(info) for info in _model_info.values()]
@@ -0,0 +1,70 @@
+"""
+Configuration pytest : rend les paquets service/ et utils/ importables
+depuis la racine du dépôt, quel que soit le répertoire de lancement, et
+fournit des enregistrements synthétiques (parole simulée + silences).
+"""
+
+import os
+import sys
+import wave
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def synthetic_call(seconds, rate=16000, seed=0, speech_level=3000.0, noise_level=30.0):
+    """Signal d'appel synthétique : bruit de fond et rafales harmoniques modulées (pseudo-parole)"""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * rate)
+    t = np.arange(n) / rate
+    signal = rng.normal(0, noise_level, n)
+    pos = 0
+    while pos < n:
+        length = int(rng.uniform(0.3, 4) * rate)
+        if rng.random() < 0.5:
+            seg = t[pos:pos + length]
+            f0 = rng.uniform(100, 250)
+            burst = sum(np.sin(2 * np.pi * f0 * k * seg) / k for k in range(1, 8))
+            signal[pos:pos + length] += burst * speech_level * (1 + np.sin(2 * np.pi * 4 * seg))
+        pos += length
+    return np.clip(np.round(signal), -32768, 32767).astype("<i2")
+
+
+def write_pcm_wav(path, samples, rate=16000, channels=1):
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(np.asarray(samples, dtype="<i2").tobytes())
+    return str(path)
+
+
+def write_flac(path, samples, rate=16000):
+    """FLAC mono 16 bits (sans perte) encodé avec PyAV"""
+    import av
+    with av.open(str(path), "w", format="flac") as container:
+        stream = container.add_stream("flac", rate=rate)
+        stream.layout = "mono"
+        frame = av.AudioFrame.from_ndarray(np.asarray(samples, dtype="<i2").reshape(1, -1), format="s16", layout="mono")
+        frame.sample_rate = rate
+        for packet in stream.encode(frame):
+            container.mux(packet)
+        for packet in stream.encode(None):
+            container.mux(packet)
+    return str(path)
+
+
+@pytest.fixture(scope="session")
+def call_wav(tmp_path_factory):
+    """WAV 16 kHz mono de 60 s avec alternance parole / silence"""
+    path = tmp_path_factory.mktemp("audio") / "call.wav"
+    return write_pcm_wav(path, synthetic_call(60))
+
+
+@pytest.fixture(scope="session")
+def long_call_wav(tmp_path_factory):
+    """WAV 16 kHz mono de 200 s : plusieurs blocs du mode parallèle"""
+    path = tmp_path_factory.mktemp("audio") / "long_call.wav"
+    return write_pcm_wav(path, synthetic_call(200, seed=1))
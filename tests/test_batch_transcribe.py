@@ -0,0 +1,29 @@
+"""Tests du routage des segments d'un lot (service/batch_transcribe.py), pipeline Whisper simulé"""
+
+from types import SimpleNamespace
+
+import numpy as np
+
+from service import batch_transcribe
+
+
+class _FakePipeline:
+    """Un segment par morceau, horodaté à la milliseconde comme faster-whisper"""
+
+    def transcribe(self, audio, language=None, clip_timestamps=(), batch_size=None):
+        segments = [SimpleNamespace(start=round(clip["start"], 3), end=round(clip["end"], 3), text=f" clip{i} ")
+                    for i, clip in enumerate(clip_timestamps)]
+        return iter(segments), None
+
+
+def test_segments_follow_their_recording_at_unaligned_offsets(monkeypatch):
+    # Parole sur la première seconde de chaque enregistrement
+    monkeypatch.setattr(batch_transcribe, "speech_chunks", lambda audio: [(0, batch_transcribe.SAMPLE_RATE)])
+    batcher = batch_transcribe.BatchTranscriber()
+    batcher._pipeline = _FakePipeline()
+
+    # 80008 échantillons : le second enregistrement commence à 5.0005 s (arrondi à 5.0 par Whisper)
+    audios = [np.zeros(80008, dtype=np.float32), np.zeros(80000, dtype=np.float32), np.zeros(48001, dtype=np.float32)]
+    results = batcher.transcribe_batch(audios)
+
+    assert results == [[(0.0, 1.0, "clip0")], [(0.0, 1.0, "clip1")], [(0.0, 1.0, "clip2")]]
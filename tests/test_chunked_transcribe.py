@@ -0,0 +1,65 @@
+"""Tests du découpage en morceaux (service/chunked_transcribe.py)"""
+
+import numpy as np
+import pytest
+
+from service.chunked_transcribe import plan_chunks, stitch
+
+
+def _speech(chunk):
+    return sum(end - start for start, end in chunk[0])
+
+
+def _regions(seconds, seed=0):
+    """Plages de parole de 2 à 30 s séparées de courts silences"""
+    rng = np.random.default_rng(seed)
+    regions, t = [], 0.0
+    while t < seconds:
+        length = float(rng.uniform(2, 30))
+        regions.append((t, t + length))
+        t += length + float(rng.uniform(0.3, 3))
+    return regions
+
+
+@pytest.mark.parametrize("workers", [2, 3, 4, 8])
+def test_exactly_one_chunk_per_worker(workers):
+    regions = _regions(1250)
+    chunks = plan_chunks(regions, workers, overlap=2)
+    assert len(chunks) == workers
+    # Chaque morceau s'écarte de la part idéale d'au plus la plus longue plage
+    ideal = sum(end - start for start, end in regions) / workers
+    assert all(abs(_speech(chunk) - ideal) <= 30 for chunk in chunks)
+    # Segments entiers, dans l'ordre, sans perte ni doublon
+    assert [region for clips, _ in chunks for region in clips] == regions
+    assert all(cut is None for _, cut in chunks)
+
+
+def test_long_region_is_split_with_overlap():
+    chunks = plan_chunks([(0.0, 400.0)], 4, overlap=2)
+    assert len(chunks) == 4
+    assert chunks[0] == ([(0.0, 100.0)], None)
+    assert chunks[1] == ([(98.0, 198.0)], 99.0)
+    # La fin de plage restée dans le dernier morceau est fusionnée (pas de double transcription)
+    assert chunks[3] == ([(294.0, 400.0)], 295.0)
+    segments = stitch([[(clips[0][0], clips[-1][1], f"chunk {i}")] for i, (clips, _) in enumerate(chunks)],
+                      [cut for _, cut in chunks])
+    assert [text for _, _, text in segments] == ["chunk 0", "chunk 1", "chunk 2", "chunk 3"]
+
+
+def test_fewer_regions_than_workers():
+    assert len(plan_chunks([(0.0, 5.0), (6.0, 8.0)], 8, overlap=0.5)) >= 2
+    assert plan_chunks([], 4) == []
+
+
+def test_short_call_is_a_single_unsplit_chunk():
+    # Moins de parole que WHISPER_CHUNK_OVERLAP : un seul morceau, sans erreur
+    assert plan_chunks([(0.0, 1.5)], 1) == [([(0.0, 1.5)], None)]
+    assert plan_chunks([(0.0, 0.5), (1.0, 1.6)], 1, overlap=2) == [([(0.0, 0.5), (1.0, 1.6)], None)]
+
+
+def test_overlap_is_clamped_below_the_chunk():
+    chunks = plan_chunks([(0.0, 10.0)], 4, overlap=5)
+    assert len(chunks) == 4
+    # Recouvrement ramené à 1.25 s (demi-morceau) : la découpe avance et couvre toute la plage
+    assert chunks[0][0][0][0] == 0.0 and chunks[-1][0][-1][1] == 10.0
+    assert all(cut is not None for _, cut in chunks[1:])
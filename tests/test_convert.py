@@ -0,0 +1,76 @@
+"""Tests du plan de conversion et du décodage en place (service/convert.py)"""
+
+import struct
+import wave
+
+import numpy as np
+
+from service import convert
+
+
+def _write_wav(path, rate, channels, seconds=2.0):
+    t = np.arange(int(rate * seconds)) / rate
+    tone = (8000 * np.sin(2 * np.pi * 440 * t)).astype("<i2")
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(np.repeat(tone, channels).tobytes())
+
+
+def test_transcode_in_place_keeps_recording(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    processed = tmp_path / convert.PROCESSED_DIR
+    processed.mkdir(parents=True)
+    path = processed / "fiche.wav"
+    _write_wav(path, 44100, 2)
+
+    output = convert.convert_to_wav(str(path), "fiche")
+
+    assert output == f"{convert.PROCESSED_DIR}/fiche.wav"
+    with wave.open(output, "rb") as wf:
+        assert (wf.getframerate(), wf.getnchannels(), wf.getsampwidth()) == (16000, 1, 2)
+        assert abs(wf.getnframes() / wf.getframerate() - 2.0) < 0.05
+    assert list(processed.iterdir()) == [path]  # pas de fichier temporaire résiduel
+
+
+def test_rifx_is_not_read_as_little_endian():
+    fmt = struct.pack(">HHIIHH", 1, 1, 16000, 32000, 2, 16)
+    header = b"RIFX" + struct.pack(">I", 36) + b"WAVE" + b"fmt " + struct.pack(">I", 16) + fmt
+    info = convert.sniff_audio(header)
+    assert (info.sample_rate, info.channels, info.sample_width) == (16000, 1, 2)
+    assert info.big_endian and not info.is_pcm_wav and not info.is_target
+    assert convert.plan_conversion(info, "in.wav", "out.wav") == "transcode"
+
+
+def test_link_plan_never_modifies_the_source(tmp_path, monkeypatch):
+    from conftest import synthetic_call, write_pcm_wav
+    from utils.silence_trimmer import trim_silence
+    monkeypatch.chdir(tmp_path)
+    source = write_pcm_wav(tmp_path / "share.wav", synthetic_call(20))
+    original = open(source, "rb").read()
+
+    output = convert.convert_to_wav(source, "fiche")
+    assert open(output, "rb").read() == original
+    # Le trimmer réécrit la sortie liée : le fichier source doit rester intact
+    result = trim_silence(output, streaming=True, output_path=output)
+    assert result.trimmed_duration < result.original_duration
+    assert open(source, "rb").read() == original
+
+
+def test_convert_and_trim_streams_compressed_audio(tmp_path, monkeypatch):
+    from conftest import synthetic_call, write_flac
+    monkeypatch.chdir(tmp_path)
+    source = tmp_path / "call.flac"
+    write_flac(source, synthetic_call(30))
+
+    result = convert.convert_and_trim(str(source), "fiche")
+
+    assert result.output_path == f"{convert.PROCESSED_DIR}/fiche.wav"
+    assert abs(result.original_duration - 30) < 0.1
+    assert 0 < result.trimmed_duration < result.original_duration
+    with wave.open(result.output_path, "rb") as wf:
+        assert (wf.getframerate(), wf.getnchannels()) == (16000, 1)
+        assert wf.getnframes() == round(result.trimmed_duration * 16000)
+    # Décodage en flux : aucun WAV intermédiaire
+    assert sorted(p.name for p in (tmp_path / convert.PROCESSED_DIR).iterdir()) == ["fiche.wav"]
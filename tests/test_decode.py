@@ -0,0 +1,90 @@
+"""Tests du décodage en flux (service/decode.py) avec PyAV"""
+
+import os
+import wave
+
+import numpy as np
+import pytest
+
+from conftest import synthetic_call, write_flac, write_pcm_wav
+from service import decode
+
+
+@pytest.fixture(autouse=True)
+def av_backend(monkeypatch):
+    pytest.importorskip("av")
+    monkeypatch.setattr(decode, "DECODE_BACKEND", "av")
+
+
+def _read_wav(path):
+    with wave.open(str(path), "rb") as wf:
+        assert (wf.getnchannels(), wf.getsampwidth(), wf.getframerate()) == (1, 2, decode.SAMPLE_RATE)
+        return np.frombuffer(wf.readframes(wf.getnframes()), dtype="<i2")
+
+
+def test_decode_to_wav_round_trip(tmp_path):
+    samples = synthetic_call(5)
+    source = write_flac(tmp_path / "call.flac", samples)
+
+    stats = decode.decode_to_wav(source, str(tmp_path / "call.wav"))
+
+    assert np.array_equal(_read_wav(tmp_path / "call.wav"), samples)  # FLAC sans perte, même taux
+    assert stats["backend"] == "av"
+    assert stats["audio_seconds"] == pytest.approx(5)
+    assert sorted(os.listdir(tmp_path)) == ["call.flac", "call.wav"]
+
+
+def test_decode_to_wav_replaces_its_own_source(tmp_path):
+    samples = synthetic_call(5)
+    path = write_flac(tmp_path / "call.wav", samples)  # FLAC sous une extension .wav
+    link = tmp_path / "share.wav"
+    os.link(path, link)
+    original = link.read_bytes()
+
+    decode.decode_to_wav(path, path)
+
+    # Fichier temporaire renommé en place : la source liée reste intacte
+    assert np.array_equal(_read_wav(path), samples)
+    assert link.read_bytes() == original
+    assert sorted(os.listdir(tmp_path)) == ["call.wav", "share.wav"]
+
+
+def test_failed_decode_keeps_previous_output(tmp_path):
+    source = tmp_path / "broken.mp3"
+    source.write_bytes(b"not audio at all" * 64)
+    output = tmp_path / "call.wav"
+    output.write_bytes(b"previous")
+
+    with pytest.raises(Exception):
+        decode.decode_to_wav(str(source), str(output))
+
+    assert output.read_bytes() == b"previous"
+    assert sorted(os.listdir(tmp_path)) == ["broken.mp3", "call.wav"]
+
+
+def test_open_pcm_wav_streams_header_then_pcm(tmp_path):
+    samples = synthetic_call(5)
+    source = write_flac(tmp_path / "call.flac", samples)
+
+    with open(source, "rb") as f, decode.open_pcm_wav(f, name="call") as stream:
+        header = stream.read(len(decode.wav_stream_header()))
+        pcm = b"".join(iter(lambda: stream.read(4096), b""))
+
+    assert header == decode.wav_stream_header()
+    assert np.array_equal(np.frombuffer(pcm, dtype="<i2"), samples)
+    assert stream.stats["audio_seconds"] == pytest.approx(5)
+
+
+def test_open_pcm_wav_feeds_the_trimmer(tmp_path):
+    from utils.silence_trimmer import trim_silence, trim_silence_stream
+    samples = synthetic_call(20)
+    source = write_flac(tmp_path / "call.flac", samples)
+    reference = trim_silence(write_pcm_wav(tmp_path / "ref.wav", samples),
+                             output_path=str(tmp_path / "ref_out.wav"))
+
+    with decode.open_pcm_wav(source) as stream:
+        result = trim_silence_stream(stream, str(tmp_path / "out.wav"))
+
+    assert result.original_duration == pytest.approx(20)
+    assert result.segments.tolist() == reference.segments.tolist()
+    assert np.array_equal(_read_wav(result.output_path), _read_wav(reference.output_path))
@@ -0,0 +1,35 @@
+"""Tests de la correspondance des URL ORIG et MP3 (service/download.py)"""
+
+import pytest
+
+from service.download import resolve_mp3_url, resolve_orig_url
+
+HOST = "https://records.example.com/RECORDINGS"
+
+
+@pytest.mark.parametrize("url, mp3_url", [
+    (f"{HOST}/ORIG/2026/call.wav", f"{HOST}/MP3/2026/call.mp3"),
+    (f"{HOST}/2026/call.wav", f"{HOST}/MP3/2026/call.mp3"),
+    (f"{HOST}/MP3/2026/call.mp3", f"{HOST}/MP3/2026/call.mp3"),
+    (f"{HOST}/ORIG/2026/CALL.WAV", f"{HOST}/MP3/2026/CALL.mp3"),
+    (f"{HOST}/ORIG/2026/call.wav.bak.wav", f"{HOST}/MP3/2026/call.wav.bak.mp3"),
+])
+def test_mp3_url(url, mp3_url):
+    assert resolve_mp3_url(url) == mp3_url
+
+
+@pytest.mark.parametrize("url", [f"{HOST}/ORIG/2026/call.wav", f"{HOST}/MP3/2026/call.mp3"])
+def test_orig_and_mp3_urls_map_to_each_other(url):
+    orig_url, mp3_url = resolve_orig_url(url), resolve_mp3_url(url)
+    assert resolve_mp3_url(orig_url) == mp3_url
+    assert resolve_orig_url(mp3_url) == orig_url
+
+
+def test_non_http_sources_are_left_alone():
+    for url in ("file:///share/RECORDINGS/ORIG/call.wav", "s3://recordings/RECORDINGS/call.wav"):
+        assert resolve_mp3_url(url) == url
+
+
+def test_unsupported_extension():
+    with pytest.raises(ValueError):
+        resolve_mp3_url(f"{HOST}/ORIG/call.ogg")
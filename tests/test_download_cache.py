@@ -0,0 +1,45 @@
+"""Tests du cache de téléchargement (service/download_cache.py)"""
+
+import types
+
+import pytest
+
+from service import download_cache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(download_cache, "CACHE_DIR", str(tmp_path / "cache"))
+
+    def fake_download(url, filepath, headers=None):
+        if headers:
+            return types.SimpleNamespace(status_code=304, headers={})
+        with open(filepath, "wb") as f:
+            f.write(b"RIFF" + url.encode())
+        return types.SimpleNamespace(status_code=200, headers={"ETag": '"v1"'})
+
+    monkeypatch.setattr(download_cache, "download_file", fake_download)
+    return tmp_path
+
+
+def test_cached_fetch_links_destination(cache):
+    dest = cache / "call.wav"
+    assert download_cache.cached_fetch("http://h/a.wav", str(dest)) == str(dest)
+    assert dest.read_bytes() == b"RIFFhttp://h/a.wav"
+    # Revalidation (304) : la destination est recréée depuis le cache
+    dest.unlink()
+    download_cache.cached_fetch("http://h/a.wav", str(dest))
+    assert dest.read_bytes() == b"RIFFhttp://h/a.wav"
+
+
+def test_evict_skips_entry_in_use(cache):
+    download_cache.cached_fetch("http://h/a.wav", str(cache / "a.wav"))
+    key = download_cache.cache_key("http://h/a.wav")
+    data_path = cache / "cache" / f"{key}.audio"
+
+    with download_cache._key_lock(key):
+        download_cache.evict(max_bytes=0)
+        assert data_path.exists()
+
+    download_cache.evict(max_bytes=0)
+    assert not data_path.exists()
@@ -0,0 +1,85 @@
+"""Tests de la réutilisation des fichiers encodés (service/encode.py), ffmpeg simulé"""
+
+import os
+
+import pytest
+
+from conftest import synthetic_call, write_pcm_wav
+from service import encode
+
+
+@pytest.fixture
+def processed(tmp_path, monkeypatch):
+    monkeypatch.setattr(encode, "PROCESSED_DIR", str(tmp_path))
+    write_pcm_wav(tmp_path / "fiche.wav", synthetic_call(2))
+    return tmp_path
+
+
+@pytest.fixture
+def ffmpeg(monkeypatch):
+    """Appels ffmpeg enregistrés ; le fichier de sortie (dernier argument) reçoit un quart de l'entrée"""
+    calls = []
+
+    def run(args, check=False):
+        calls.append(args)
+        source, output = args[args.index("-i") + 1], args[-1]
+        with open(output, "wb") as f:
+            f.write(b"\x00" * (os.path.getsize(source) // 4))
+
+    monkeypatch.setattr(encode.subprocess, "run", run)
+    return calls
+
+
+def _age(path, seconds):
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime - seconds, stat.st_mtime - seconds))
+
+
+def test_wav_is_sent_as_is(processed, ffmpeg):
+    assert encode.encode_processed_audio("fiche", "wav") == str(processed / "fiche.wav")
+    assert ffmpeg == []
+    with pytest.raises(FileNotFoundError):
+        encode.encode_processed_audio("absent", "wav")
+
+
+@pytest.mark.parametrize("fmt, ext, codec", [("flac", ".flac", "flac"), ("opus", ".ogg", "libopus")])
+def test_encoded_file_is_reused(processed, ffmpeg, fmt, ext, codec):
+    first = encode.encode_processed_audio("fiche", fmt)
+    assert first == str(processed / f"fiche{ext}")
+    assert len(ffmpeg) == 1 and codec in ffmpeg[0]
+
+    # Seconde transcription du même fichier (ex. Whisper après AssemblyAI) : pas de ré-encodage
+    assert encode.encode_processed_audio("fiche", fmt) == first
+    assert len(ffmpeg) == 1
+
+
+def test_wav_rewritten_after_encoding_is_reencoded(processed, ffmpeg):
+    encoded = encode.encode_processed_audio("fiche", "flac")
+    _age(encoded, 60)  # le WAV traité a été réécrit depuis l'encodage
+    assert encode.encode_processed_audio("fiche", "flac") == encoded
+    assert len(ffmpeg) == 2
+
+
+def test_stale_wav_does_not_trigger_reencoding(processed, ffmpeg):
+    _age(processed / "fiche.wav", 60)
+    encode.encode_processed_audio("fiche", "flac")
+    encode.encode_processed_audio("fiche", "flac")
+    assert len(ffmpeg) == 1
+
+
+def test_encoded_file_is_used_once_the_wav_is_removed(processed, ffmpeg, monkeypatch):
+    monkeypatch.setattr(encode, "ENCODE_REMOVE_WAV", True)
+    encoded = encode.encode_processed_audio("fiche", "flac")
+    assert not os.path.exists(processed / "fiche.wav")
+    assert encode.encode_processed_audio("fiche", "flac") == encoded
+    assert len(ffmpeg) == 1
+
+
+def test_errors(processed, ffmpeg, monkeypatch):
+    with pytest.raises(ValueError):
+        encode.encode_processed_audio("fiche", "mp3")
+    with pytest.raises(FileNotFoundError):
+        encode.encode_processed_audio("absent", "flac")
+    monkeypatch.setattr(encode.subprocess, "run", lambda args, check=False: open(args[-1], "wb").close())
+    with pytest.raises(ValueError, match="empty"):
+        encode.encode_processed_audio("fiche", "flac")
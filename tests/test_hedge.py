@@ -0,0 +1,130 @@
+"""Tests de la transcription couverte (service/hedge.py) avec des moteurs simulés"""
+
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from conftest import write_pcm_wav
+from service import hedge
+
+
+@pytest.fixture
+def hedge_dirs(tmp_path, monkeypatch):
+    processed, transcripts = tmp_path / "processed", tmp_path / "transcripts"
+    processed.mkdir()
+    monkeypatch.setattr(hedge, "PROCESSED_DIR", str(processed))
+    monkeypatch.setattr(hedge, "TRANSCRIPT_DIR", str(transcripts))
+    monkeypatch.setattr(hedge, "_latencies", hedge._latencies.__class__(maxlen=hedge.HEDGE_HISTORY))
+    monkeypatch.setattr(hedge, "HEDGE_DEFAULT_DEADLINE", 0.05)
+    monkeypatch.setattr(hedge, "ASSEMBLYAI_POLL_INTERVAL", 0.01)
+    monkeypatch.setattr(hedge, "_tracked", {})
+    write_pcm_wav(processed / "call.wav", np.zeros(16000 * 10))  # 10 s d'audio
+    return transcripts
+
+
+def _write(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
+
+
+def _whisper(filename, profile=None, output_path=None, cancel=None):
+    return _write(output_path, "whisper")
+
+
+def _wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class _RemoteAssemblyAI:
+    """AssemblyAI simulé : transcriptions distantes terminées à la main, suivi interrompu par cancel"""
+
+    def __init__(self):
+        self.completed = set()
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def transcribe(self, filename, output_path=None, cancel=None, on_submit=None):
+        with self.lock:
+            self.count += 1
+            transcript_id = f"t{self.count}"
+        on_submit(transcript_id)
+        while transcript_id not in self.completed:
+            if cancel.wait(0.01):
+                return None
+        return _write(output_path, "assemblyai")
+
+    def status(self, transcript_id):
+        return "completed" if transcript_id in self.completed else "processing"
+
+
+def test_losing_assemblyai_latency_is_recorded_without_a_transcript(hedge_dirs, monkeypatch):
+    remote = _RemoteAssemblyAI()
+    monkeypatch.setattr(hedge, "transcribe_with_assemblyai", remote.transcribe)
+    monkeypatch.setattr(hedge, "transcript_status", remote.status)
+    monkeypatch.setattr(hedge, "transcribe_audio", _whisper)
+
+    output = hedge.transcribe_hedged("call")
+    assert open(output, encoding="utf-8").read() == "whisper"
+    # AssemblyAI annulé : son identifiant est suivi jusqu'à la fin distante
+    assert _wait_until(lambda: "t1" in hedge._tracked)
+    assert len(hedge._latencies) == 0
+    time.sleep(0.3)
+    remote.completed.add("t1")
+    # Latence par seconde d'audio mesurée quand la transcription distante termine
+    assert _wait_until(lambda: len(hedge._latencies) == 1)
+    assert 0.025 < hedge._latencies[0] < 0.1
+    assert hedge._tracked == {}
+    assert not os.path.exists(hedge_dirs / "call.assemblyai.txt")
+
+
+def test_piled_up_losers_do_not_block_winners(hedge_dirs, monkeypatch):
+    remote = _RemoteAssemblyAI()
+    monkeypatch.setattr(hedge, "transcribe_with_assemblyai", remote.transcribe)
+    monkeypatch.setattr(hedge, "transcript_status", remote.status)
+    monkeypatch.setattr(hedge, "transcribe_audio", _whisper)
+
+    # Bien plus de jobs que de threads dans le pool, AssemblyAI ne termine jamais à temps
+    jobs = hedge._executor._max_workers * 3
+    start = time.perf_counter()
+    for _ in range(jobs):
+        hedge.transcribe_hedged("call")
+    assert time.perf_counter() - start < jobs * 0.5
+    assert _wait_until(lambda: len(hedge._tracked) == jobs)
+    assert len(hedge._latencies) == 0
+
+    remote.completed.update(hedge._tracked)
+    assert _wait_until(lambda: len(hedge._latencies) == jobs)
+    assert hedge._tracked == {}
+    assert not any(name.endswith(".assemblyai.txt") for name in os.listdir(hedge_dirs))
+
+
+def test_loser_finishing_at_the_same_time_leaves_no_file(hedge_dirs, monkeypatch):
+    def late_assemblyai(filename, output_path=None, cancel=None, on_submit=None):
+        time.sleep(0.2)
+        return _write(output_path, "assemblyai")  # écrit avant d'avoir vu cancel
+
+    def slow_whisper(filename, profile=None, output_path=None, cancel=None):
+        time.sleep(0.1)
+        return _write(output_path, "whisper")
+
+    monkeypatch.setattr(hedge, "transcribe_with_assemblyai", late_assemblyai)
+    monkeypatch.setattr(hedge, "transcribe_audio", slow_whisper)
+
+    hedge.transcribe_hedged("call")
+    assert _wait_until(lambda: len(hedge._latencies) == 1)
+    assert _wait_until(lambda: not os.path.exists(hedge_dirs / "call.assemblyai.txt"))
+    assert sorted(os.listdir(hedge_dirs)) == ["call.txt"]
+
+
+def test_deadline_scales_with_audio_duration(monkeypatch):
+    monkeypatch.setattr(hedge, "_latencies", hedge._latencies.__class__([0.5] * hedge.HEDGE_MIN_SAMPLES))
+    assert hedge.hedge_deadline(600) == pytest.approx(300)
+    assert hedge.hedge_deadline(10) == hedge.HEDGE_MIN_DEADLINE
+    assert hedge.hedge_deadline(None) == hedge.HEDGE_DEFAULT_DEADLINE
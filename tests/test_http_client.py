@@ -0,0 +1,47 @@
+"""Tests du téléchargement segmenté (service/http_client.py)"""
+
+import http.server
+import threading
+
+import pytest
+
+from service import http_client
+
+PAYLOAD = bytes(range(256)) * 1024
+
+
+class _NoHeadHandler(http.server.BaseHTTPRequestHandler):
+    """Serveur qui refuse HEAD mais sert le fichier en GET"""
+    protocol_version = "HTTP/1.1"
+    head_status = 405
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self.send_response(self.head_status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(PAYLOAD)))
+        self.end_headers()
+        self.wfile.write(PAYLOAD)
+
+
+@pytest.fixture(params=[405, 403])
+def server_url(request):
+    handler = type("Handler", (_NoHeadHandler,), {"head_status": request.param})
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/call.wav"
+    server.shutdown()
+
+
+def test_segmented_falls_back_when_head_rejected(server_url, tmp_path, monkeypatch):
+    monkeypatch.setattr(http_client, "DOWNLOAD_SEGMENTED_MIN_BYTES", 0)
+    target = tmp_path / "call.wav"
+    response = http_client.fetch_to_file_segmented(server_url, str(target), segments=4)
+    assert response.status_code == 200
+    assert target.read_bytes() == PAYLOAD
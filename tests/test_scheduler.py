@@ -0,0 +1,62 @@
+"""Tests de la transcription partielle exposée par Job.to_dict (service/scheduler.py)"""
+
+import json
+import threading
+
+from service.scheduler import Job
+
+
+def _job(count):
+    job = Job(fiche_id=1, audio_url="https://example.com/call.wav")
+    for i in range(count):
+        job.add_segment(float(i), i + 0.5, f"segment {i}")
+    return job
+
+
+def test_since_returns_only_new_segments():
+    job = _job(5)
+    data = job.to_dict(since=3)
+    assert [s["text"] for s in data["segments"]] == ["segment 3", "segment 4"]
+    assert data["segments_total"] == 5
+    assert data["fiche_id"] == 1 and data["status"] == "queued"
+    json.dumps(data)  # renvoyé tel quel par l'API
+
+
+def test_full_payload_and_up_to_date_client():
+    job = _job(3)
+    assert [s["start"] for s in job.to_dict()["segments"]] == [0.0, 1.0, 2.0]
+    # Client à jour, ou en avance sur le job : rien de nouveau, total inchangé
+    for since in (3, 10):
+        data = job.to_dict(since=since)
+        assert data["segments"] == [] and data["segments_total"] == 3
+
+
+def test_payload_does_not_alias_job_state():
+    job = _job(2)
+    data = job.to_dict()
+    data["segments"].append({"start": 9.0, "end": 9.5, "text": "extra"})
+    assert len(job.segments) == 2
+
+
+def test_polling_while_segments_are_added_sees_each_segment_once():
+    job = _job(0)
+    total = 2000
+    done = threading.Event()
+
+    def transcribe():
+        for i in range(total):
+            job.add_segment(float(i), i + 0.5, f"segment {i}")
+        done.set()
+
+    writer = threading.Thread(target=transcribe)
+    writer.start()
+    received, since = [], 0
+    while True:
+        finished = done.is_set()
+        data = job.to_dict(since=since)
+        received += data["segments"]
+        since = data["segments_total"]
+        if finished and not data["segments"]:
+            break
+    writer.join()
+    assert [s["text"] for s in received] == [f"segment {i}" for i in range(total)]
@@ -0,0 +1,221 @@
+"""Tests du trimmer (utils/silence_trimmer.py) avec le vrai webrtcvad"""
+
+import wave
+
+import webrtcvad
+
+from utils import silence_trimmer as st
+from utils.trim_bench import original_vad_collector as reference_vad_collector, bench_file
+
+
+def _reference_output(path, mode=st.VAD_MODE, padding_ms=st.PADDING_MS):
+    with wave.open(path, "rb") as wf:
+        pcm, rate = wf.readframes(wf.getnframes()), wf.getframerate()
+    frames = list(st.frame_generator(st.FRAME_DURATION_MS, pcm, rate))
+    return reference_vad_collector(rate, st.FRAME_DURATION_MS, padding_ms, webrtcvad.Vad(mode), frames)
+
+
+def _read_pcm(path):
+    with wave.open(path, "rb") as wf:
+        return wf.readframes(wf.getnframes())
+
+
+def test_vad_collector_matches_original(call_wav):
+    pcm, rate = st.read_wave(call_wav)
+    frames = list(st.frame_generator(st.FRAME_DURATION_MS, pcm, rate))
+    for mode in range(4):
+        for padding_ms in (0, 90, st.PADDING_MS):
+            expected = reference_vad_collector(rate, st.FRAME_DURATION_MS, padding_ms, webrtcvad.Vad(mode), frames)
+            actual = st.vad_collector(rate, st.FRAME_DURATION_MS, padding_ms, webrtcvad.Vad(mode), frames)
+            assert actual == expected, (mode, padding_ms)
+
+
+def test_trim_silence_output_matches_original(call_wav, tmp_path):
+    expected = _reference_output(call_wav)
+    assert expected  # l'enregistrement contient de la parole
+
+    in_memory = st.trim_silence(call_wav, output_path=str(tmp_path / "mem.wav"))
+    streamed = st.trim_silence(call_wav, streaming=True, output_path=str(tmp_path / "stream.wav"))
+
+    for result in (in_memory, streamed):
+        assert _read_pcm(result.output_path) == expected
+        assert result.trimmed_duration == len(expected) / 2 / result.sample_rate
+    assert in_memory.segments.tolist() == streamed.segments.tolist()
+
+
+def test_segments_cover_trimmed_audio(call_wav):
+    result = st.detect_speech(call_wav)
+    expected = _reference_output(call_wav)
+    pcm = _read_pcm(call_wav)
+    rebuilt = b''.join(pcm[start * 2:end * 2] for start, end in result.segments.tolist())
+    assert rebuilt == expected
+    assert result.output_path is None
+
+
+def test_bench_reports_parity(call_wav):
+    summary = bench_file(call_wav)
+    engines = summary["engines"]
+    assert engines["exact"]["identical_to_original"]
+    assert engines["single_pass"]["frames_per_second"] > engines["exact"]["frames_per_second"]
+
+
+# --- Mode mono-passe (approché, sur demande) ---
+
+def test_single_pass_matches_vad_collector_in_every_mode(call_wav, tmp_path):
+    pcm, rate = st.read_wave(call_wav)
+    frames = list(st.frame_generator(st.FRAME_DURATION_MS, pcm, rate))
+    expected = st.vad_collector(rate, st.FRAME_DURATION_MS, st.PADDING_MS, webrtcvad.Vad(st.VAD_MODE), frames,
+                                single_pass=True)
+
+    in_memory = st.trim_silence(call_wav, single_pass=True, output_path=str(tmp_path / "mem.wav"))
+    streamed = st.trim_silence(call_wav, streaming=True, single_pass=True, output_path=str(tmp_path / "stream.wav"))
+    with open(call_wav, "rb") as stream:
+        from_stream = st.trim_silence_stream(stream, str(tmp_path / "flux.wav"), single_pass=True)
+    detected = st.detect_speech(call_wav, single_pass=True)
+
+    for result in (in_memory, streamed, from_stream):
+        assert _read_pcm(result.output_path) == expected
+    assert detected.segments.tolist() == in_memory.segments.tolist()
+    # Sortie approchée, proche du moteur exact
+    exact = st.detect_speech(call_wav)
+    assert abs(detected.trimmed_duration - exact.trimmed_duration) / exact.trimmed_duration < 0.05
+
+
+# --- Mode parallèle (approché, sur demande) ---
+
+def test_parallel_pool_is_reused():
+    assert st.get_vad_pool(2) is st.get_vad_pool(2)
+
+
+def test_parallel_decisions_close_to_single_process(long_call_wav):
+    pcm, rate = st.read_wave(long_call_wav)
+    frames = list(st.frame_generator(st.FRAME_DURATION_MS, pcm, rate))
+    assert len(frames) > 2 * st.PARALLEL_CHUNK_FRAMES
+
+    single = bytes(d for _, d in st.classify_frames(rate, webrtcvad.Vad(st.VAD_MODE), frames))
+    parallel = st.classify_frames_parallel(pcm, rate, workers=2)
+    assert len(parallel) == len(single)
+    differing = sum(a != b for a, b in zip(single, parallel))
+    assert differing / len(single) < 0.01
+    assert st.classify_frames_parallel(pcm, rate, workers=2) == parallel  # déterministe
+
+
+def test_parallel_trim_close_to_exact(long_call_wav, tmp_path):
+    exact = st.trim_silence(long_call_wav, streaming=True, output_path=str(tmp_path / "exact.wav"))
+    parallel = st.trim_silence(long_call_wav, workers=2, output_path=str(tmp_path / "parallel.wav"))
+    assert abs(parallel.trimmed_duration - exact.trimmed_duration) / exact.trimmed_duration < 0.02
+    assert parallel.original_duration == exact.original_duration
+    with wave.open(parallel.output_path, "rb") as wf:
+        assert wf.getnframes() / wf.getframerate() == parallel.trimmed_duration
+
+
+# --- Pré-filtre énergétique ---
+
+def _speech_dense_call(rate=16000, seed=3):
+    """Parole forte et parole faible (~-45 dBFS) en alternance, silences d'une seconde entre les tours.
+
+    Retourne (pcm, plages de parole faible, plages de silence) en échantillons.
+    """
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    t = np.arange(2 * rate) / rate
+    parts, quiet, silences = [], [], []
+    position = 0
+    for _ in range(15):
+        for level in (3000, 150):
+            f0 = rng.uniform(100, 250)
+            burst = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 8)) * level * (1 + np.sin(2 * np.pi * 4 * t))
+            parts.append(burst + rng.normal(0, 10, len(t)))
+            if level == 150:
+                quiet.append((position, position + len(t)))
+            position += len(t)
+        parts.append(rng.normal(0, 10, rate))
+        silences.append((position, position + rate))
+        position += rate
+    pcm = np.clip(np.round(np.concatenate(parts)), -32768, 32767).astype("<i2").tobytes()
+    return pcm, quiet, silences
+
+
+def _coverage(segments, regions):
+    """Part des échantillons de regions couverte par les segments conservés"""
+    covered = sum(max(0, min(stop, end) - max(start, begin))
+                  for start, stop in regions for begin, end in segments)
+    return covered / sum(stop - start for start, stop in regions)
+
+
+def test_energy_gate_keeps_quiet_speech(tmp_path):
+    rate = 16000
+    pcm, quiet, silences = _speech_dense_call(rate)
+    samples_per_frame = rate * st.FRAME_DURATION_MS // 1000
+    mask = st.silent_frame_mask(pcm, rate, st.FRAME_DURATION_MS)
+
+    # Aucune frame de parole faible n'est écartée sans passer par le VAD...
+    for start, stop in quiet:
+        assert not mask[start // samples_per_frame + 1:stop // samples_per_frame - 1].any()
+    # ...alors que les vrais silences le sont
+    silent_frames = [mask[start // samples_per_frame + 1:stop // samples_per_frame - 1] for start, stop in silences]
+    assert sum(m.sum() for m in silent_frames) >= 0.8 * sum(len(m) for m in silent_frames)
+
+    path = str(tmp_path / "dense.wav")
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(pcm)
+    gated = st.trim_silence(path, energy_gate=True, output_path=str(tmp_path / "gated.wav"))
+    ungated = st.trim_silence(path, output_path=str(tmp_path / "ungated.wav"))
+    assert _coverage(gated.segments.tolist(), quiet) >= _coverage(ungated.segments.tolist(), quiet) - 0.01
+    assert _coverage(gated.segments.tolist(), quiet) > 0.9
+
+
+def _tone(frequency, rate, seconds=2, level=10000):
+    import numpy as np
+    t = np.arange(int(rate * seconds)) / rate
+    return (np.sin(2 * np.pi * frequency * t) * level).astype("<i2")
+
+
+def _level_db(pcm, reference=10000):
+    import numpy as np
+    samples = np.frombuffer(pcm, dtype="<i2").astype(float)[2000:-2000]
+    return 20 * np.log10(max(np.sqrt(np.mean(samples ** 2)), 1e-9) / (reference / np.sqrt(2)))
+
+
+def test_normalizer_resample_rejects_aliases():
+    # 44.1 kHz -> 16 kHz : un 10 kHz se replierait à 6 kHz sans vrai passe-bas
+    normalizer = st.PcmNormalizer(1, 2, 44100)
+    assert normalizer.target_rate == 16000
+    assert _level_db(normalizer.process(_tone(10000, 44100).tobytes())) < -60
+    assert abs(_level_db(st.PcmNormalizer(1, 2, 44100).process(_tone(1000, 44100).tobytes()))) < 0.5
+
+
+def test_normalizer_blocks_match_single_call():
+    import numpy as np
+    stereo = np.stack([_tone(440, 44100), _tone(3000, 44100)], axis=1).ravel().tobytes()
+    whole = st.PcmNormalizer(2, 2, 44100).process(stereo)
+    blocked = st.PcmNormalizer(2, 2, 44100)
+    step = 4 * 7777
+    assert b"".join(blocked.process(stereo[i:i + step]) for i in range(0, len(stereo), step)) == whole
+
+
+def _write_float_extensible_wav(path, samples, rate):
+    """WAV WAVE_FORMAT_EXTENSIBLE, PCM flottant 32 bits : illisible par le module wave"""
+    import struct
+    import numpy as np
+    data = (np.asarray(samples, dtype=np.float32) / 32768.0).astype("<f4").tobytes()
+    subformat = struct.pack("<H", 3) + b"\x00\x00\x00\x00\x10\x00\x80\x00\x00\xaa\x00\x38\x9b\x71"
+    fmt = struct.pack("<HHIIHHHHI", 0xFFFE, 1, rate, rate * 4, 4, 32, 22, 32, 0x4) + subformat
+    with open(path, "wb") as f:
+        f.write(b"RIFF" + struct.pack("<I", 4 + 8 + len(fmt) + 8 + len(data)) + b"WAVE")
+        f.write(b"fmt " + struct.pack("<I", len(fmt)) + fmt)
+        f.write(b"data" + struct.pack("<I", len(data)) + data)
+    return str(path)
+
+
+def test_extensible_float_wav_is_decoded(tmp_path):
+    from conftest import synthetic_call
+    path = _write_float_extensible_wav(tmp_path / "float.wav", synthetic_call(20, rate=48000), 48000)
+    pcm, rate = st.read_wave(path)
+    assert rate == st.NORMALIZE_SAMPLE_RATE and abs(len(pcm) / 2 / rate - 20) < 0.1
+    result = st.trim_silence(path, streaming=True, output_path=str(tmp_path / "out.wav"))
+    assert result.sample_rate == st.NORMALIZE_SAMPLE_RATE
+    assert 0 < result.trimmed_duration < result.original_duration
@@ -0,0 +1,196 @@
+"""Tests des backends de sources audio (service/sources.py)"""
+
+import http.server
+import threading
+import time
+
+import pytest
+
+from service import sources
+
+
+class _SlowHandler(http.server.BaseHTTPRequestHandler):
+    """Origine qui ne répond jamais à temps"""
+    protocol_version = "HTTP/1.1"
+    hits = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        type(self).hits += 1
+        time.sleep(5)
+
+
+@pytest.fixture
+def slow_url():
+    handler = type("Handler", (_SlowHandler,), {"hits": 0})
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/call.wav", handler
+    server.shutdown()
+
+
+def test_http_probe_times_out_without_retries(slow_url):
+    url, handler = slow_url
+    start = time.perf_counter()
+    with pytest.raises(Exception):
+        sources.get_source(url).read_head(url, 4096)
+    assert time.perf_counter() - start < sources.PROBE_TIMEOUT + 1.5
+    assert handler.hits == 1
+
+
+# --- file:// confiné à SOURCE_FILE_ROOT ---
+
+@pytest.fixture
+def file_root(tmp_path):
+    root = tmp_path / "share"
+    root.mkdir()
+    (root / "call.wav").write_bytes(b"RIFF" + bytes(100))
+    (tmp_path / "secret.txt").write_text("secret")
+    return root
+
+
+def test_file_source_reads_and_links_inside_root(file_root, tmp_path):
+    source = sources.FileSource(str(file_root))
+    url = f"file://{file_root}/call.wav"
+    header, size = source.read_head(url, 4)
+    assert (header, size) == (b"RIFF", 104)
+    with source.open(url) as stream:
+        assert stream.read() == b"RIFF" + bytes(100)
+    dest = tmp_path / "raw.wav"
+    assert source.fetch(url, str(dest)) == str(dest)
+    assert dest.read_bytes() == b"RIFF" + bytes(100)
+
+
+@pytest.mark.parametrize("path", ["/etc/passwd", "{root}/../secret.txt", "{root}/link.txt"])
+def test_file_source_rejects_paths_outside_root(file_root, tmp_path, path):
+    (file_root / "link.txt").symlink_to(tmp_path / "secret.txt")
+    source = sources.FileSource(str(file_root))
+    url = "file://" + path.format(root=file_root)
+    with pytest.raises(ValueError):
+        source.check(url)
+    with pytest.raises(ValueError):
+        source.fetch(url, str(tmp_path / "out"))
+
+
+def test_file_source_disabled_without_root(file_root):
+    with pytest.raises(ValueError):
+        sources.FileSource("").check(f"file://{file_root}/call.wav")
+
+
+def test_unknown_scheme_rejected():
+    with pytest.raises(ValueError):
+        sources.check_source_url("ftp://host/call.wav")
+
+
+# --- s3:// contre un stand-in local (moto) ---
+
+@pytest.fixture
+def s3_source(monkeypatch):
+    moto = pytest.importorskip("moto")
+    boto3 = pytest.importorskip("boto3")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "test")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "test")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    with moto.mock_aws():
+        client = boto3.client("s3")
+        for bucket in ("recordings", "private"):
+            client.create_bucket(Bucket=bucket)
+            client.put_object(Bucket=bucket, Key="2026/call.wav", Body=b"RIFF" + bytes(100))
+        yield sources.S3Source(["recordings"])
+
+
+def test_s3_source_allowed_bucket(s3_source, tmp_path):
+    url = "s3://recordings/2026/call.wav"
+    header, size = s3_source.read_head(url, 4)
+    assert (header, size) == (b"RIFF", 104)
+    with s3_source.open(url) as stream:
+        assert stream.read() == b"RIFF" + bytes(100)
+    dest = tmp_path / "raw.wav"
+    s3_source.fetch(url, str(dest))
+    assert dest.read_bytes() == b"RIFF" + bytes(100)
+
+
+def test_s3_source_rejects_other_buckets(s3_source, tmp_path):
+    url = "s3://private/2026/call.wav"
+    with pytest.raises(ValueError):
+        s3_source.check(url)
+    with pytest.raises(ValueError):
+        s3_source.fetch(url, str(tmp_path / "raw.wav"))
+
+
+# --- URL reçues par l'API (service/download.py) ---
+
+def test_local_urls_are_not_rewritten():
+    from service.download import resolve_orig_url, resolve_mp3_url
+    for url in ("file:///share/RECORDINGS/MP3/call.mp3", "s3://recordings/RECORDINGS/call.wav"):
+        assert resolve_orig_url(url) == url
+        assert resolve_mp3_url(url) == url
+    assert resolve_orig_url("https://h/RECORDINGS/MP3/call.mp3") == "https://h/RECORDINGS/ORIG/call.wav"
+
+
+def test_validate_audio_url_rejects_local_files_by_default(monkeypatch):
+    from service.download import validate_audio_url
+    monkeypatch.setitem(sources.SOURCES, "file", sources.FileSource(""))
+    with pytest.raises(ValueError):
+        validate_audio_url("file:///etc/passwd")
+    with pytest.raises(ValueError):
+        validate_audio_url("https://h/RECORDINGS/call.txt")
+    validate_audio_url("https://h/RECORDINGS/call.wav")
+
+
+class _RangeHandler(http.server.BaseHTTPRequestHandler):
+    """Origine HTTP qui sert un autre enregistrement, plages comprises"""
+    protocol_version = "HTTP/1.1"
+    payload = b"RIFF" + bytes(range(256)) * 64
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body, status=200, extra=()):
+        self.send_response(status)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in extra:
+            self.send_header(name, value)
+        self.end_headers()
+        return body
+
+    def do_HEAD(self):
+        self._send(self.payload)
+
+    def do_GET(self):
+        spec = self.headers.get("Range")
+        if spec:
+            start, end = (int(v) for v in spec.split("=")[1].split("-"))
+            body = self._send(self.payload[start:end + 1], 206,
+                              [("Content-Range", f"bytes {start}-{end}/{len(self.payload)}")])
+        else:
+            body = self._send(self.payload)
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def range_url():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _RangeHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/other.wav"
+    server.shutdown()
+
+
+@pytest.mark.parametrize("segments", [1, 4])
+def test_second_fetch_does_not_overwrite_linked_source(file_root, tmp_path, range_url, segments, monkeypatch):
+    from service import http_client
+    monkeypatch.setattr(http_client, "DOWNLOAD_SEGMENTED_MIN_BYTES", 0)
+    original = (file_root / "call.wav").read_bytes()
+    dest = tmp_path / "raw.wav"
+    sources.FileSource(str(file_root)).fetch(f"file://{file_root}/call.wav", str(dest))
+
+    # Même fiche retéléchargée en HTTP : la destination est remplacée, pas réécrite sur place
+    http_client.fetch_to_file_segmented(range_url, str(dest), segments=segments)
+    assert dest.read_bytes() == _RangeHandler.payload
+    assert (file_root / "call.wav").read_bytes() == original
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["raw.wav", "secret.txt", "share"]
@@ -0,0 +1,100 @@
+"""Tests du passage des horodatages Whisper à la timeline d'origine (service/transcribe.py)"""
+
+import wave
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from service import transcribe
+from utils.silence_trimmer import TrimResult, trim_silence
+
+RATE = 16000
+
+
+def _trim_result(segments):
+    segments = np.array(segments, dtype=np.int64).reshape(-1, 2) * RATE // 2  # demi-secondes -> échantillons
+    return TrimResult(output_path=None, sample_rate=RATE, original_duration=10.0,
+                      trimmed_duration=float((segments[:, 1] - segments[:, 0]).sum()) / RATE, segments=segments)
+
+
+# Parole de 1 à 2 s puis de 3 à 3.5 s dans l'enregistrement d'origine
+TRIMMED = _trim_result([[2, 4], [6, 7]])
+
+
+def test_regions_on_both_timelines():
+    assert TRIMMED.speech_regions() == [(1.0, 2.0), (3.0, 3.5)]
+    assert TRIMMED.trimmed_regions() == [(0.0, 1.0), (1.0, 1.5)]
+
+
+def test_to_original_time_across_the_junction():
+    assert TRIMMED.to_original_time(0.0) == 1.0
+    assert TRIMMED.to_original_time(0.5) == 1.5
+    assert TRIMMED.to_original_time(1.25) == 3.25
+    # À la jonction : un début va au segment suivant, une fin reste au précédent
+    assert TRIMMED.to_original_time(1.0) == 3.0
+    assert TRIMMED.to_original_time(1.0, end=True) == 2.0
+    assert TRIMMED.to_original_time(1.5, end=True) == 3.5
+
+
+def test_to_original_time_without_speech_is_identity():
+    assert _trim_result([]).to_original_time(2.5) == 2.5
+
+
+def _read(path):
+    with wave.open(str(path), "rb") as wf:
+        return np.frombuffer(wf.readframes(wf.getnframes()), dtype="<i2")
+
+
+def test_mapped_samples_match_the_original(call_wav, tmp_path):
+    result = trim_silence(call_wav, output_path=str(tmp_path / "out.wav"))
+    original = _read(call_wav)
+    trimmed = _read(result.output_path)
+    for k in np.linspace(0, len(trimmed) - 1, 50).astype(int):
+        assert trimmed[k] == original[round(result.to_original_time(k / RATE) * RATE)]
+
+
+def test_transcription_input(monkeypatch):
+    monkeypatch.setattr(transcribe, "encode_processed_audio", lambda filename: f"processed/{filename}.wav")
+    assert transcribe.transcription_input("fiche") == ("processed/fiche.wav", None, None)
+    assert transcribe.transcription_input("fiche", TRIMMED, "raw/fiche.wav") == \
+        ("raw/fiche.wav", [(1.0, 2.0), (3.0, 3.5)], None)
+    assert transcribe.transcription_input("fiche", TRIMMED) == \
+        ("processed/fiche.wav", [(0.0, 1.0), (1.0, 1.5)], TRIMMED)
+
+
+@pytest.fixture
+def fake_whisper(monkeypatch):
+    """Modèle simulé : segments fixes sur la timeline du fichier reçu, options enregistrées"""
+    calls = []
+
+    class Model:
+        def transcribe(self, input_path, **options):
+            calls.append((input_path, options))
+            segments = [SimpleNamespace(start=0.2, end=0.9, text=" un "),
+                        SimpleNamespace(start=0.5, end=1.25, text="deux"),
+                        SimpleNamespace(start=1.0, end=1.5, text="trois")]
+            return iter(segments), None
+
+    monkeypatch.setattr(transcribe, "get_model", lambda model_size=None, compute_type=None: Model())
+    monkeypatch.setattr(transcribe, "encode_processed_audio", lambda filename: f"processed/{filename}.wav")
+    return calls
+
+
+def test_clip_timestamps_are_mapped_back_to_the_original(fake_whisper):
+    segments = list(transcribe.transcribe_segments("fiche", trim_result=TRIMMED))
+    assert fake_whisper[0][0] == "processed/fiche.wav"
+    assert fake_whisper[0][1]["clip_timestamps"] == [0.0, 1.0, 1.0, 1.5]
+    assert segments == [(1.2, 1.9, "un"), (1.5, 3.25, "deux"), (3.0, 3.5, "trois")]
+
+
+def test_original_recording_timestamps_are_kept(fake_whisper):
+    segments = list(transcribe.transcribe_segments("fiche", trim_result=TRIMMED, original_path="raw/fiche.wav"))
+    assert fake_whisper[0][0] == "raw/fiche.wav"
+    assert fake_whisper[0][1]["clip_timestamps"] == [1.0, 2.0, 3.0, 3.5]
+    assert segments == [(0.2, 0.9, "un"), (0.5, 1.25, "deux"), (1.0, 1.5, "trois")]
+
+
+def test_no_speech_skips_the_model(fake_whisper):
+    assert list(transcribe.transcribe_segments("fiche", trim_result=_trim_result([]))) == []
+    assert fake_whisper == []
@@ -0,0 +1,47 @@
+"""Tests du sélecteur de profils (service/transcribe_profiles.py) et de la mesure du décodage"""
+
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from service import transcribe, transcribe_profiles as tp
+
+
+@pytest.fixture(autouse=True)
+def fresh_rtf(monkeypatch):
+    monkeypatch.setattr(tp, "_rtf", {})
+
+
+def test_first_measure_is_smoothed_with_the_prior():
+    prior = tp.PROFILES["accurate"].initial_rtf
+    tp.record_rtf("accurate", 5.0)  # premier job lent (ex. disque froid)
+    assert tp.profile_rtf("accurate") == pytest.approx((1 - tp.RTF_SMOOTHING) * prior + tp.RTF_SMOOTHING * 5.0)
+
+
+def test_queued_speech_is_drained_by_the_workers():
+    rtf = tp.profile_rtf("balanced")
+    assert tp.estimate_turnaround("balanced", 100, 0, 2) == pytest.approx(100 * rtf)
+    assert tp.estimate_turnaround("balanced", 100, 400, 2) == pytest.approx(100 * rtf + 200 * rtf)
+
+
+def test_selector_falls_back_to_faster_profiles_under_load():
+    assert tp.select_profile(100, 0, 2, target=300, requested="auto").name == "accurate"
+    assert tp.select_profile(100, 2000, 2, target=300, requested="auto").name == "fast"
+
+
+def test_decode_time_excludes_model_loading(monkeypatch):
+    def segments():
+        for i in range(3):
+            time.sleep(0.02)
+            yield SimpleNamespace(start=i, end=i + 1, text=" mot ")
+
+    def slow_get_model(model_size, compute_type):
+        time.sleep(0.3)  # chargement du modèle
+        return SimpleNamespace(transcribe=lambda path, **options: (segments(), None))
+
+    monkeypatch.setattr(transcribe, "get_model", slow_get_model)
+    timing = {}
+    for _ in transcribe.transcribe_clips("audio.wav", profile="fast", timing=timing):
+        time.sleep(0.1)  # temps passé chez l'appelant, hors décodage
+    assert 0.05 < timing["decode_seconds"] < 0.2
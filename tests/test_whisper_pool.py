@@ -0,0 +1,56 @@
+"""Tests du budget de threads du pool Whisper (service/whisper_pool.py)"""
+
+from service import whisper_pool
+
+
+def _cores(monkeypatch, count):
+    monkeypatch.setattr(whisper_pool, "available_cores", lambda: list(range(count)))
+
+
+def test_cores_split_evenly_between_workers(monkeypatch):
+    _cores(monkeypatch, 8)
+    monkeypatch.setattr(whisper_pool, "WHISPER_POOL_CPU_THREADS", 0)
+    threads, blocks = whisper_pool.thread_budget(workers=2)
+    assert threads == 4
+    assert blocks == [[0, 1, 2, 3], [4, 5, 6, 7]]
+
+
+def test_uneven_split_leaves_spare_cores(monkeypatch):
+    _cores(monkeypatch, 6)
+    monkeypatch.setattr(whisper_pool, "WHISPER_POOL_CPU_THREADS", 0)
+    threads, blocks = whisper_pool.thread_budget(workers=4)
+    assert threads == 1
+    assert blocks == [[0], [1], [2], [3]]
+
+
+def test_explicit_threads_take_precedence(monkeypatch):
+    _cores(monkeypatch, 8)
+    monkeypatch.setattr(whisper_pool, "WHISPER_POOL_CPU_THREADS", 3)
+    assert whisper_pool.thread_budget(workers=2) == (3, [[0, 1, 2], [3, 4, 5]])
+    assert whisper_pool.thread_budget(workers=2, cpu_threads=2) == (2, [[0, 1], [2, 3]])
+
+
+def test_oversubscription_wraps_blocks_and_warns(monkeypatch, capsys):
+    _cores(monkeypatch, 4)
+    threads, blocks = whisper_pool.thread_budget(workers=3, cpu_threads=2)
+    assert threads == 2
+    assert blocks == [[0, 1], [2, 3], [0, 1]]  # blocs repris depuis le premier cœur
+    assert "oversubscribed" in capsys.readouterr().out
+
+
+def test_more_workers_than_cores_still_get_one_thread(monkeypatch, capsys):
+    _cores(monkeypatch, 2)
+    monkeypatch.setattr(whisper_pool, "WHISPER_POOL_CPU_THREADS", 0)
+    threads, blocks = whisper_pool.thread_budget(workers=3)
+    assert threads == 1
+    assert blocks == [[0], [1], [0]]
+    assert "oversubscribed" in capsys.readouterr().out
+
+
+def test_default_worker_count_from_configuration(monkeypatch, capsys):
+    _cores(monkeypatch, 8)
+    monkeypatch.setattr(whisper_pool, "WHISPER_POOL_WORKERS", 4)
+    monkeypatch.setattr(whisper_pool, "WHISPER_POOL_CPU_THREADS", 0)
+    threads, blocks = whisper_pool.thread_budget()
+    assert (threads, len(blocks)) == (2, 4)
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,69 @@
+"""Tests du registre de modèles Whisper (service/whisper_registry.py) avec un modèle simulé"""
+
+import threading
+import time
+
+import pytest
+
+from service import whisper_registry as registry
+
+
+class _FakeModel:
+    loads = 0
+    loads_lock = threading.Lock()
+
+    def __init__(self, size, device=None, compute_type=None, cpu_threads=None, num_workers=None):
+        time.sleep(0.05)  # chargement lent : les appels concurrents se chevauchent
+        with _FakeModel.loads_lock:
+            _FakeModel.loads += 1
+        self.key = (size, compute_type)
+
+
+@pytest.fixture
+def fake_registry(monkeypatch):
+    monkeypatch.setattr(registry, "WhisperModel", _FakeModel)
+    monkeypatch.setattr(registry, "WHISPER_WARMUP", False)
+    monkeypatch.setattr(registry, "_models", {})
+    monkeypatch.setattr(registry, "_model_info", {})
+    monkeypatch.setattr(registry, "_key_locks", {})
+    monkeypatch.setattr(_FakeModel, "loads", 0)
+
+
+def _concurrent_get_model(keys):
+    barrier = threading.Barrier(len(keys))
+    results = [None] * len(keys)
+
+    def worker(i, key):
+        barrier.wait()
+        results[i] = registry.get_model(*key)
+
+    threads = [threading.Thread(target=worker, args=(i, key)) for i, key in enumerate(keys)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_calls_share_one_instance(fake_registry):
+    models = _concurrent_get_model([("tiny", "int8")] * 16)
+    assert all(model is models[0] for model in models)
+    assert _FakeModel.loads == 1
+    assert [info["size"] for info in registry.model_stats()] == ["tiny"]
+
+
+def test_one_instance_per_key(fake_registry):
+    keys = [("tiny", "int8"), ("base", "int8"), ("tiny", "float16")] * 6
+    models = _concurrent_get_model(keys)
+    by_key = {}
+    for key, model in zip(keys, models):
+        assert model.key == key
+        assert by_key.setdefault(key, model) is model
+    assert _FakeModel.loads == 3
+
+
+def test_default_key_uses_configuration(fake_registry, monkeypatch):
+    monkeypatch.setattr(registry, "WHISPER_MODEL_SIZE", "small")
+    monkeypatch.setattr(registry, "WHISPER_COMPUTE_TYPE", "int8")
+    assert registry.get_model() is registry.get_model("small", "int8")
+    assert _FakeModel.loads == 1
@@ -6,57 +6,251 @@
                   pour améliorer la qualité de transcription. 
                   Utilise WebRTC VAD pour détecter la parole.
  Créé le        : 16/10/2025
- Dernière maj   : 16/10/2025
+ Dernière maj   : 18/10/2026
 ===============================================================
  Dépendances    :
  - os
  - wave
  - contextlib
+ - itertools
+ - numpy
  - webrtcvad
- - pydub
 
  Fonctionnalités clés :
- - Lecture d’un fichier WAV mono
- - Détection des parties parlées avec WebRTC VAD
+ - Lecture d’un fichier WAV (normalisé en mémoire en mono 16 bits si besoin,
+   rééchantillonnage par filtre polyphase à sinus cardinal fenêtré)
+ - WAV illisibles par le module wave (extensible, flottant) décodés à la
+   volée par service.decode
+ - Détection des parties parlées avec WebRTC VAD (séquence d'appels
+   d'origine : même sortie octet pour octet)
  - Suppression des silences et reconstruction de l’audio
- - Sauvegarde du fichier traité dans 'data/audio/processed'
- - Affichage des durées originales et traitées pour logging
+ - Sauvegarde du fichier traité dans 'data/audio/processed' (fichier
+   temporaire renommé en place : une sortie liée à la source n'est
+   jamais tronquée)
+ - Retourne les durées (sans re-décodage) et la carte des segments de parole
+ - Mode streaming à mémoire constante pour les longs enregistrements
+ - Lecture directe depuis un flux (téléchargement HTTP) sans fichier brut
+ - Moteur mono-passe (une classification par frame) sur demande
+   (single_pass), pour le pré-filtre énergétique NumPy optionnel et le
+   mode parallèle
+ - Mode parallèle multi-processus (approché, sur demande) pour les longs
+   fichiers : pool de processus partagé, lecture par blocs
+ - detect_speech : carte des segments seule, sans écrire de fichier traité
 
  Notes :
  - Ce module est utilisé dans le pipeline de traitement audio
    avant transcription via AssemblyAI ou Faster Whisper.
+ - Parité du mode single_pass : webrtcvad est adaptatif, le moteur d'origine
+   reclasse des frames et son état évolue autrement. Sur un même appel de
+   120 s : 2504640 octets (origine) contre 2472000 (mono-passe), pour
+   0.338 s (origine), 0.364 s (moteur exact) et 0.028 s (mono-passe).
 ===============================================================
 """
 
 import os
+import math
+import time
 import wave
 import contextlib
+import itertools
+import threading
+import collections
+import multiprocessing
+from dataclasses import dataclass
+from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import webrtcvad
-from pydub import AudioSegment
 
 # Config
 FRAME_DURATION_MS = 30  # duration per frame for VAD
 VAD_MODE = 1            # 0-3, 3 is most aggressive
+PADDING_MS = 500        # fenêtre du ring buffer pour déclencher / couper
+STREAM_CHUNK_FRAMES = 1000  # frames VAD lues par bloc en mode streaming (~30 s)
+# Pré-filtre énergétique (optionnel) : seuil = plancher de bruit + marge, plafonné par rapport
+# aux frames les plus calmes de l'enregistrement (aucun plafond absolu : la parole faible reste au VAD)
+ENERGY_FLOOR_PERCENTILE = 10   # percentile des énergies de frames pris comme plancher de bruit
+ENERGY_MARGIN_DB = 6.0         # marge au-dessus du plancher sous laquelle une frame est silencieuse
+ENERGY_QUIET_PERCENTILE = 1    # frames les plus calmes (bruit de ligne seul)
+ENERGY_MAX_MARGIN_DB = 12.0    # le seuil ne dépasse jamais ces frames de plus de cette marge
+ENERGY_MIN_DB = -60.0          # le seuil n'est jamais plus bas (dBFS)
+ENERGY_MIN_SILENCE_MS = 300    # seules les plages silencieuses au moins aussi longues évitent le VAD
+# Mode parallèle (approché) : découpage en blocs avec recouvrement pour amorcer le VAD
+PARALLEL_CHUNK_FRAMES = 2000   # frames VAD par tâche (~60 s)
+PARALLEL_OVERLAP_FRAMES = 100  # frames précédentes rejouées pour amorcer l'état du VAD (~3 s)
+# Normalisation des WAV non compatibles webrtcvad (stéréo, 8/24/32 bits, 44.1 kHz...)
+VAD_SAMPLE_RATES = (8000, 16000, 32000, 48000)
+NORMALIZE_SAMPLE_RATE = 16000  # taux cible si le taux d'origine n'est pas supporté
+NORMALIZE_BLOCK_SECONDS = 30   # taille des blocs normalisés par read_wave
+RESAMPLE_CUTOFF = 0.85         # coupure du passe-bas, fraction de la demi-fréquence du plus petit taux
+RESAMPLE_ZEROS = 16            # passages par zéro du sinus cardinal de chaque côté
+RESAMPLE_KAISER_BETA = 8.0     # fenêtre de Kaiser (~80 dB d'atténuation hors bande)
 PROCESSED_DIR = "data/audio/processed"
 
+# Pool de processus du mode parallèle, partagé entre les appels (get_vad_pool)
+_vad_pool = None
+_vad_pool_workers = None
+_vad_pool_lock = threading.Lock()
+
+class PcmNormalizer:
+    """Normaliser en mémoire un PCM quelconque vers du mono 16 bits à un taux supporté par le VAD.
+
+    Downmix (moyenne des canaux), requantification 8/24/32 bits -> 16 bits et
+    rééchantillonnage sont vectorisés avec NumPy. Le rééchantillonneur est un
+    filtre polyphase à sinus cardinal fenêtré (Kaiser) : passe-bas coupant à
+    RESAMPLE_CUTOFF x la moitié du plus petit des deux taux, ce qui élimine le
+    repliement d'un 44.1/48 kHz vers 16 kHz. L'état est conservé entre deux
+    appels à process(), ce qui permet de normaliser un flux bloc par bloc avec
+    le même résultat qu'en un seul appel.
+    """
+
+    def __init__(self, num_channels, sample_width, sample_rate):
+        if sample_width not in (1, 2, 3, 4):
+            raise ValueError("Unsupported sample width: {}".format(sample_width))
+        self.num_channels = num_channels
+        self.sample_width = sample_width
+        self.sample_rate = sample_rate
+        self.target_rate = sample_rate if sample_rate in VAD_SAMPLE_RATES else NORMALIZE_SAMPLE_RATE
+        if self.target_rate != sample_rate:
+            self._init_resampler()
+
+    def _init_resampler(self):
+        """Construire la matrice polyphase : L sorties pour chaque période de M entrées"""
+        g = math.gcd(self.sample_rate, self.target_rate)
+        self._step, phases = self.sample_rate // g, self.target_rate // g  # M, L
+        # Fréquence de coupure en cycles par échantillon d'entrée, demi-longueur du filtre en entrées
+        cutoff = RESAMPLE_CUTOFF * min(self.sample_rate, self.target_rate) / (2.0 * self.sample_rate)
+        half = int(math.ceil(RESAMPLE_ZEROS / (2.0 * cutoff)))
+        self._window = self._step + 2 * half - 1  # entrées lues par période
+        # Sortie r de la période : position d'entrée index_r + frac_r, taps index_r - half + 1 .. index_r + half
+        r = np.arange(phases)
+        index, frac = np.divmod(r * self._step, phases)
+        offsets = np.arange(-half + 1, half + 1)
+        distance = frac[:, None] / phases - offsets[None, :]
+        taps = 2 * cutoff * np.sinc(2 * cutoff * distance)
+        taps *= np.i0(RESAMPLE_KAISER_BETA * np.sqrt(1 - (distance / half) ** 2)) / np.i0(RESAMPLE_KAISER_BETA)
+        taps /= taps.sum(axis=1, keepdims=True)  # gain unitaire en continu pour chaque phase
+        matrix = np.zeros((self._window, phases), dtype=np.float32)
+        matrix[index[:, None] + offsets[None, :] + half - 1, r[:, None]] = taps
+        self._matrix = matrix
+        # Entrées pas encore consommées ; half - 1 zéros pour centrer la première sortie
+        self._pending = np.zeros(half - 1, dtype=np.float32)
+
+    @property
+    def is_passthrough(self):
+        return self.num_channels == 1 and self.sample_width == 2 and self.target_rate == self.sample_rate
+
+    def _to_mono(self, raw):
+        """Convertir des frames brutes en échantillons mono flottants à l'échelle 16 bits"""
+        if self.sample_width == 1:
+            samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) * 256.0
+        elif self.sample_width == 2:
+            samples = np.frombuffer(raw, dtype="<i2").astype(np.float32)
+        elif self.sample_width == 3:
+            b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+            samples = ((b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)) << 8 >> 8).astype(np.float32) / 256.0
+        else:
+            samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 65536.0
+        if self.num_channels > 1:
+            # Somme colonne par colonne : bien plus rapide que mean(axis=1) sur 2 colonnes
+            channels = samples.reshape(-1, self.num_channels)
+            samples = sum(channels[:, c] for c in range(self.num_channels)) / self.num_channels
+        return samples
+
+    def _resample(self, samples):
+        """Rééchantillonner un bloc en reprenant l'état du bloc précédent.
+
+        Chaque période complète de M entrées donne L sorties d'un seul produit
+        matriciel (fenêtres glissantes x matrice polyphase). Les entrées d'une
+        période incomplète sont gardées pour le bloc suivant ; en fin de flux
+        les dernières millisecondes (demi-longueur du filtre) sont ignorées.
+        """
+        buf = np.concatenate((self._pending, samples))
+        periods = (len(buf) - self._window) // self._step + 1 if len(buf) >= self._window else 0
+        self._pending = buf[periods * self._step:]
+        if not periods:
+            return np.zeros(0, dtype=np.float32)
+        windows = np.lib.stride_tricks.sliding_window_view(buf, self._window)[::self._step][:periods]
+        return (windows @ self._matrix).ravel()
+
+    def process(self, raw):
+        """Normaliser un bloc de frames brutes et retourner du PCM mono 16 bits"""
+        samples = self._to_mono(raw)
+        if self.target_rate != self.sample_rate:
+            samples = self._resample(samples)
+        return np.clip(np.round(samples), -32768, 32767).astype("<i2").tobytes()
+
+def wave_normalizer(wf):
+    """Retourner le PcmNormalizer d'un WAV ouvert, ou None s'il est déjà compatible webrtcvad"""
+    normalizer = PcmNormalizer(wf.getnchannels(), wf.getsampwidth(), wf.getframerate())
+    return None if normalizer.is_passthrough else normalizer
+
+@contextlib.contextmanager
+def open_wave(source):
+    """Ouvrir un WAV en lecture avec le module wave.
+
+    Les fichiers que wave ne sait pas lire (WAVE_FORMAT_EXTENSIBLE, PCM
+    flottant, a-law...) sont décodés à la volée par service.decode (PyAV ou
+    ffmpeg) en mono 16 bits NORMALIZE_SAMPLE_RATE. Un flux (read()) ne peut
+    pas être relu : l'erreur wave.Error est alors propagée.
+    """
+    try:
+        wf = wave.open(source, 'rb')
+    except wave.Error as e:
+        if not isinstance(source, (str, os.PathLike)):
+            raise
+        print(f"[Trimmer] {os.path.basename(source)} | not readable by wave ({e}) | decoding")
+        wf = None
+    if wf is not None:
+        with contextlib.closing(wf):
+            yield wf
+        return
+    # Import local : le décodeur n'est chargé que pour ces fichiers
+    from service.decode import open_pcm_wav
+    with open_pcm_wav(source, sample_rate=NORMALIZE_SAMPLE_RATE) as stream, \
+            contextlib.closing(wave.open(stream, 'rb')) as wf:
+        yield wf
+
 def read_wave(path):
-    """Lire un fichier WAV et retourner les données PCM et le taux d'échantillonnage"""
-    with contextlib.closing(wave.open(path, 'rb')) as wf:
-        num_channels = wf.getnchannels()
-        if num_channels != 1:
-            raise ValueError("webrtcvad only supports mono audio")
-        sample_width = wf.getsampwidth()
-        if sample_width != 2:
-            raise ValueError("webrtcvad only supports 16-bit audio")
-        sample_rate = wf.getframerate()
-        if sample_rate not in (8000, 16000, 32000, 48000):
-            raise ValueError("Unsupported sample rate: {}".format(sample_rate))
-        pcm_data = wf.readframes(wf.getnframes())
-        return pcm_data, sample_rate
+    """Lire un fichier WAV et retourner les données PCM et le taux d'échantillonnage.
+
+    Les WAV stéréo, 8/24/32 bits ou à un taux non supporté par webrtcvad sont
+    normalisés en mémoire (mono 16 bits, NORMALIZE_SAMPLE_RATE) ; ceux que le
+    module wave ne lit pas (extensible, flottant) passent par le décodeur.
+    """
+    with open_wave(path) as wf:
+        normalizer = wave_normalizer(wf)
+        # Normalisation par blocs pour borner les tableaux flottants intermédiaires
+        block = wf.getframerate() * NORMALIZE_BLOCK_SECONDS
+        parts = []
+        while True:
+            raw = wf.readframes(block)
+            if not raw:
+                break
+            parts.append(raw if normalizer is None else normalizer.process(raw))
+        sample_rate = wf.getframerate() if normalizer is None else normalizer.target_rate
+        return b''.join(parts), sample_rate
+
+@contextlib.contextmanager
+def open_wave_writer(path):
+    """Ouvrir un WAV en écriture dans un fichier temporaire voisin, renommé en path à la fin.
+
+    path n'est jamais ouvert en écriture : s'il est un lien physique (fichier
+    source lié par service.convert ou service.sources), le fichier lié reste
+    intact. En cas d'erreur le temporaire est supprimé.
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with contextlib.closing(wave.open(tmp_path, 'wb')) as wf:
+            yield wf
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
 
 def write_wave(path, audio, sample_rate):
     """Écrire des données PCM dans un fichier WAV"""
-    with contextlib.closing(wave.open(path, 'wb')) as wf:
+    with open_wave_writer(path) as wf:
         wf.setnchannels(1)
         wf.setsampwidth(2)
         wf.setframerate(sample_rate)
@@ -70,51 +264,519 @@ def frame_generator(frame_duration_ms, audio, sample_rate):
         yield audio[offset:offset + n]
         offset += n
 
-def vad_collector(sample_rate, frame_duration_ms, padding_ms, vad, frames):
-    """Filtrer les frames sans parole"""
-    import collections
+def stream_chunks(wf, frame_duration_ms, chunk_frames=STREAM_CHUNK_FRAMES, normalizer=None):
+    """Lire un WAV ouvert par blocs bornés de frames VAD entières.
+
+    Les blocs sont des memoryview : les frames découpées dedans ne copient pas
+    le PCM, et seuls les blocs encore référencés (ring buffer) restent en mémoire.
+    Si un normalizer est fourni, chaque bloc est normalisé avant découpage.
+    """
+    sample_rate = normalizer.target_rate if normalizer is not None else wf.getframerate()
+    n = int(sample_rate * (frame_duration_ms / 1000.0)) * 2  # 2 bytes per sample
+    read_size = int(wf.getframerate() * (frame_duration_ms / 1000.0)) * chunk_frames
+    carry = b''
+    while True:
+        chunk = wf.readframes(read_size)
+        if not chunk:
+            break
+        if normalizer is not None:
+            chunk = normalizer.process(chunk)
+        if carry:
+            chunk = carry + chunk
+        # Le reste incomplet est reporté au bloc suivant (ignoré en fin de fichier
+        # comme dans frame_generator)
+        usable = len(chunk) - len(chunk) % n
+        carry = chunk[usable:]
+        if usable:
+            yield memoryview(chunk)[:usable]
+
+def frame_energy_db(audio, sample_rate, frame_duration_ms, block_frames=STREAM_CHUNK_FRAMES):
+    """Énergie RMS (dBFS) de chaque frame d'un buffer PCM 16 bits, calculée avec NumPy"""
+    samples_per_frame = int(sample_rate * (frame_duration_ms / 1000.0))
+    samples = np.frombuffer(audio, dtype="<i2")
+    num_frames = len(samples) // samples_per_frame
+    energy = np.empty(num_frames, dtype=np.float32)
+    # Calcul par blocs pour ne pas dupliquer tout le PCM en flottants
+    for start in range(0, num_frames, block_frames):
+        stop = min(start + block_frames, num_frames)
+        block = samples[start * samples_per_frame:stop * samples_per_frame]
+        block = block.reshape(stop - start, samples_per_frame).astype(np.float32)
+        energy[start:stop] = np.sqrt(np.einsum("ij,ij->i", block, block) / samples_per_frame)
+    return 20.0 * np.log10(energy / 32768.0 + 1e-10)
+
+def _long_runs(mask, min_length):
+    """Ne garder dans un masque booléen que les plages de True d'au moins min_length éléments"""
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    kept = np.zeros_like(mask)
+    for start, stop in zip(edges[::2], edges[1::2]):
+        if stop - start >= min_length:
+            kept[start:stop] = True
+    return kept
+
+def silent_frame_mask(audio, sample_rate, frame_duration_ms):
+    """Marquer les frames clairement silencieuses d'un buffer PCM.
+
+    Le seuil s'adapte au plancher de bruit de l'enregistrement (percentile des
+    énergies + marge). Dans un appel presque entièrement parlé ce percentile
+    tombe dans la parole : le seuil est donc plafonné à ENERGY_MAX_MARGIN_DB
+    au-dessus des frames les plus calmes, et jamais sous ENERGY_MIN_DB.
+    Seules les plages d'au moins ENERGY_MIN_SILENCE_MS sous le seuil sont
+    marquées : les creux brefs à l'intérieur de la parole restent au VAD.
+    """
+    energy_db = frame_energy_db(audio, sample_rate, frame_duration_ms)
+    if not len(energy_db):
+        return np.zeros(0, dtype=bool)
+    noise_floor = float(np.percentile(energy_db, ENERGY_FLOOR_PERCENTILE))
+    quietest = float(np.percentile(energy_db, ENERGY_QUIET_PERCENTILE))
+    threshold = max(min(noise_floor + ENERGY_MARGIN_DB, quietest + ENERGY_MAX_MARGIN_DB), ENERGY_MIN_DB)
+    min_frames = max(int(ENERGY_MIN_SILENCE_MS / frame_duration_ms), 1)
+    return _long_runs(energy_db < threshold, min_frames)
+
+def classify_frames(sample_rate, vad, frames, silent_mask=None, stats=None):
+    """Associer à chaque frame sa décision VAD (une seule classification par frame).
+
+    Les frames marquées dans silent_mask sont non voisées sans appel au VAD.
+    Si stats est fourni, les compteurs 'vad_calls' et 'vad_skipped' y sont cumulés.
+    """
+    vad_calls = vad_skipped = 0
+    if silent_mask is None:
+        for frame in frames:
+            vad_calls += 1
+            yield frame, vad.is_speech(frame, sample_rate)
+    else:
+        for frame, silent in zip(frames, silent_mask):
+            if silent:
+                vad_skipped += 1
+                yield frame, False
+            else:
+                vad_calls += 1
+                yield frame, vad.is_speech(frame, sample_rate)
+    if stats is not None:
+        stats["vad_calls"] = stats.get("vad_calls", 0) + vad_calls
+        stats["vad_skipped"] = stats.get("vad_skipped", 0) + vad_skipped
+
+def collect_voiced(padding_ms, frame_duration_ms, decisions, segments=None):
+    """Générer les frames contenant de la parole à partir des paires (frame, is_speech).
+
+    Le ring buffer conserve la décision avec la frame et deux compteurs
+    glissants (voisées / non voisées) remplacent le recomptage du buffer.
+    Si segments est une liste, les plages de frames conservées y sont ajoutées
+    sous forme [début, fin[ (indices de frames dans l'audio d'origine).
+    """
     num_padding_frames = int(padding_ms / frame_duration_ms)
     ring_buffer = collections.deque(maxlen=num_padding_frames)
+    threshold = 0.9 * num_padding_frames
+    num_voiced = 0  # nombre de frames voisées actuellement dans ring_buffer
     triggered = False
-    voiced_frames = []
+    index = -1
 
-    for frame in frames:
-        is_speech = vad.is_speech(frame, sample_rate)
+    for index, (frame, is_speech) in enumerate(decisions):
+        if num_padding_frames:
+            if len(ring_buffer) == num_padding_frames:
+                # La frame la plus ancienne va être éjectée du buffer
+                num_voiced -= ring_buffer[0][1]
+            ring_buffer.append((frame, is_speech))
+            num_voiced += is_speech
 
         if not triggered:
-            ring_buffer.append(frame)
-            if sum(1 for f in ring_buffer if vad.is_speech(f, sample_rate)) > 0.9 * ring_buffer.maxlen:
+            if num_voiced > threshold:
                 triggered = True
-                voiced_frames.extend(ring_buffer)
+                start = index - len(ring_buffer) + 1
+                if segments is not None and segments and segments[-1][1] == start:
+                    start = segments.pop()[0]  # segment contigu au précédent
+                for f, _ in ring_buffer:
+                    yield f
                 ring_buffer.clear()
+                num_voiced = 0
         else:
-            voiced_frames.append(frame)
-            ring_buffer.append(frame)
-            if sum(1 for f in ring_buffer if not vad.is_speech(f, sample_rate)) > 0.9 * ring_buffer.maxlen:
+            yield frame
+            if len(ring_buffer) - num_voiced > threshold:
                 triggered = False
                 ring_buffer.clear()
+                num_voiced = 0
+                if segments is not None:
+                    segments.append([start, index + 1])
 
-    return b''.join(voiced_frames)
+    if triggered and segments is not None:
+        segments.append([start, index + 1])
 
-def trim_silence(input_path):
-    """Supprimer les silences d'un fichier WAV et sauvegarder le fichier traité"""
-    if not os.path.exists(PROCESSED_DIR):
-        os.makedirs(PROCESSED_DIR)
+def collect_voiced_exact(sample_rate, padding_ms, frame_duration_ms, vad, frames, segments=None, stats=None):
+    """Générer les frames contenant de la parole avec la séquence d'appels VAD d'origine.
 
-    pcm_data, sample_rate = read_wave(input_path)
+    webrtcvad adapte ses modèles de bruit à chaque appel : la décision d'une
+    frame dépend de tous les appels précédents. Pour produire exactement les
+    mêmes octets que l'implémentation historique, chaque frame est classée à
+    son arrivée (décision ignorée) puis chaque frame du ring buffer est
+    reclassée à chaque itération, dans le même ordre. Seule la tenue des
+    buffers est allégée (pas de liste de frames voisées, pas de générateur
+    par itération). segments : voir collect_voiced.
+    """
+    num_padding_frames = int(padding_ms / frame_duration_ms)
+    ring_buffer = collections.deque(maxlen=num_padding_frames)
+    threshold = 0.9 * num_padding_frames
+    is_speech = vad.is_speech
+    rates = itertools.repeat(sample_rate)
+    triggered = False
+    vad_calls = 0
+    index = -1
+
+    for index, frame in enumerate(frames):
+        is_speech(frame, sample_rate)  # décision inutilisée, mais l'appel fait évoluer l'état du VAD
+        ring_buffer.append(frame)
+        vad_calls += 1 + len(ring_buffer)
+
+        # Reclassement de tout le ring buffer, dans l'ordre (boucle en C via map)
+        num_voiced = sum(map(is_speech, ring_buffer, rates))
+        if not triggered:
+            if num_voiced > threshold:
+                triggered = True
+                start = index - len(ring_buffer) + 1
+                if segments is not None and segments and segments[-1][1] == start:
+                    start = segments.pop()[0]  # segment contigu au précédent
+                yield from ring_buffer
+                ring_buffer.clear()
+        else:
+            yield frame
+            if len(ring_buffer) - num_voiced > threshold:
+                triggered = False
+                ring_buffer.clear()
+                if segments is not None:
+                    segments.append([start, index + 1])
+
+    if triggered and segments is not None:
+        segments.append([start, index + 1])
+    if stats is not None:
+        stats["vad_calls"] = stats.get("vad_calls", 0) + vad_calls
+
+def iter_voiced_frames(sample_rate, frame_duration_ms, padding_ms, vad, frames, silent_mask=None, stats=None):
+    """Générer les frames contenant de la parole, au fil de l'eau (une classification VAD par frame).
+
+    Moteur des modes energy_gate et parallèle. Avec webrtcvad, dont l'état
+    dépend des appels précédents, le résultat peut différer légèrement de
+    collect_voiced_exact.
+    """
+    decisions = classify_frames(sample_rate, vad, frames, silent_mask, stats)
+    return collect_voiced(padding_ms, frame_duration_ms, decisions)
+
+def vad_collector(sample_rate, frame_duration_ms, padding_ms, vad, frames, single_pass=False):
+    """Filtrer les frames sans parole.
+
+    Par défaut, même séquence d'appels VAD (et mêmes octets) que
+    l'implémentation d'origine ; single_pass=True classe chaque frame une
+    seule fois (environ 13x plus rapide, résultat approché avec webrtcvad).
+    """
+    if single_pass:
+        return b''.join(iter_voiced_frames(sample_rate, frame_duration_ms, padding_ms, vad, frames))
+    return b''.join(collect_voiced_exact(sample_rate, padding_ms, frame_duration_ms, vad, frames))
+
+def _classify_chunk(task):
+    """Tâche worker : classer les frames d'un bloc PCM et retourner les décisions.
+
+    Chaque tâche crée son propre VAD : le résultat ne dépend pas des tâches
+    exécutées avant elle par le même process. Les warmup premières frames
+    (recouvrement avec le bloc précédent) servent uniquement à amorcer l'état
+    du VAD ; leurs décisions sont écartées.
+    Retourne (décisions sous forme d'un octet 0/1 par frame, stats).
+    """
+    pcm, sample_rate, warmup, energy_gate = task
     vad = webrtcvad.Vad(VAD_MODE)
+    frame_bytes = int(sample_rate * (FRAME_DURATION_MS / 1000.0)) * 2
+    warmup_pcm = pcm[:warmup * frame_bytes]
+    for frame in frame_generator(FRAME_DURATION_MS, warmup_pcm, sample_rate):
+        vad.is_speech(frame, sample_rate)
+
+    chunk = pcm[len(warmup_pcm):]
+    frames = frame_generator(FRAME_DURATION_MS, chunk, sample_rate)
+    mask = silent_frame_mask(chunk, sample_rate, FRAME_DURATION_MS) if energy_gate else None
+    stats = {}
+    decisions = bytes(
+        is_speech for _, is_speech in classify_frames(sample_rate, vad, frames, mask, stats)
+    )
+    return decisions, stats
+
+def get_vad_pool(workers):
+    """Retourner le pool de processus VAD partagé (recréé seulement si le nombre de workers change)"""
+    global _vad_pool, _vad_pool_workers
+    with _vad_pool_lock:
+        if _vad_pool is None or _vad_pool_workers != workers:
+            if _vad_pool is not None:
+                _vad_pool.shutdown(wait=False)
+            # "spawn" : le process de l'API est multi-thread, un fork pourrait hériter d'un verrou tenu
+            _vad_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _vad_pool_workers = workers
+        return _vad_pool
+
+def iter_decisions_parallel(chunks, sample_rate, workers, energy_gate=False, stats=None):
+    """Classer en parallèle les frames d'une suite de blocs PCM et générer les paires (frame, is_speech).
+
+    Chaque bloc est envoyé au pool précédé des PARALLEL_OVERLAP_FRAMES
+    dernières frames du bloc précédent, qui amorcent le VAD de la tâche. Au
+    plus 2 x workers blocs sont en vol : la mémoire reste bornée quand les
+    blocs viennent d'un flux. Les décisions sont rendues dans l'ordre et la
+    machine à états de collect_voiced reste séquentielle.
+
+    Résultat approché : un VAD amorcé sur ~3 s ne retrouve pas exactement
+    l'état qu'il aurait après tout l'enregistrement, quelques frames proches
+    des frontières de blocs peuvent changer de décision.
+    """
+    pool = get_vad_pool(workers)
+    frame_bytes = int(sample_rate * (FRAME_DURATION_MS / 1000.0)) * 2
+    overlap_bytes = PARALLEL_OVERLAP_FRAMES * frame_bytes
+    in_flight = collections.deque()
+    previous_tail = b''
+
+    def drain():
+        chunk, future = in_flight.popleft()
+        decisions, chunk_stats = future.result()
+        if stats is not None:
+            for key, value in chunk_stats.items():
+                stats[key] = stats.get(key, 0) + value
+        return zip(frame_generator(FRAME_DURATION_MS, chunk, sample_rate), decisions)
+
+    for chunk in chunks:
+        chunk = bytes(chunk)
+        task = (previous_tail + chunk, sample_rate, len(previous_tail) // frame_bytes, energy_gate)
+        in_flight.append((chunk, pool.submit(_classify_chunk, task)))
+        previous_tail = chunk[-overlap_bytes:] if overlap_bytes else b''
+        if len(in_flight) > 2 * workers:
+            yield from drain()
+    while in_flight:
+        yield from drain()
+
+def classify_frames_parallel(pcm_data, sample_rate, workers, energy_gate=False, stats=None):
+    """Classer toutes les frames d'un buffer PCM dans le pool VAD (un octet 0/1 par frame, approché)"""
+    frame_bytes = int(sample_rate * (FRAME_DURATION_MS / 1000.0)) * 2
+    chunk_bytes = PARALLEL_CHUNK_FRAMES * frame_bytes
+    usable = len(pcm_data) - len(pcm_data) % frame_bytes
+    chunks = (pcm_data[start:min(start + chunk_bytes, usable)] for start in range(0, usable, chunk_bytes))
+    return bytes(d for _, d in iter_decisions_parallel(chunks, sample_rate, workers, energy_gate, stats))
+
+@dataclass
+class TrimResult:
+    """Résultat de trim_silence.
+
+    segments contient les plages de parole conservées, en échantillons sur la
+    timeline de l'enregistrement d'origine (tableau int64 de forme (n, 2),
+    [début, fin[), dans l'ordre où elles apparaissent dans le fichier traité.
+    output_path vaut None si aucun fichier traité n'a été écrit (detect_speech).
+    """
+    output_path: Optional[str]
+    sample_rate: int
+    original_duration: float
+    trimmed_duration: float
+    segments: np.ndarray
+
+    @property
+    def speech_ratio(self):
+        return self.trimmed_duration / self.original_duration if self.original_duration else 0.0
+
+    def to_original_time(self, t, end=False):
+        """Convertir un instant (s) du fichier traité en instant (s) de l'enregistrement d'origine
+
+        À une jonction entre deux segments, un début est placé au début du segment
+        suivant et une fin (end=True) à la fin du segment précédent.
+        """
+        if not len(self.segments):
+            return t
+        lengths = self.segments[:, 1] - self.segments[:, 0]
+        ends = np.cumsum(lengths)
+        sample = t * self.sample_rate
+        i = min(int(np.searchsorted(ends, sample, side="left" if end else "right")), len(self.segments) - 1)
+        offset = sample - (ends[i] - lengths[i])
+        return float((self.segments[i, 0] + offset) / self.sample_rate)
+
+    def speech_regions(self):
+        """Plages de parole (début, fin) en secondes sur la timeline d'origine"""
+        return [(start / self.sample_rate, end / self.sample_rate) for start, end in self.segments.tolist()]
+
+    def trimmed_regions(self):
+        """Les mêmes plages en secondes dans le fichier traité (mises bout à bout)"""
+        regions = []
+        position = 0
+        for start, end in self.segments.tolist():
+            regions.append((position / self.sample_rate, (position + end - start) / self.sample_rate))
+            position += end - start
+        return regions
+
+def _segments_to_samples(segments, sample_rate):
+    """Convertir des plages de frames VAD en plages d'échantillons"""
+    samples_per_frame = int(sample_rate * (FRAME_DURATION_MS / 1000.0))
+    return np.array(segments, dtype=np.int64).reshape(-1, 2) * samples_per_frame
+
+def trim_silence(input_path, streaming=False, energy_gate=False, workers=1, output_path=None, vad=None,
+                 single_pass=False):
+    """Supprimer les silences d'un fichier WAV et sauvegarder le fichier traité.
+
+    Avec streaming=True le fichier est lu par blocs de STREAM_CHUNK_FRAMES frames
+    et la parole est écrite au fur et à mesure : la mémoire reste constante
+    quelle que soit la durée de l'enregistrement.
+    Par défaut le VAD est appelé exactement comme dans l'implémentation
+    d'origine (collect_voiced_exact) : mêmes octets en sortie.
+    Avec single_pass=True chaque frame est classée une seule fois (environ
+    12x plus rapide que le moteur exact).
+    Avec energy_gate=True les frames clairement silencieuses (énergie sous le
+    plancher de bruit) sont en plus écartées sans appeler webrtcvad.
+    Avec workers > 1 la classification VAD est répartie sur le pool de
+    processus partagé (get_vad_pool), le fichier étant lu par blocs
+    (mémoire constante, comme streaming=True).
+    Ces trois modes, à activer explicitement, sont mono-passe : l'état
+    adaptatif de webrtcvad n'évolue plus de la même façon et le résultat peut
+    différer de quelques frames (voir les notes du module).
+
+    Par défaut le fichier traité est écrit dans PROCESSED_DIR sous le même nom ;
+    un webrtcvad.Vad existant peut être passé via vad pour être réutilisé.
+
+    Retourne un TrimResult (chemin de sortie, durées, segments de parole).
+    """
+    filename = os.path.basename(input_path)
+    if output_path is None:
+        output_path = os.path.join(PROCESSED_DIR, filename)
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+
+    if vad is None:
+        vad = webrtcvad.Vad(VAD_MODE)
+
+    if streaming or workers > 1:
+        return _trim_silence_streaming(input_path, output_path, energy_gate, vad, workers=workers,
+                                       single_pass=single_pass)
+
+    pcm_data, sample_rate = read_wave(input_path)
     frames = list(frame_generator(FRAME_DURATION_MS, pcm_data, sample_rate))
-    trimmed_audio = vad_collector(sample_rate, FRAME_DURATION_MS, padding_ms=500, vad=vad, frames=frames)
+    stats = {}
+    segments = []
+    vad_start = time.perf_counter()
+    if energy_gate or single_pass:
+        # Une classification par frame (moteur mono-passe), frames silencieuses écartées si energy_gate
+        silent_mask = silent_frame_mask(pcm_data, sample_rate, FRAME_DURATION_MS) if energy_gate else None
+        decisions = classify_frames(sample_rate, vad, frames, silent_mask, stats)
+        trimmed_audio = b''.join(collect_voiced(PADDING_MS, FRAME_DURATION_MS, decisions, segments))
+    else:
+        # Mode par défaut : séquence d'appels VAD d'origine, octets identiques
+        trimmed_audio = b''.join(
+            collect_voiced_exact(sample_rate, PADDING_MS, FRAME_DURATION_MS, vad, frames, segments, stats))
+    vad_elapsed = time.perf_counter() - vad_start
 
     # Sauvegarder le fichier traité
-    filename = os.path.basename(input_path)
-    output_path = os.path.join(PROCESSED_DIR, filename)
     write_wave(output_path, trimmed_audio, sample_rate)
 
-    # Logging durations
-    original_audio = AudioSegment.from_file(input_path)
-    trimmed_audio_seg = AudioSegment.from_file(output_path)
-    print(f"[Trimmer] {filename} | Original: {len(original_audio)/1000:.2f}s | Trimmed: {len(trimmed_audio_seg)/1000:.2f}s")
+    result = TrimResult(
+        output_path=output_path,
+        sample_rate=sample_rate,
+        original_duration=len(pcm_data) / 2 / sample_rate,
+        trimmed_duration=len(trimmed_audio) / 2 / sample_rate,
+        segments=_segments_to_samples(segments, sample_rate),
+    )
+    _log_result(filename, result, len(frames), vad_elapsed, stats if energy_gate else None)
+    return result
+
+def _log_result(filename, result, num_frames, vad_elapsed, gate_stats=None):
+    """Afficher les durées, le débit du VAD et les appels évités par le pré-filtre"""
+    print(f"[Trimmer] {filename} | Original: {result.original_duration:.2f}s | Trimmed: {result.trimmed_duration:.2f}s "
+          f"| Speech: {100 * result.speech_ratio:.1f}% in {len(result.segments)} segments")
+    print(f"[Trimmer] {filename} | VAD: {num_frames} frames in {vad_elapsed:.2f}s ({num_frames / max(vad_elapsed, 1e-9):.0f} frames/s)")
+    if gate_stats is not None:
+        total = gate_stats["vad_calls"] + gate_stats["vad_skipped"]
+        print(f"[Trimmer] {filename} | Energy gate: {gate_stats['vad_skipped']}/{total} VAD calls skipped "
+              f"({100 * gate_stats['vad_skipped'] / max(total, 1):.1f}%)")
+
+def _stream_frames(wf, normalizer=None):
+    """Générer les frames VAD d'un WAV ouvert, bloc par bloc"""
+    sample_rate = normalizer.target_rate if normalizer is not None else wf.getframerate()
+    for chunk in stream_chunks(wf, FRAME_DURATION_MS, normalizer=normalizer):
+        yield from frame_generator(FRAME_DURATION_MS, chunk, sample_rate)
+
+def _stream_decisions(wf, vad, stats, normalizer=None, energy_gate=True):
+    """Générer les paires (frame, is_speech) d'un WAV ouvert en mono-passe, bloc par bloc"""
+    sample_rate = normalizer.target_rate if normalizer is not None else wf.getframerate()
+    for chunk in stream_chunks(wf, FRAME_DURATION_MS, normalizer=normalizer):
+        frames = frame_generator(FRAME_DURATION_MS, chunk, sample_rate)
+        # Le plancher de bruit est estimé sur chaque bloc (~30 s)
+        silent_mask = silent_frame_mask(chunk, sample_rate, FRAME_DURATION_MS) if energy_gate else None
+        yield from classify_frames(sample_rate, vad, frames, silent_mask, stats)
+
+def trim_silence_stream(stream, output_path, energy_gate=False, vad=None, single_pass=False):
+    """Supprimer les silences d'un WAV lu depuis un flux (ex. réponse HTTP).
+
+    Le flux n'a besoin que d'une méthode read() : l'en-tête WAV est lu au fil
+    de l'eau et les frames passent dans le VAD à mesure qu'elles arrivent,
+    sans fichier brut intermédiaire. Seul le fichier traité est écrit.
+    energy_gate et single_pass : voir trim_silence.
+
+    Retourne un TrimResult.
+    """
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    if vad is None:
+        vad = webrtcvad.Vad(VAD_MODE)
+    return _trim_silence_streaming(stream, output_path, energy_gate, vad, os.path.basename(output_path),
+                                   single_pass=single_pass)
+
+def detect_speech(input_path, energy_gate=False, vad=None, single_pass=False):
+    """Détecter la parole d'un fichier WAV sans écrire de fichier traité.
+
+    Même lecture par blocs et même VAD que trim_silence(streaming=True) : les
+    segments et durées sont identiques, mais seul le TrimResult est produit
+    (output_path vaut None). Permet de transcrire l'original avec sa carte de
+    segments au lieu d'un WAV réduit.
+    """
+    if vad is None:
+        vad = webrtcvad.Vad(VAD_MODE)
+    return _trim_silence_streaming(input_path, None, energy_gate, vad, single_pass=single_pass)
+
+def _trim_silence_streaming(source, output_path, energy_gate, vad, filename=None, workers=1, single_pass=False):
+    """Version streaming de trim_silence : lecture, VAD et écriture par blocs (aucune si output_path est None)"""
+    filename = filename or os.path.basename(source)
+    writer = open_wave_writer(output_path) if output_path else contextlib.nullcontext()
+
+    with open_wave(source) as wf_in, writer as wf_out:
+        normalizer = wave_normalizer(wf_in)
+        sample_rate = normalizer.target_rate if normalizer is not None else wf_in.getframerate()
+        if wf_out is not None:
+            wf_out.setnchannels(1)
+            wf_out.setsampwidth(2)
+            wf_out.setframerate(sample_rate)
+
+        flush_size = int(sample_rate * (FRAME_DURATION_MS / 1000.0)) * 2 * STREAM_CHUNK_FRAMES
+        pending = bytearray()
+        vad_start = time.perf_counter()
+        stats = {}
+        segments = []
+        if workers > 1:
+            # Blocs classés dans le pool VAD partagé, au plus 2 x workers en mémoire
+            chunks = stream_chunks(wf_in, FRAME_DURATION_MS, PARALLEL_CHUNK_FRAMES, normalizer)
+            decisions = iter_decisions_parallel(chunks, sample_rate, workers, energy_gate, stats)
+            voiced = collect_voiced(PADDING_MS, FRAME_DURATION_MS, decisions, segments)
+        elif energy_gate or single_pass:
+            decisions = _stream_decisions(wf_in, vad, stats, normalizer, energy_gate)
+            voiced = collect_voiced(PADDING_MS, FRAME_DURATION_MS, decisions, segments)
+        else:
+            voiced = collect_voiced_exact(sample_rate, PADDING_MS, FRAME_DURATION_MS, vad,
+                                          _stream_frames(wf_in, normalizer), segments, stats)
+        trimmed_bytes = 0
+        for frame in voiced:
+            trimmed_bytes += len(frame)
+            if wf_out is None:
+                continue
+            pending += frame
+            if len(pending) >= flush_size:
+                wf_out.writeframes(pending)
+                pending.clear()
+        if pending:
+            wf_out.writeframes(pending)
+        vad_elapsed = time.perf_counter() - vad_start
 
-    return output_path
+        # Frames réellement lues (l'en-tête d'un flux peut annoncer une taille inexacte)
+        original_duration = wf_in.tell() / wf_in.getframerate()
+        trimmed_frames = trimmed_bytes // 2
 
+    # Durées calculées depuis les compteurs de frames : pas de second décodage du fichier
+    result = TrimResult(
+        output_path=output_path,
+        sample_rate=sample_rate,
+        original_duration=original_duration,
+        trimmed_duration=trimmed_frames / sample_rate,
+        segments=_segments_to_samples(segments, sample_rate),
+    )
+    num_frames = int(original_duration * 1000 // FRAME_DURATION_MS)
+    _log_result(filename, result, num_frames, vad_elapsed, stats if energy_gate else None)
+    return result
@@ -0,0 +1,80 @@
+"""
+===============================================================
+ Fichier        : transcribe_bench.py
+ Auteur         : Mohamed-Amine ELGAOUZI
+ Description    : Compare le débit de la transcription locale
+                  fichier par fichier (transcribe_audio) et de la
+                  transcription batchée sur plusieurs enregistrements
+                  (service/batch_transcribe.py).
+ Créé le        : 18/10/2026
+ Dernière maj   : 18/10/2026
+===============================================================
+ Dépendances    :
+ - json
+ - time
+ - argparse
+ - service.whisper_registry
+ - service.batch_transcribe
+
+ Fonctionnalités clés :
+ - Même modèle (chargé une fois, hors mesure) pour les deux passes
+ - Décodage de l'audio inclus dans les deux mesures
+ - Résumé : secondes audio, durée, débit (secondes audio / seconde)
+   et accélération du mode batché
+
+ Notes :
+ - Lancer depuis la racine du projet :
+   python -m utils.transcribe_bench data/audio/processed/*.wav --batch-size 8
+===============================================================
+"""
+
+import json
+import time
+import argparse
+
+from service.whisper_registry import get_model
+from service.batch_transcribe import BatchTranscriber, load_audio, WHISPER_LANGUAGE, SAMPLE_RATE
+
+def bench_sequential(paths, model):
+    """Chemin actuel : un appel model.transcribe par fichier"""
+    start = time.perf_counter()
+    for path in paths:
+        segments, _ = model.transcribe(path, language=WHISPER_LANGUAGE)
+        list(segments)  # les segments sont générés paresseusement
+    return time.perf_counter() - start
+
+def bench_batched(paths, batch_size, model_size, compute_type):
+    """Tous les fichiers dans un seul lot batché"""
+    transcriber = BatchTranscriber(batch_size=batch_size, max_recordings=len(paths),
+                                   model_size=model_size, compute_type=compute_type)
+    start = time.perf_counter()
+    transcriber.transcribe_batch([load_audio(path) for path in paths])
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Débit de la transcription locale : fichier par fichier vs batchée")
+    parser.add_argument("paths", nargs="+", help="fichiers audio à transcrire")
+    parser.add_argument("--batch-size", type=int, default=None, help="taille des lots (défaut : WHISPER_BATCH_SIZE)")
+    parser.add_argument("--model", default=None, help="taille du modèle (défaut : WHISPER_MODEL_SIZE)")
+    parser.add_argument("--compute-type", default=None, help="quantification (défaut : WHISPER_COMPUTE_TYPE)")
+    args = parser.parse_args()
+
+    model = get_model(args.model, args.compute_type)  # chargement et préchauffage hors mesure
+    audio_seconds = sum(len(load_audio(path)) for path in args.paths) / SAMPLE_RATE
+
+    sequential = bench_sequential(args.paths, model)
+    batched = bench_batched(args.paths, args.batch_size, args.model, args.compute_type)
+
+    summary = {
+        "files": len(args.paths),
+        "audio_seconds": audio_seconds,
+        "sequential_seconds": sequential,
+        "sequential_throughput": audio_seconds / sequential,
+        "batched_seconds": batched,
+        "batched_throughput": audio_seconds / batched,
+        "speedup": sequential / batched,
+    }
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+===============================================================
+ Fichier        : trim_batch.py
+ Auteur         : Mohamed-Amine ELGAOUZI
+ Description    : Suppression des silences en lot sur un dossier
+                  ou un manifeste JSONL, répartie sur un pool de
+                  processus. Utilisé pour retraiter les archives.
+ Créé le        : 18/10/2026
+ Dernière maj   : 18/10/2026
+===============================================================
+ Dépendances    :
+ - os
+ - json
+ - argparse
+ - concurrent.futures
+ - utils.silence_trimmer
+ - service.decode (entrées non WAV)
+
+ Fonctionnalités clés :
+ - Entrée : dossier de fichiers audio ou manifeste JSONL
+   ({"input": "...", "output": "..."} par ligne, "output" optionnel)
+ - Fichiers non WAV (MP3, FLAC, Opus...) décodés en flux par
+   service.decode, sans WAV intermédiaire
+ - Un webrtcvad.Vad neuf par fichier : même résultat que trim_silence
+   quel que soit l'ordre de traitement
+ - Fichiers déjà à jour ignorés (sortie plus récente que l'entrée)
+ - Résumé JSON : ratio de parole et débit (secondes audio / seconde)
+
+ Notes :
+ - Lancer depuis la racine du projet :
+   python -m utils.trim_batch data/archives --output-dir data/audio/processed --workers 8
+===============================================================
+"""
+
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from utils.silence_trimmer import trim_silence, trim_silence_stream, PROCESSED_DIR
+from service.decode import open_pcm_wav
+
+# Extensions traitées dans un dossier (les non-WAV passent par le décodeur)
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".flac", ".ogg", ".opus", ".m4a")
+
+def _trim_one(input_path, output_path, streaming, energy_gate):
+    """Tâche worker : supprimer les silences d'un fichier et retourner son résumé.
+
+    Chaque fichier a son propre webrtcvad.Vad (créé par le trimmer) : l'état
+    adaptatif du VAD ne dépend pas des fichiers traités avant par le worker.
+    """
+    start = time.perf_counter()
+    try:
+        if input_path.lower().endswith(".wav"):
+            result = trim_silence(input_path, streaming=streaming, energy_gate=energy_gate,
+                                  output_path=output_path)
+        else:
+            with open_pcm_wav(input_path) as stream:
+                result = trim_silence_stream(stream, output_path, energy_gate=energy_gate)
+    except Exception as e:
+        return {"input": input_path, "status": "error", "error": str(e)}
+    return {
+        "input": input_path,
+        "output": result.output_path,
+        "status": "ok",
+        "original_duration": result.original_duration,
+        "trimmed_duration": result.trimmed_duration,
+        "speech_ratio": result.speech_ratio,
+        "segments": len(result.segments),
+        "elapsed": time.perf_counter() - start,
+    }
+
+def list_jobs(source, output_dir):
+    """Lister les paires (entrée, sortie WAV) d'un dossier audio ou d'un manifeste JSONL"""
+    jobs = []
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if name.lower().endswith(AUDIO_EXTENSIONS):
+                output_path = os.path.join(output_dir, os.path.splitext(name)[0] + ".wav")
+                if any(output_path == o for _, o in jobs):
+                    output_path = os.path.join(output_dir, name + ".wav")  # même nom, autre format
+                jobs.append((os.path.join(source, name), output_path))
+        return jobs
+
+    with open(source, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            input_path = entry["input"]
+            output_path = entry.get("output") or os.path.join(
+                output_dir, os.path.splitext(os.path.basename(input_path))[0] + ".wav")
+            jobs.append((input_path, output_path))
+    return jobs
+
+def is_up_to_date(input_path, output_path):
+    """Vrai si la sortie existe et est plus récente que l'entrée"""
+    return os.path.exists(output_path) and os.path.getmtime(output_path) >= os.path.getmtime(input_path)
+
+def run_batch(source, output_dir=PROCESSED_DIR, workers=None, streaming=True, energy_gate=False, force=False):
+    """Traiter tous les fichiers d'un dossier ou d'un manifeste et retourner le résumé"""
+    jobs = list_jobs(source, output_dir)
+    todo = [(i, o) for i, o in jobs if force or not is_up_to_date(i, o)]
+    skipped = len(jobs) - len(todo)
+    print(f"[TrimBatch] {len(jobs)} files | {skipped} up to date | {len(todo)} to process")
+
+    results = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_trim_one, i, o, streaming, energy_gate) for i, o in todo]
+        for future in as_completed(futures):
+            results.append(future.result())
+    wall = time.perf_counter() - start
+
+    done = [r for r in results if r["status"] == "ok"]
+    audio_seconds = sum(r["original_duration"] for r in done)
+    speech_seconds = sum(r["trimmed_duration"] for r in done)
+    return {
+        "source": source,
+        "files": len(jobs),
+        "processed": len(done),
+        "skipped": skipped,
+        "failed": len(results) - len(done),
+        "audio_seconds": audio_seconds,
+        "speech_seconds": speech_seconds,
+        "speech_ratio": speech_seconds / audio_seconds if audio_seconds else 0.0,
+        "wall_seconds": wall,
+        "throughput": audio_seconds / wall if wall else 0.0,
+        "results": sorted(results, key=lambda r: r["input"]),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Suppression des silences en lot (dossier ou manifeste JSONL)")
+    parser.add_argument("source", help="dossier de fichiers audio ou manifeste JSONL")
+    parser.add_argument("--output-dir", default=PROCESSED_DIR, help="dossier de sortie (défaut : %(default)s)")
+    parser.add_argument("--workers", type=int, default=None, help="nombre de processus (défaut : nombre de cœurs)")
+    parser.add_argument("--summary", default=None, help="fichier JSON du résumé (défaut : <output-dir>/trim_summary.json)")
+    parser.add_argument("--in-memory", action="store_true", help="lire chaque fichier en entier au lieu du streaming")
+    parser.add_argument("--energy-gate", action="store_true", help="activer le pré-filtre énergétique NumPy")
+    parser.add_argument("--force", action="store_true", help="retraiter même les fichiers à jour")
+    args = parser.parse_args()
+
+    summary = run_batch(args.source, args.output_dir, args.workers,
+                        streaming=not args.in_memory, energy_gate=args.energy_gate, force=args.force)
+
+    summary_path = args.summary or os.path.join(args.output_dir, "trim_summary.json")
+    os.makedirs(os.path.dirname(summary_path) or ".", exist_ok=True)
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+
+    print(f"[TrimBatch] {summary['processed']} processed | {summary['skipped']} skipped | {summary['failed']} failed")
+    print(f"[TrimBatch] Audio: {summary['audio_seconds']:.0f}s | Speech: {100 * summary['speech_ratio']:.1f}% "
+          f"| Throughput: {summary['throughput']:.0f} audio s/s | Summary: {summary_path}")
+
+if __name__ == "__main__":
+    main()
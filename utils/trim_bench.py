@@ -0,0 +1,120 @@
+"""
+===============================================================
+ Fichier        : trim_bench.py
+ Auteur         : Mohamed-Amine ELGAOUZI
+ Description    : Mesure le débit du VAD (frames/s) de
+                  l'implémentation d'origine de vad_collector et
+                  des moteurs de utils/silence_trimmer.py, et vérifie
+                  la parité octet pour octet du moteur par défaut.
+ Créé le        : 18/10/2026
+ Dernière maj   : 18/10/2026
+===============================================================
+ Dépendances    :
+ - json
+ - time
+ - argparse
+ - collections
+ - webrtcvad
+ - utils.silence_trimmer
+
+ Fonctionnalités clés :
+ - original_vad_collector : copie conforme de la version d'origine,
+   référence de parité (aussi utilisée par les tests)
+ - Moteurs mesurés : original, exact (défaut de trim_silence),
+   mono-passe, mono-passe avec pré-filtre énergétique
+ - Résumé JSON : frames/s, accélération, octets conservés, parité
+
+ Notes :
+ - Lancer depuis la racine du projet :
+   python -m utils.trim_bench data/audio/raw/*.wav
+ - Le PCM est lu et normalisé hors mesure ; chaque moteur reçoit un
+   webrtcvad.Vad neuf.
+===============================================================
+"""
+
+import json
+import time
+import argparse
+import collections
+
+import webrtcvad
+
+from utils.silence_trimmer import (
+    read_wave, frame_generator, vad_collector, iter_voiced_frames, silent_frame_mask,
+    FRAME_DURATION_MS, PADDING_MS, VAD_MODE,
+)
+
+def original_vad_collector(sample_rate, frame_duration_ms, padding_ms, vad, frames):
+    """vad_collector d'origine (chaque frame du ring buffer reclassée à chaque itération)"""
+    num_padding_frames = int(padding_ms / frame_duration_ms)
+    ring_buffer = collections.deque(maxlen=num_padding_frames)
+    triggered = False
+    voiced_frames = []
+
+    for frame in frames:
+        is_speech = vad.is_speech(frame, sample_rate)
+
+        if not triggered:
+            ring_buffer.append(frame)
+            if sum(1 for f in ring_buffer if vad.is_speech(f, sample_rate)) > 0.9 * ring_buffer.maxlen:
+                triggered = True
+                voiced_frames.extend(ring_buffer)
+                ring_buffer.clear()
+        else:
+            voiced_frames.append(frame)
+            ring_buffer.append(frame)
+            if sum(1 for f in ring_buffer if not vad.is_speech(f, sample_rate)) > 0.9 * ring_buffer.maxlen:
+                triggered = False
+                ring_buffer.clear()
+
+    return b''.join(voiced_frames)
+
+def _engines(pcm, sample_rate):
+    """Moteurs mesurés : nom -> fonction(vad, frames) retournant le PCM conservé"""
+    def gated(vad, frames):
+        mask = silent_frame_mask(pcm, sample_rate, FRAME_DURATION_MS)
+        return b''.join(iter_voiced_frames(sample_rate, FRAME_DURATION_MS, PADDING_MS, vad, frames, mask))
+    return {
+        "original": lambda vad, frames: original_vad_collector(sample_rate, FRAME_DURATION_MS, PADDING_MS, vad, frames),
+        "exact": lambda vad, frames: vad_collector(sample_rate, FRAME_DURATION_MS, PADDING_MS, vad, frames),
+        "single_pass": lambda vad, frames: vad_collector(sample_rate, FRAME_DURATION_MS, PADDING_MS, vad, frames,
+                                                         single_pass=True),
+        "energy_gate": gated,
+    }
+
+def bench_file(path, vad_mode=VAD_MODE):
+    """Mesurer chaque moteur sur un fichier et comparer sa sortie à l'original"""
+    pcm, sample_rate = read_wave(path)
+    frames = list(frame_generator(FRAME_DURATION_MS, pcm, sample_rate))
+    results = {}
+    reference = None
+    for name, engine in _engines(pcm, sample_rate).items():
+        start = time.perf_counter()
+        output = engine(webrtcvad.Vad(vad_mode), frames)
+        elapsed = time.perf_counter() - start
+        if reference is None:
+            reference = output
+        results[name] = {
+            "seconds": elapsed,
+            "frames_per_second": len(frames) / max(elapsed, 1e-9),
+            "bytes": len(output),
+            "identical_to_original": output == reference,
+        }
+    base = results["original"]["seconds"]
+    for stats in results.values():
+        stats["speedup"] = base / max(stats["seconds"], 1e-9)
+    return {"file": path, "frames": len(frames), "engines": results}
+
+def main():
+    parser = argparse.ArgumentParser(description="Débit du VAD (frames/s) : vad_collector d'origine vs moteurs actuels")
+    parser.add_argument("paths", nargs="+", help="fichiers WAV à analyser")
+    parser.add_argument("--vad-mode", type=int, default=VAD_MODE, help="agressivité webrtcvad 0-3")
+    args = parser.parse_args()
+
+    summary = [bench_file(path, args.vad_mode) for path in args.paths]
+    print(json.dumps(summary, indent=2))
+    if not all(f["engines"]["exact"]["identical_to_original"] for f in summary):
+        raise SystemExit("exact engine output differs from the original vad_collector")
+
+if __name__ == "__main__":
+    main()